@@ -0,0 +1 @@
+"""ABXplore A/B test analysis."""
@@ -0,0 +1,207 @@
+"""
+Poisson bootstrap for control vs test comparisons on skewed per-lead metrics.
+Every row gets an independent Poisson(1) weight per replicate, so replicates are built as
+streaming weighted sums over chunks of rows: memory is O(replicates), never O(rows x replicates).
+Replicate blocks run on a thread pool; weights are seeded per (chunk, block), so results depend
+only on the seed, chunk_size and block_size, not on the number of workers.
+Run from the data/ folder after dbt run: python -m analysis.bootstrap
+"""
+
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import stats
+
+
+# Per-lead metric values and groups from the cleaned stg_* models, in a fixed order for reproducibility
+METRIC_SQL = {
+    'revenue_per_lead': """
+        SELECT l.lead_group, COALESCE(o.revenue, 0.0) AS value
+        FROM stg_leads l
+        LEFT JOIN (SELECT lead_id, SUM(revenue) AS revenue FROM stg_outcomes GROUP BY lead_id) o
+            ON l.lead_id = o.lead_id
+        ORDER BY l.lead_id
+    """,
+    'days_to_close': """
+        SELECT l.lead_group, MIN(o.days_to_close) AS value
+        FROM stg_leads l
+        JOIN stg_outcomes o ON l.lead_id = o.lead_id
+        WHERE o.converted = 1
+        GROUP BY l.lead_id, l.lead_group
+        ORDER BY l.lead_id
+    """
+}
+
+STATISTICS = ('difference', 'relative_lift')
+
+
+@dataclass
+class BootstrapResult:
+    """Point estimate, replicate distribution and intervals of a control vs test statistic."""
+    statistic: str
+    estimate: float
+    control_mean: float
+    test_mean: float
+    n_control: int
+    n_test: int
+    replicates: np.ndarray
+    percentile_interval: tuple
+    bca_interval: tuple
+    confidence: float
+
+
+def iter_metric_chunks(conn, metric, chunk_size=50000):
+    """Stream (groups, values) arrays of one metric from an open SQLite or DuckDB connection."""
+    cursor = conn.execute(METRIC_SQL[metric])
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        groups, values = zip(*rows)
+        yield np.array(groups, dtype=object), np.array(values, dtype=float)
+
+
+def iter_frame_chunks(df, group_column, value_column, chunk_size=50000):
+    """Stream (groups, values) arrays from a DataFrame."""
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        yield chunk[group_column].to_numpy(), chunk[value_column].to_numpy(dtype=float)
+
+
+def _merge_moments(a, b):
+    """Combine (n, mean, M2, M3) central-moment summaries of two disjoint samples."""
+    n_a, mean_a, m2_a, m3_a = a
+    n_b, mean_b, m2_b, m3_b = b
+    n = n_a + n_b
+    if n == 0:
+        return a
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+    m3 = (m3_a + m3_b + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+          + 3 * delta * (n_a * m2_b - n_b * m2_a) / n)
+    return n, mean, m2, m3
+
+
+def _chunk_moments(values):
+    if len(values) == 0:
+        return 0, 0.0, 0.0, 0.0
+    centered = values - values.mean()
+    return len(values), values.mean(), (centered ** 2).sum(), (centered ** 3).sum()
+
+
+def _accumulate_block(design, sums, seed, chunk_index, block):
+    """Add one chunk's Poisson-weighted sums to one block of replicate columns (in place)."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index, block.start)))
+    weights = rng.poisson(1.0, size=(design.shape[0], block.stop - block.start)).astype(np.float64)
+    sums[:, block] += design.T @ weights
+
+
+def _statistic(statistic, control_mean, test_mean):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if statistic == 'difference':
+            return test_mean - control_mean
+        return test_mean / control_mean - 1
+
+
+def _acceleration(statistic, control, test):
+    """BCa acceleration from the jackknife, in closed form from each group's central moments.
+
+    Leaving out row i of a group moves that group's mean by (mean - x_i) / (n - 1), so the jackknife
+    deviations are c_g * (x_i - mean_g) and their sums of squares and cubes are c_g^2 * M2_g and
+    c_g^3 * M3_g. For the relative lift the control term is linearized around the full-sample means.
+    """
+    n_c, mean_c, m2_c, m3_c = control
+    n_t, mean_t, m2_t, m3_t = test
+    if statistic == 'difference':
+        c_control, c_test = -1 / (n_c - 1), 1 / (n_t - 1)
+    else:
+        c_control, c_test = -mean_t / ((n_c - 1) * mean_c ** 2), 1 / ((n_t - 1) * mean_c)
+    sum_sq = c_control ** 2 * m2_c + c_test ** 2 * m2_t
+    sum_cubed = c_control ** 3 * m3_c + c_test ** 3 * m3_t
+    return sum_cubed / (6 * sum_sq ** 1.5) if sum_sq > 0 else 0.0
+
+
+def poisson_bootstrap(chunks, statistic='difference', n_replicates=2000, seed=42, confidence=0.95,
+                      block_size=50, workers=None):
+    """Bootstrap the test minus control mean (or relative lift) over a stream of (groups, values) chunks.
+
+    groups hold 'control'/'test' labels (other labels and NaN values are skipped). Returns a
+    BootstrapResult with percentile and BCa intervals.
+    """
+    if statistic not in STATISTICS:
+        raise ValueError(f"statistic must be one of {STATISTICS}, got {statistic!r}")
+
+    # Rows: weighted count and weighted sum per group (control, test); columns: replicates
+    sums = np.zeros((4, n_replicates))
+    moments = {'control': (0, 0.0, 0.0, 0.0), 'test': (0, 0.0, 0.0, 0.0)}
+    blocks = [slice(start, min(start + block_size, n_replicates)) for start in range(0, n_replicates, block_size)]
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for chunk_index, (groups, values) in enumerate(chunks):
+            groups = np.asarray(groups)
+            values = np.asarray(values, dtype=float)
+            is_control = (groups == 'control') & ~np.isnan(values)
+            is_test = (groups == 'test') & ~np.isnan(values)
+            values = np.where(is_control | is_test, values, 0.0)
+
+            design = np.column_stack([is_control, is_control * values, is_test, is_test * values]).astype(np.float64)
+            for name, mask in [('control', is_control), ('test', is_test)]:
+                moments[name] = _merge_moments(moments[name], _chunk_moments(values[mask]))
+
+            # Blocks write disjoint replicate columns; the chunk is done before the next one is read
+            list(pool.map(lambda block: _accumulate_block(design, sums, seed, chunk_index, block), blocks))
+
+    n_control, control_mean = moments['control'][:2]
+    n_test, test_mean = moments['test'][:2]
+    if n_control < 2 or n_test < 2:
+        raise ValueError("Both groups need at least two rows to bootstrap")
+    estimate = _statistic(statistic, control_mean, test_mean)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        replicates = _statistic(statistic, sums[1] / sums[0], sums[3] / sums[2])
+    replicates = replicates[np.isfinite(replicates)]
+
+    # Percentile interval
+    alpha = (1 - confidence) / 2
+    percentile_interval = tuple(np.quantile(replicates, [alpha, 1 - alpha]))
+
+    # BCa: bias correction from the replicate distribution, acceleration from the jackknife
+    below = (replicates < estimate).mean() + 0.5 * (replicates == estimate).mean()
+    z0 = stats.norm.ppf(np.clip(below, 1 / len(replicates), 1 - 1 / len(replicates)))
+    acceleration = _acceleration(statistic, moments['control'], moments['test'])
+    z = stats.norm.ppf([alpha, 1 - alpha])
+    adjusted = stats.norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+    bca_interval = tuple(np.quantile(replicates, adjusted))
+
+    return BootstrapResult(
+        statistic=statistic,
+        estimate=float(estimate),
+        control_mean=float(control_mean),
+        test_mean=float(test_mean),
+        n_control=int(n_control),
+        n_test=int(n_test),
+        replicates=replicates,
+        percentile_interval=percentile_interval,
+        bca_interval=bca_interval,
+        confidence=confidence
+    )
+
+
+if __name__ == "__main__":
+    print("🎲 Poisson bootstrap: control vs test")
+    print("=" * 60)
+
+    conn = sqlite3.connect('./db/abxplore.db')
+    for metric in METRIC_SQL:
+        for statistic in STATISTICS:
+            result = poisson_bootstrap(iter_metric_chunks(conn, metric), statistic=statistic)
+            print(f"📊 {metric} ({statistic}): {result.estimate:,.4f} "
+                  f"| control {result.control_mean:,.2f} (n={result.n_control:,}) "
+                  f"| test {result.test_mean:,.2f} (n={result.n_test:,})")
+            print(f"   {result.confidence:.0%} percentile: [{result.percentile_interval[0]:,.4f}, "
+                  f"{result.percentile_interval[1]:,.4f}] | BCa: [{result.bca_interval[0]:,.4f}, "
+                  f"{result.bca_interval[1]:,.4f}]")
+    conn.close()
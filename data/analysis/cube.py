@@ -0,0 +1,123 @@
+"""
+Roll-ups of the mart_experiment_cube dbt model for dashboards.
+The cube holds additive measures per group, lead cohort day and segment cell, so any slice is a
+sum over cube rows; rates, means and standard deviations are derived after summing.
+Run from the data/ folder after dbt run: python -m analysis.cube
+"""
+
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis.significance import SEGMENT_DIMENSIONS, STATISTIC_COLUMNS, rollup_segments, run_significance_tests
+
+
+CUBE_DIMENSIONS = ['lead_group', 'cohort_date'] + SEGMENT_DIMENSIONS
+STAGE_MEASURES = [
+    'reached_contacted', 'reached_qualified', 'reached_demo_scheduled', 'reached_proposal_sent', 'reached_closed_won'
+]
+CUBE_MEASURES = ['leads', 'contacted'] + STAGE_MEASURES + [
+    column for column in STATISTIC_COLUMNS if column != 'leads'
+]
+
+
+def load_cube(conn, start_date=None, end_date=None):
+    """Read the cube (optionally only cohort days in [start_date, end_date]) from an open SQLite or DuckDB connection."""
+    conditions, params = [], []
+    if start_date is not None:
+        conditions.append('cohort_date >= ?')
+        params.append(str(start_date))
+    if end_date is not None:
+        conditions.append('cohort_date <= ?')
+        params.append(str(end_date))
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    cursor = conn.execute(f"SELECT {', '.join(CUBE_DIMENSIONS + CUBE_MEASURES)} FROM mart_experiment_cube{where}", params)
+    cube = pd.DataFrame(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+    cube['cohort_date'] = pd.to_datetime(cube['cohort_date'])
+    # Categorical dimensions keep roll-ups on integer codes
+    for dimension in ['lead_group'] + SEGMENT_DIMENSIONS:
+        cube[dimension] = cube[dimension].fillna('Unknown').astype('category')
+    cube[CUBE_MEASURES] = cube[CUBE_MEASURES].fillna(0).astype(float)
+    return cube
+
+
+def rollup(cube, by=('lead_group',), filters=None, freq=None):
+    """Sum the cube to the given dimensions and add derived metrics.
+
+    filters maps a dimension to a value or list of values to keep. With freq (e.g. 'W' or 'MS'),
+    a 'cohort_date' in by is bucketed to that period first.
+    """
+    by = list(by)
+    unknown = set(by) - set(CUBE_DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown cube dimensions: {sorted(unknown)}")
+
+    for dimension, values in (filters or {}).items():
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        cube = cube[cube[dimension].isin(values)]
+    keys = [cube['cohort_date'].dt.to_period(freq).dt.start_time if dimension == 'cohort_date' and freq
+            else cube[dimension] for dimension in by]
+
+    rolled = cube.groupby(keys, observed=True)[CUBE_MEASURES].sum() if by else cube[CUBE_MEASURES].sum().to_frame().T
+    return add_metrics(rolled.reset_index(drop=not by))
+
+
+def add_metrics(rolled):
+    """Derive rates, means and standard deviations from summed cube measures (in place; also returned)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        leads, closed, contacts = rolled['leads'], rolled['closed'], rolled['contacts_sum']
+        rolled['contact_rate'] = rolled['contacted'] / leads
+        for stage in STAGE_MEASURES:
+            rolled[stage.replace('reached_', '') + '_rate'] = rolled[stage] / leads
+        rolled['conversion_rate'] = rolled['conversions'] / leads
+        rolled['revenue_per_lead'] = rolled['revenue_sum'] / leads
+        rolled['revenue_per_lead_std'] = np.sqrt(
+            np.maximum(rolled['revenue_sum_sq'] - rolled['revenue_sum'] * rolled['revenue_per_lead'], 0) / (leads - 1)
+        )
+        rolled['days_to_close'] = rolled['days_sum'] / closed
+        rolled['days_to_close_std'] = np.sqrt(
+            np.maximum(rolled['days_sum_sq'] - rolled['days_sum'] * rolled['days_to_close'], 0) / (closed - 1)
+        )
+        rolled['response_rate'] = rolled['responses_sum'] / contacts
+    return rolled
+
+
+def cube_significance(cube, alpha=0.05, correction='fdr_bh', min_group_size=30):
+    """analysis.significance tests over every segment combination, from the cube instead of the stg_* models."""
+    cells = cube.groupby(['lead_group'] + SEGMENT_DIMENSIONS, observed=True, as_index=False)[STATISTIC_COLUMNS].sum()
+    for dimension in ['lead_group'] + SEGMENT_DIMENSIONS:
+        cells[dimension] = cells[dimension].astype(str)
+    return run_significance_tests(rollup_segments(cells), alpha, correction, min_group_size)
+
+
+if __name__ == "__main__":
+    print("🧊 Experiment cube roll-ups")
+    print("=" * 60)
+
+    conn = sqlite3.connect('./db/abxplore.db')
+    start = time.perf_counter()
+    cube = load_cube(conn)
+    conn.close()
+    print(f"📦 {len(cube):,} cube rows ({cube['leads'].sum():,.0f} leads) loaded in {time.perf_counter() - start:.3f}s")
+
+    slices = {
+        'by group': dict(by=['lead_group']),
+        'by group and week': dict(by=['lead_group', 'cohort_date'], freq='W'),
+        'by group and region': dict(by=['lead_group', 'region']),
+        'Enterprise by group and channel': dict(by=['lead_group', 'source_channel'], filters={'company_size': 'Enterprise'})
+    }
+    for name, query in slices.items():
+        start = time.perf_counter()
+        result = rollup(cube, **query)
+        print(f"   {name}: {len(result):,} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(rollup(cube, by=['lead_group'])[['lead_group', 'leads', 'contact_rate', 'qualified_rate', 'conversion_rate',
+                                          'revenue_per_lead', 'days_to_close', 'response_rate']].to_string(index=False))
+
+    start = time.perf_counter()
+    results = cube_significance(cube)
+    print(f"\n🧪 {int(results['p_value'].notna().sum()):,} significance tests from the cube in "
+          f"{time.perf_counter() - start:.3f}s ({int(results['significant'].sum()):,} significant)")
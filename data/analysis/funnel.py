@@ -0,0 +1,245 @@
+"""
+Funnel analytics for control vs test: stage-to-stage transition matrices and Kaplan-Meier
+time-to-stage curves, per group and optionally per segment.
+The stage table is encoded to integer arrays and sorted once by (lead, stage_date, stage_order);
+transitions and durations are array shifts over the sorted rows, and every count is a single
+np.bincount over a combined (cell, from, to) or (cell, stage, day) code.
+Run from the data/ folder after dbt run: python -m analysis.funnel
+"""
+
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from analysis.significance import SEGMENT_DIMENSIONS
+
+
+# Funnel states: 'New' is the lead's creation, 'Exit' follows a lead's last observed stage
+FUNNEL_STATES = ['New', 'Contacted', 'Qualified', 'Demo Scheduled', 'Proposal Sent', 'Closed Won', 'Closed Lost',
+                 'Unknown', 'Exit']
+TARGET_STAGES = ['Contacted', 'Qualified', 'Demo Scheduled', 'Proposal Sent', 'Closed Won']
+
+LEADS_SQL = f"""
+SELECT lead_id, lead_group, {', '.join(f"COALESCE({column}, 'Unknown') AS {dimension}" for dimension, column in
+                                      zip(SEGMENT_DIMENSIONS, ['region_clean', 'industry', 'source_channel',
+                                                               'company_size_clean']))},
+       SUBSTR(CAST(created_at_clean AS VARCHAR), 1, 10) AS created_date
+FROM stg_leads
+"""
+
+STAGES_SQL = """
+SELECT lead_id, stage_name, SUBSTR(CAST(stage_date AS VARCHAR), 1, 10) AS stage_date, stage_order
+FROM stg_funnel_stages
+WHERE stage_date IS NOT NULL
+"""
+
+
+def _query(conn, sql):
+    cursor = conn.execute(sql)
+    return pd.DataFrame(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+
+
+def _day_numbers(dates):
+    """Days since 1970-01-01 of ISO date strings (or datetime64 values)."""
+    return pd.to_datetime(pd.Series(dates), format='ISO8601').to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+class FunnelData:
+    """Leads and their stage rows as integer arrays, stage rows sorted once by (lead, date, order).
+
+    leads needs lead_id, lead_group, the segment dimensions and created_date; stages needs lead_id,
+    stage_name, stage_date and stage_order. Stage rows of leads missing from leads are dropped.
+    """
+
+    def __init__(self, leads, stages):
+        self.leads = leads.reset_index(drop=True)
+        self.created_day = _day_numbers(self.leads['created_date'])
+
+        lead_pos = pd.Index(self.leads['lead_id']).get_indexer(stages['lead_id'])
+        known = lead_pos >= 0
+        stage_code = pd.Categorical(stages['stage_name'], categories=FUNNEL_STATES).codes.astype(np.int64)
+        stage_code[stage_code < 0] = FUNNEL_STATES.index('Unknown')
+        stage_day = _day_numbers(stages['stage_date'])
+        stage_order = pd.to_numeric(stages['stage_order'], errors='coerce').fillna(0).to_numpy()
+
+        # The single sort: lead, then date, then stage order (the stg_funnel_stages stage_sequence order)
+        order = np.lexsort((stage_order[known], stage_day[known], lead_pos[known]))
+        self.lead_pos = lead_pos[known][order]
+        self.stage_code = stage_code[known][order]
+        self.stage_day = stage_day[known][order]
+
+    @classmethod
+    def from_connection(cls, conn):
+        """Load stg_leads and stg_funnel_stages from an open SQLite or DuckDB connection."""
+        return cls(_query(conn, LEADS_SQL), _query(conn, STAGES_SQL))
+
+    def _cells(self, by):
+        """Cell code per lead for lead_group plus the by dimensions, and the cells' dimension values."""
+        keys = ['lead_group'] + list(by)
+        codes = self.leads.groupby(keys, sort=True).ngroup().to_numpy()
+        cells = self.leads[keys].groupby(codes).first().reset_index(drop=True)
+        return codes, cells
+
+    def transitions(self, by=()):
+        """Stage-to-stage transitions per group (and by dimensions): count, probability and mean days.
+
+        Every lead starts in 'New' (at its creation date); each stage row moves it to that stage, and
+        after its last stage row it moves to 'Exit'. probability is the share of a from-stage's
+        transitions going to each to-stage.
+        """
+        lead_codes, cells = self._cells(by)
+        n_states = len(FUNNEL_STATES)
+        n_rows = len(self.lead_pos)
+
+        # Array shifts: a row's predecessor is the previous row of the same lead, or 'New' for the lead's first row
+        first_of_lead = np.ones(n_rows, dtype=bool)
+        first_of_lead[1:] = self.lead_pos[1:] != self.lead_pos[:-1]
+        last_of_lead = np.ones(n_rows, dtype=bool)
+        last_of_lead[:-1] = first_of_lead[1:]
+
+        from_state = np.empty(n_rows, dtype=np.int64)
+        from_state[1:] = self.stage_code[:-1]
+        from_state[first_of_lead] = FUNNEL_STATES.index('New')
+        from_day = np.empty(n_rows, dtype=np.int64)
+        from_day[1:] = self.stage_day[:-1]
+        from_day[first_of_lead] = self.created_day[self.lead_pos[first_of_lead]]
+
+        # Leads without stage rows go New -> Exit; every last row goes on to Exit (durations unknown)
+        no_stages = np.ones(len(self.leads), dtype=bool)
+        no_stages[self.lead_pos] = False
+        exit_code = FUNNEL_STATES.index('Exit')
+        cell = np.concatenate([lead_codes[self.lead_pos], lead_codes[self.lead_pos[last_of_lead]],
+                               lead_codes[no_stages]])
+        source = np.concatenate([from_state, self.stage_code[last_of_lead],
+                                 np.full(int(no_stages.sum()), FUNNEL_STATES.index('New'))])
+        target = np.concatenate([self.stage_code, np.full(int(last_of_lead.sum()), exit_code),
+                                 np.full(int(no_stages.sum()), exit_code)])
+        days = np.concatenate([self.stage_day - from_day, np.zeros(len(source) - n_rows, dtype=np.int64)])
+        timed = np.concatenate([np.ones(n_rows), np.zeros(len(source) - n_rows)])
+
+        size = len(cells) * n_states * n_states
+        key = (cell * n_states + source) * n_states + target
+        counts = np.bincount(key, minlength=size)
+        day_sums = np.bincount(key, weights=days * timed, minlength=size)
+        timed_counts = np.bincount(key, weights=timed, minlength=size)
+
+        shape = (len(cells), n_states, n_states)
+        counts = counts.reshape(shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            probability = counts / counts.sum(axis=2, keepdims=True)
+            mean_days = (day_sums / timed_counts).reshape(shape)
+
+        cell_index, from_index, to_index = np.nonzero(counts)
+        result = cells.iloc[cell_index].reset_index(drop=True)
+        result['from_stage'] = np.array(FUNNEL_STATES, dtype=object)[from_index]
+        result['to_stage'] = np.array(FUNNEL_STATES, dtype=object)[to_index]
+        result['transitions'] = counts[cell_index, from_index, to_index]
+        result['probability'] = probability[cell_index, from_index, to_index]
+        result['mean_days'] = mean_days[cell_index, from_index, to_index]
+        return result
+
+    def transition_matrix(self, group, by_values=None, by=(), value='probability'):
+        """One group's (and segment's) from x to matrix of a transitions() column."""
+        transitions = self.transitions(by)
+        rows = transitions['lead_group'] == group
+        for dimension, dimension_value in (by_values or {}).items():
+            rows &= transitions[dimension] == dimension_value
+        matrix = transitions[rows].pivot(index='from_stage', columns='to_stage', values=value)
+        return matrix.reindex(index=FUNNEL_STATES[:-1], columns=FUNNEL_STATES[1:]).fillna(0)
+
+    def survival_curves(self, stages=TARGET_STAGES, by=(), as_of=None, confidence=0.95):
+        """Kaplan-Meier curves of days from lead creation to first reaching each stage, per group (and by dimensions).
+
+        Leads that have not reached a stage are censored at as_of (default: the latest date in the
+        data). survival is the share of leads not yet at the stage after that many days; reached is
+        1 - survival, with a Greenwood confidence interval.
+        """
+        lead_codes, cells = self._cells(by)
+        stage_codes = np.array([FUNNEL_STATES.index(stage) for stage in stages])
+        as_of_day = (_day_numbers([as_of])[0] if as_of is not None
+                     else max(self.stage_day.max(initial=0), self.created_day.max(initial=0)))
+
+        # First day each lead reached each target stage (rows are date-sorted within a lead)
+        target_index = np.full(len(FUNNEL_STATES), -1)
+        target_index[stage_codes] = np.arange(len(stages))
+        targeted = target_index[self.stage_code] >= 0
+        pair = self.lead_pos[targeted] * len(stages) + target_index[self.stage_code[targeted]]
+        reached_pair, first_row = np.unique(pair, return_index=True)
+        reach_day = np.full(len(self.leads) * len(stages), -1, dtype=np.int64)
+        reach_day[reached_pair] = self.stage_day[targeted][first_row]
+        reach_day = reach_day.reshape(len(self.leads), len(stages))
+
+        # Event at the reach day, or censored at as_of; both in whole days since creation
+        event = reach_day >= 0
+        duration = np.where(event, reach_day, as_of_day) - self.created_day[:, None]
+        duration = np.clip(duration, 0, None)
+        max_day = int(duration.max(initial=0))
+
+        # One bincount per outcome over (cell, stage, day)
+        n_days = max_day + 1
+        key = ((lead_codes[:, None] * len(stages) + np.arange(len(stages))) * n_days + duration).ravel()
+        size = len(cells) * len(stages) * n_days
+        events = np.bincount(key[event.ravel()], minlength=size).reshape(len(cells), len(stages), n_days)
+        leaving = np.bincount(key, minlength=size).reshape(len(cells), len(stages), n_days)
+
+        # At risk on a day: everyone whose event or censoring is on that day or later
+        at_risk = leaving[..., ::-1].cumsum(axis=-1)[..., ::-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hazard = np.where(at_risk > 0, events / at_risk, 0.0)
+            survival = np.cumprod(1 - hazard, axis=-1)
+            greenwood = np.cumsum(np.where(at_risk > events, events / (at_risk * (at_risk - events)), 0.0), axis=-1)
+        z = stats.norm.ppf(0.5 + confidence / 2)
+        half_width = z * survival * np.sqrt(greenwood)
+
+        # Keep the days with an event (where the curve steps) plus day 0 of every curve
+        cell_index, stage_index, day = np.nonzero((events > 0) | (np.arange(n_days) == 0))
+        result = cells.iloc[cell_index].reset_index(drop=True)
+        result['stage'] = np.array(stages, dtype=object)[stage_index]
+        result['day'] = day
+        result['at_risk'] = at_risk[cell_index, stage_index, day]
+        result['events'] = events[cell_index, stage_index, day]
+        result['survival'] = survival[cell_index, stage_index, day]
+        result['reached'] = 1 - result['survival']
+        result['reached_lower'] = np.clip(result['reached'] - half_width[cell_index, stage_index, day], 0, 1)
+        result['reached_upper'] = np.clip(result['reached'] + half_width[cell_index, stage_index, day], 0, 1)
+        return result
+
+
+def median_days_to_stage(curves):
+    """First day each curve's reached share is at least 50% (NaN when it never gets there)."""
+    keys = [column for column in curves.columns if column not in
+            ('day', 'at_risk', 'events', 'survival', 'reached', 'reached_lower', 'reached_upper')]
+    past_median = curves[curves['reached'] >= 0.5]
+    medians = past_median.groupby(keys, sort=False)['day'].min()
+    return medians.reindex(pd.MultiIndex.from_frame(curves[keys].drop_duplicates())).rename('median_days').reset_index()
+
+
+if __name__ == "__main__":
+    print("🔀 Funnel transitions and time-to-stage curves")
+    print("=" * 60)
+
+    conn = sqlite3.connect('./db/abxplore.db')
+    start = time.perf_counter()
+    funnel = FunnelData.from_connection(conn)
+    conn.close()
+    print(f"📦 {len(funnel.lead_pos):,} stage rows of {len(funnel.leads):,} leads loaded and sorted "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    for group in ['control', 'test']:
+        print(f"\n{group} transition probabilities:")
+        print(funnel.transition_matrix(group).round(3).to_string())
+
+    start = time.perf_counter()
+    transitions = funnel.transitions(by=SEGMENT_DIMENSIONS)
+    curves = funnel.survival_curves(by=SEGMENT_DIMENSIONS)
+    print(f"\n⚡ Transitions ({len(transitions):,} rows) and survival curves ({len(curves):,} rows) for every "
+          f"group x segment cell in {time.perf_counter() - start:.2f}s")
+
+    curves = funnel.survival_curves()
+    medians = median_days_to_stage(curves).pivot(index='stage', columns='lead_group', values='median_days')
+    reached_90 = curves[curves['day'] <= 90].groupby(['stage', 'lead_group'])['reached'].max().unstack()
+    print("\nMedian days to stage and share reached within 90 days:")
+    print(medians.join(reached_90, lsuffix='_median_days', rsuffix='_reached_90d').loc[TARGET_STAGES].round(3).to_string())
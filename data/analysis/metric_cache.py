@@ -0,0 +1,295 @@
+"""
+Versioned result cache for filtered control vs test metrics over the stg_* models.
+A result is keyed by the normalized filter (group, created date range, segment values) and a data
+version: a hash of every stg_* model's row count and latest date. When a generator run or an
+incremental load changes the data, the version changes and older results are dropped.
+Results live in a bounded LRU in memory, optionally backed by a SQLite file that survives restarts.
+Run from the data/ folder after dbt run: python -m analysis.metric_cache
+"""
+
+import hashlib
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from analysis.significance import (
+    ALL_SEGMENTS, LEAD_METRICS_SQL, SEGMENT_DIMENSIONS, STATISTIC_COLUMNS, STATISTIC_SUMS_SQL, run_significance_tests
+)
+
+
+FILTER_DIMENSIONS = ['lead_group'] + SEGMENT_DIMENSIONS
+FILTER_FIELDS = FILTER_DIMENSIONS + ['start_date', 'end_date']
+
+# Model: column whose maximum (with the row count) identifies the loaded data
+VERSION_COLUMNS = {
+    'stg_leads': 'created_at_clean',
+    'stg_contact_events': 'event_date',
+    'stg_funnel_stages': 'stage_date',
+    'stg_outcomes': 'outcome_date'
+}
+
+
+def normalize_filter(filters):
+    """Canonical, hashable form of a filter: (field, values) pairs in FILTER_FIELDS order.
+
+    Dimension values become sorted tuples of strings (a single value or any iterable of values);
+    start_date/end_date (inclusive, on the lead's created date) become 'YYYY-MM-DD'. None means no filter.
+    """
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown filter fields: {sorted(unknown)}")
+
+    normalized = []
+    for field in FILTER_FIELDS:
+        value = filters.get(field)
+        if value is None:
+            continue
+        if field in FILTER_DIMENSIONS:
+            values = [value] if isinstance(value, str) else list(value)
+            normalized.append((field, tuple(sorted({str(v) for v in values}))))
+        else:
+            normalized.append((field, pd.Timestamp(value).strftime('%Y-%m-%d')))
+    return tuple(normalized)
+
+
+def data_version(conn, version_columns=VERSION_COLUMNS):
+    """Hash of every model's row count and latest date; changes whenever rows are added or replaced in bulk."""
+    # Separate subqueries: a lone MAX over an indexed column is an index lookup, not a scan
+    summary = [
+        (model, *conn.execute(f"SELECT (SELECT COUNT(*) FROM {model}), (SELECT MAX({column}) FROM {model})").fetchone())
+        for model, column in version_columns.items()
+    ]
+    return hashlib.blake2b(json.dumps(summary, default=str).encode(), digest_size=8).hexdigest()
+
+
+def filtered_metrics(conn, normalized_filter):
+    """Control vs test tests of every metric for the leads matching a normalized filter.
+
+    One row per metric, in analysis.significance's result format.
+    """
+    conditions, params = [], []
+    for field, value in normalized_filter:
+        if field == 'start_date':
+            conditions.append('created_date >= ?')
+            params.append(value)
+        elif field == 'end_date':
+            conditions.append('created_date <= ?')
+            params.append(value)
+        else:
+            conditions.append(f"{field} IN ({', '.join('?' * len(value))})")
+            params.extend(value)
+    where = f"WHERE {' AND '.join(conditions)}\n" if conditions else ''
+
+    cursor = conn.execute(f"{LEAD_METRICS_SQL}SELECT lead_group,{STATISTIC_SUMS_SQL}FROM lead_metrics\n{where}"
+                          "GROUP BY lead_group", params)
+    groups = pd.DataFrame(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+
+    # Both groups as one rolled-up segment; a group without matching leads has zero statistics
+    segments = pd.DataFrame({'lead_group': ['control', 'test']}).merge(groups, how='left')
+    segments[STATISTIC_COLUMNS] = segments[STATISTIC_COLUMNS].fillna(0).astype(float)
+    for dimension in SEGMENT_DIMENSIONS:
+        segments[dimension] = ALL_SEGMENTS
+    results = run_significance_tests(segments)
+    return results.drop(columns=SEGMENT_DIMENSIONS + ['p_adjusted', 'significant'])
+
+
+def _serialize(result):
+    """(format, bytes) of a result for the disk tier: Parquet for DataFrames, JSON for plain data.
+
+    Parquet goes through DuckDB (like data_generate.parquet_io), so pyarrow is not needed.
+    """
+    if isinstance(result, pd.DataFrame):
+        with tempfile.TemporaryDirectory() as directory, duckdb.connect() as conn:
+            path = Path(directory) / 'result.parquet'
+            conn.register('result', result)
+            conn.execute(f"COPY result TO '{path}' (FORMAT PARQUET)")
+            return 'parquet', path.read_bytes()
+    return 'json', json.dumps(result).encode('utf-8')
+
+
+def _deserialize(result_format, data):
+    if result_format == 'parquet':
+        with tempfile.TemporaryDirectory() as directory, duckdb.connect() as conn:
+            path = Path(directory) / 'result.parquet'
+            path.write_bytes(data)
+            return conn.execute(f"SELECT * FROM read_parquet('{path}')").df()
+    if result_format == 'json':
+        return json.loads(data)
+    raise ValueError(f"Unknown cached result format: {result_format}")
+
+
+class MetricCache:
+    """Bounded LRU of results keyed by (data version, normalized filter), with an optional SQLite disk tier.
+
+    The disk tier stores DataFrames as Parquet and other results as JSON (never pickle, so reading
+    a cache file cannot run code). Keeps hit/miss counts and latencies (stats()); invalidate(version) drops every entry of other versions.
+    """
+
+    def __init__(self, max_entries=512, disk_path=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        self._seconds = {'hit': 0.0, 'miss': 0.0}
+
+        self._disk = None
+        if disk_path is not None:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS metric_results (version TEXT, filter TEXT, format TEXT, result BLOB, "
+                "created_at REAL, PRIMARY KEY (version, filter))"
+            )
+            self._disk.commit()
+
+    def get_or_compute(self, version, normalized_filter, compute):
+        """The cached result for the key, or compute() stored under it; latency counts toward the stats."""
+        start = time.perf_counter()
+        key = (version, normalized_filter)
+        with self._lock:
+            found, result = self._get(key)
+        if not found:
+            result = compute()
+            with self._lock:
+                self._put(key, result, to_disk=True)
+
+        with self._lock:
+            self._counts['hits' if found else 'misses'] += 1
+            self._seconds['hit' if found else 'miss'] += time.perf_counter() - start
+        return result
+
+    def _get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return True, self._entries[key]
+        if self._disk is not None:
+            row = self._disk.execute("SELECT format, result FROM metric_results WHERE version = ? AND filter = ?",
+                                     (key[0], json.dumps(key[1]))).fetchone()
+            if row is not None:
+                self._counts['disk_hits'] += 1
+                result = _deserialize(*row)
+                self._put(key, result, to_disk=False)
+                return True, result
+        return False, None
+
+    def _put(self, key, result, to_disk):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counts['evictions'] += 1
+        if to_disk and self._disk is not None:
+            self._disk.execute("INSERT OR REPLACE INTO metric_results VALUES (?, ?, ?, ?, ?)",
+                               (key[0], json.dumps(key[1]), *_serialize(result), time.time()))
+            self._disk.commit()
+
+    def invalidate(self, version):
+        """Drop every entry (in memory and on disk) that belongs to another data version."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] != version]
+            for key in stale:
+                del self._entries[key]
+            # An entry can be stale in memory, on disk or both; each stale key counts once
+            stale_keys = {(key[0], json.dumps(key[1])) for key in stale}
+            if self._disk is not None:
+                stale_keys.update(self._disk.execute(
+                    "SELECT version, filter FROM metric_results WHERE version != ?", (version,)).fetchall())
+                self._disk.execute("DELETE FROM metric_results WHERE version != ?", (version,))
+                self._disk.commit()
+            self._counts['invalidations'] += len(stale_keys)
+
+    def clear(self):
+        """Drop every entry; counts and latencies are kept."""
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM metric_results")
+                self._disk.commit()
+
+    def stats(self):
+        """Hit/miss counts, hit rate, mean hit and miss latency (ms) and entry counts."""
+        with self._lock:
+            lookups = self._counts['hits'] + self._counts['misses']
+            stats = dict(self._counts)
+            stats['hit_rate'] = self._counts['hits'] / lookups if lookups else None
+            stats['mean_hit_ms'] = 1000 * self._seconds['hit'] / self._counts['hits'] if self._counts['hits'] else None
+            stats['mean_miss_ms'] = (1000 * self._seconds['miss'] / self._counts['misses']
+                                     if self._counts['misses'] else None)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            if self._disk is not None:
+                stats['disk_entries'] = self._disk.execute("SELECT COUNT(*) FROM metric_results").fetchone()[0]
+            return stats
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+
+class CachedMetrics:
+    """Filtered metric results from an open SQLite or DuckDB connection, through a MetricCache.
+
+    The data version is recomputed at most every version_ttl seconds (0: on every call); when it
+    changes, results of the old version are invalidated.
+    """
+
+    def __init__(self, conn, cache=None, version_ttl=0.0):
+        self.conn = conn
+        self.cache = cache if cache is not None else MetricCache()
+        self.version_ttl = version_ttl
+        self._version = None
+        self._version_checked = None
+
+    def version(self):
+        now = time.monotonic()
+        if self._version_checked is None or now - self._version_checked >= self.version_ttl:
+            version = data_version(self.conn)
+            if version != self._version:
+                self.cache.invalidate(version)
+                self._version = version
+            self._version_checked = now
+        return self._version
+
+    def metrics(self, **filters):
+        """Control vs test results per metric for the filter (see normalize_filter); a copy, safe to modify."""
+        normalized_filter = normalize_filter(filters)
+        result = self.cache.get_or_compute(self.version(), normalized_filter,
+                                           lambda: filtered_metrics(self.conn, normalized_filter))
+        return result.copy()
+
+
+if __name__ == "__main__":
+    print("🗃️ Metric result cache")
+    print("=" * 60)
+
+    conn = sqlite3.connect('./db/abxplore.db')
+    metrics = CachedMetrics(conn, MetricCache(disk_path='./db/metric_cache.db'))
+    queries = [
+        {},
+        {'start_date': '2024-06-01'},
+        {'start_date': '2024-06-01', 'region': 'Europe'},
+        {'start_date': '2024-06-01', 'end_date': '2024-09-30', 'industry': ['Finance', 'Technology']},
+        {'source_channel': 'LinkedIn', 'company_size': 'Enterprise'},
+    ]
+    for round_name in ['first', 'repeat']:
+        start = time.perf_counter()
+        for query in queries:
+            metrics.metrics(**query)
+        print(f"   {round_name} pass: {len(queries)} queries in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    result = metrics.metrics(start_date='2024-06-01')
+    columns = ['metric', 'n_control', 'n_test', 'control_value', 'test_value', 'lift', 'p_value']
+    print(result[columns].to_string(index=False))
+    print("\n📊 Cache stats:")
+    for name, value in metrics.cache.stats().items():
+        print(f"   {name}: {value:.3f}" if isinstance(value, float) else f"   {name}: {value}")
+    metrics.cache.close()
+    conn.close()
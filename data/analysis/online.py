@@ -0,0 +1,405 @@
+"""
+Online A/B metrics over the cleaned tables replayed as one date-ordered event stream.
+Each lead, contact event, funnel stage and outcome updates constant-size accumulators (counters,
+Welford mean/variance, a days-to-close histogram) for its group in the overall segment and in one
+segment per dimension, so memory depends only on the number of segments and every event is O(1).
+A mixture sequential probability ratio test (mSPRT) on each metric's relative lift gives always-valid
+p-values and intervals, so the experiment can be checked after every day without inflating errors.
+The tests see only leads whose fixed outcome window (outcome_window_days after creation) has closed,
+with the outcomes inside it, so the lift they estimate does not drift as late conversions arrive.
+Run from the data/ folder after dbt run: python -m analysis.online
+"""
+
+import math
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from analysis.significance import ALL_SEGMENTS, POSITIVE_RESPONSES, SEGMENT_DIMENSIONS, adjust_p_values
+
+
+FUNNEL_STAGES = ['Contacted', 'Qualified', 'Demo Scheduled', 'Proposal Sent', 'Closed Won']
+SEQUENTIAL_METRICS = ['conversion_rate', 'revenue_per_lead', 'days_to_close']
+TEST_START_DATE = '2024-06-01'  # New process launch; leads are randomized 50/50 from here on
+OUTCOME_WINDOW_DAYS = 90  # Outcomes counted per lead by the sequential tests (~90% of deals close within it)
+
+# Every table as (event_date, event_type, group, lead created date, segment values..., detail, converted,
+# revenue, days_to_close); leads sort before the other events of their day
+EVENT_STREAM_SQL = f"""
+WITH leads AS (
+    SELECT lead_id,
+           lead_group,
+           COALESCE(region_clean, 'Unknown') AS region,
+           COALESCE(industry, 'Unknown') AS industry,
+           COALESCE(source_channel, 'Unknown') AS source_channel,
+           COALESCE(company_size_clean, 'Unknown') AS company_size,
+           SUBSTR(CAST(created_at_clean AS VARCHAR), 1, 10) AS created_date
+    FROM stg_leads
+),
+events AS (
+    SELECT lead_id, created_date AS event_date, 0 AS event_order, 'lead' AS event_type,
+           NULL AS detail, NULL AS converted, NULL AS revenue, NULL AS days_to_close
+    FROM leads
+    UNION ALL
+    SELECT lead_id, SUBSTR(CAST(event_date AS VARCHAR), 1, 10), 1, 'contact', response_type, NULL, NULL, NULL
+    FROM stg_contact_events
+    UNION ALL
+    SELECT lead_id, SUBSTR(CAST(stage_date AS VARCHAR), 1, 10), 2, 'stage', stage_name, NULL, NULL, NULL
+    FROM stg_funnel_stages
+    UNION ALL
+    SELECT lead_id, SUBSTR(CAST(outcome_date AS VARCHAR), 1, 10), 3, 'outcome', NULL, converted, revenue, days_to_close
+    FROM stg_outcomes
+)
+SELECT e.event_date, e.event_type, l.lead_group, l.created_date, {', '.join(f'l.{dimension}' for dimension in SEGMENT_DIMENSIONS)},
+       e.detail, e.converted, e.revenue, e.days_to_close
+FROM events e
+JOIN leads l ON e.lead_id = l.lead_id
+WHERE e.event_date IS NOT NULL
+ORDER BY e.event_date, e.event_order
+"""
+
+
+def iter_events(conn, chunk_size=50000):
+    """Stream the date-ordered event tuples from an open SQLite or DuckDB connection."""
+    cursor = conn.execute(EVENT_STREAM_SQL)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield from rows
+
+
+class Welford:
+    """Running count, mean and sum of squared deviations (Welford's update)."""
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Fold in another Welford's values (Chan's parallel update)."""
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else float('nan')
+
+
+class DaysHistogram:
+    """Counts per whole day up to max_days (later values share the last bin), for exact day quantiles."""
+    __slots__ = ('counts',)
+
+    def __init__(self, max_days=730):
+        self.counts = np.zeros(max_days + 1, dtype=np.int64)
+
+    def add(self, days):
+        self.counts[min(max(int(days), 0), len(self.counts) - 1)] += 1
+
+    def merge(self, other):
+        self.counts += other.counts
+
+    def quantile(self, q):
+        total = self.counts.sum()
+        if total == 0:
+            return float('nan')
+        return float(np.searchsorted(np.cumsum(self.counts), q * total))
+
+
+class GroupAccumulator:
+    """Counters and running moments of one group in one segment."""
+    __slots__ = ('leads', 'contacts', 'responses', 'stages', 'conversions', 'deal_revenue', 'days_to_close',
+                 'days_histogram')
+
+    def __init__(self):
+        self.leads = 0
+        self.contacts = 0
+        self.responses = 0
+        self.stages = dict.fromkeys(FUNNEL_STAGES, 0)
+        self.conversions = 0
+        self.deal_revenue = Welford()
+        self.days_to_close = Welford()
+        self.days_histogram = DaysHistogram()
+
+    def update(self, event_type, detail, converted, revenue, days_to_close):
+        if event_type == 'lead':
+            self.leads += 1
+        elif event_type == 'contact':
+            self.contacts += 1
+            self.responses += detail in POSITIVE_RESPONSES
+        elif event_type == 'stage':
+            if detail in self.stages:
+                self.stages[detail] += 1
+        elif converted:
+            self.conversions += 1
+            self.deal_revenue.add(revenue or 0.0)
+            if days_to_close is not None:
+                self.days_to_close.add(days_to_close)
+                self.days_histogram.add(days_to_close)
+
+    def merge(self, other):
+        """Fold in another accumulator's counts and moments."""
+        self.leads += other.leads
+        self.contacts += other.contacts
+        self.responses += other.responses
+        for stage, count in other.stages.items():
+            self.stages[stage] += count
+        self.conversions += other.conversions
+        self.deal_revenue.merge(other.deal_revenue)
+        self.days_to_close.merge(other.days_to_close)
+        self.days_histogram.merge(other.days_histogram)
+
+    def moments(self, metric):
+        """(units, mean, variance) of a per-unit metric, as needed by the sequential test."""
+        if metric == 'conversion_rate':
+            p = self.conversions / self.leads if self.leads else float('nan')
+            return self.leads, p, p * (1 - p)
+        if metric == 'revenue_per_lead':
+            # Leads without a deal contribute zero revenue: combine the deal moments with the lead count
+            n, deals = self.leads, self.deal_revenue
+            if n < 2:
+                return n, float('nan'), float('nan')
+            total = deals.n * deals.mean
+            sum_sq = deals.m2 + deals.n * deals.mean ** 2
+            mean = total / n
+            return n, mean, max(sum_sq - total * mean, 0.0) / (n - 1)
+        if metric == 'days_to_close':
+            return self.days_to_close.n, self.days_to_close.mean, self.days_to_close.variance
+        raise ValueError(f"Unknown metric: {metric}")
+
+
+class MixtureSPRT:
+    """Always-valid test of the relative lift test/control - 1 (normal mixture SPRT on the delta-method estimate).
+
+    tau is the standard deviation of the normal mixing distribution over the lift; lifts of about
+    that size are detected fastest. The p-value is the running minimum of 1 / likelihood ratio, so it
+    stays valid however often update() is called; likewise the (1 - alpha) interval is the running
+    intersection of the always-valid intervals of every update, so it never widens again. That holds
+    only while the lift being estimated stays fixed; if the intervals stop overlapping, interval
+    becomes (nan, nan) and interval_empty is set instead of reporting lower > upper.
+    """
+
+    def __init__(self, tau=0.1, alpha=0.05):
+        self.tau = tau
+        self.alpha = alpha
+        self.p_value = 1.0
+        self.interval = (-float('inf'), float('inf'))
+        self.interval_empty = False
+        self.lift = float('nan')
+        self.updates = 0
+
+    def update(self, control, test):
+        """Fold in the current (units, mean, variance) of both groups; returns the always-valid p-value."""
+        n_c, mean_c, var_c = control
+        n_t, mean_t, var_t = test
+        if not (n_c > 1 and n_t > 1 and mean_c > 0 and var_c >= 0 and var_t >= 0):
+            return self.p_value
+
+        lift = mean_t / mean_c - 1
+        variance = var_t / (n_t * mean_c ** 2) + var_c * mean_t ** 2 / (n_c * mean_c ** 4)
+        if not variance > 0:
+            return self.p_value
+
+        tau_sq = self.tau ** 2
+        log_ratio = 0.5 * math.log(variance / (variance + tau_sq)) + \
+            tau_sq * lift ** 2 / (2 * variance * (variance + tau_sq))
+        self.p_value = min(self.p_value, math.exp(-log_ratio) if log_ratio > 0 else 1.0)
+
+        alpha_bound = -2 * math.log(self.alpha) - math.log(variance / (variance + tau_sq))
+        half_width = math.sqrt(variance * (variance + tau_sq) / tau_sq * alpha_bound)
+        if not self.interval_empty:
+            lower, upper = max(self.interval[0], lift - half_width), min(self.interval[1], lift + half_width)
+            self.interval_empty = lower > upper
+            self.interval = (float('nan'), float('nan')) if self.interval_empty else (lower, upper)
+        self.lift = lift
+        self.updates += 1
+        return self.p_value
+
+
+class OnlineExperiment:
+    """Consumes the event stream, keeps per-segment accumulators and sequential tests up to date.
+
+    Only leads created from start_date on (and their events) are counted: before the launch every
+    lead is control, which would bias the comparison. The sequential tests use matured accumulators:
+    leads and their outcomes within outcome_window_days, added once that window has closed. Leads
+    wait in one accumulator per created date, so memory stays O(window days x segments).
+    """
+
+    def __init__(self, dimensions=SEGMENT_DIMENSIONS, start_date=TEST_START_DATE, tau=0.1, alpha=0.05,
+                 min_group_size=30, outcome_window_days=OUTCOME_WINDOW_DAYS):
+        self.dimensions = list(dimensions)
+        self.start_date = start_date
+        self.tau = tau
+        self.alpha = alpha
+        self.min_group_size = min_group_size
+        self.outcome_window_days = outcome_window_days
+        self.accumulators = {}  # (segment, group) -> GroupAccumulator
+        self.matured = {}  # (segment, group) -> GroupAccumulator of leads whose outcome window has closed
+        self.cohorts = {}  # created date -> {(segment, group): GroupAccumulator} of leads still in their window
+        self.tests = {}  # (metric, segment) -> MixtureSPRT
+        self.first_significant = {}  # (metric, segment) -> event date of the first check below alpha
+        self.events = 0  # Events counted (leads created before start_date are skipped)
+        self.current_date = None
+
+    def update(self, event):
+        """Apply one event tuple (as yielded by iter_events); checks the tests when a new day starts."""
+        event_date, event_type, group, created_date = event[:4]
+        values = event[4:4 + len(self.dimensions)]
+        detail, converted, revenue, days_to_close = event[4 + len(self.dimensions):]
+        if self.current_date is not None and event_date != self.current_date:
+            if event_date < self.current_date:
+                raise ValueError(f"Events must arrive in date order: {event_date} after {self.current_date}")
+            self.check()
+        self.current_date = event_date
+        if created_date is None or created_date < self.start_date:
+            return
+        self.events += 1
+
+        # Leads and in-window outcomes also go to the lead's cohort, for the sequential tests
+        in_window = event_type == 'lead' or (event_type == 'outcome' and (
+            date.fromisoformat(event_date) - date.fromisoformat(created_date)).days <= self.outcome_window_days)
+        cohort = self.cohorts.setdefault(created_date, {}) if in_window else None
+        for segment in self._segments(values):
+            accumulator = self.accumulators.get((segment, group))
+            if accumulator is None:
+                accumulator = self.accumulators[(segment, group)] = GroupAccumulator()
+            accumulator.update(event_type, detail, converted, revenue, days_to_close)
+            if cohort is not None:
+                cohort_accumulator = cohort.get((segment, group))
+                if cohort_accumulator is None:
+                    cohort_accumulator = cohort[(segment, group)] = GroupAccumulator()
+                cohort_accumulator.update(event_type, detail, converted, revenue, days_to_close)
+
+    def consume(self, events):
+        """Apply every event of an iterable, then check the tests on the final state."""
+        for event in events:
+            self.update(event)
+        self.check()
+        return self
+
+    def mature(self):
+        """Move the cohorts whose outcome window has closed by current_date into the matured accumulators."""
+        if self.current_date is None:
+            return
+        cutoff = (date.fromisoformat(self.current_date) - timedelta(days=self.outcome_window_days)).isoformat()
+        for created_date in [created_date for created_date in self.cohorts if created_date <= cutoff]:
+            for key, cohort_accumulator in self.cohorts.pop(created_date).items():
+                accumulator = self.matured.get(key)
+                if accumulator is None:
+                    accumulator = self.matured[key] = GroupAccumulator()
+                accumulator.merge(cohort_accumulator)
+
+    def check(self):
+        """Update every segment's sequential tests with the matured accumulators (O(segments))."""
+        self.mature()
+        for (segment, group), control in self.matured.items():
+            test = self.matured.get((segment, 'test'))
+            if group != 'control' or test is None:
+                continue
+            for metric in SEQUENTIAL_METRICS:
+                control_moments, test_moments = control.moments(metric), test.moments(metric)
+                if min(control_moments[0], test_moments[0]) < self.min_group_size:
+                    continue
+                sprt = self.tests.get((metric, segment))
+                if sprt is None:
+                    sprt = self.tests[(metric, segment)] = MixtureSPRT(self.tau, self.alpha)
+                if sprt.update(control_moments, test_moments) < self.alpha:
+                    self.first_significant.setdefault((metric, segment), self.current_date)
+
+    def results(self, correction='fdr_bh'):
+        """Current lift, always-valid p-value and interval per metric and segment, over matured leads.
+
+        p_adjusted corrects the always-valid p-values across segments of each metric ('fdr_bh',
+        'holm' or 'bonferroni'), like analysis.significance.
+        """
+        rows = []
+        for (metric, segment), sprt in self.tests.items():
+            control = self.matured[(segment, 'control')].moments(metric)
+            test = self.matured[(segment, 'test')].moments(metric)
+            rows.append({
+                **dict(zip(self.dimensions, segment)),
+                'metric': metric,
+                'n_control': control[0],
+                'n_test': test[0],
+                'control_value': control[1],
+                'test_value': test[1],
+                'lift': sprt.lift,
+                'lift_lower': sprt.interval[0],
+                'lift_upper': sprt.interval[1],
+                'interval_empty': sprt.interval_empty,
+                'p_value': sprt.p_value,
+                'first_significant': self.first_significant.get((metric, segment))
+            })
+        results = pd.DataFrame(rows)
+        if results.empty:
+            return results
+        results['p_adjusted'] = results.groupby('metric')['p_value'].transform(
+            lambda p_values: adjust_p_values(p_values.to_numpy(), correction)
+        )
+        results['significant'] = results['p_adjusted'] < self.alpha
+        return results
+
+    def summary(self):
+        """Current counters and metric values per segment and group."""
+        rows = []
+        for (segment, group), accumulator in self.accumulators.items():
+            rows.append({
+                **dict(zip(self.dimensions, segment)),
+                'lead_group': group,
+                'leads': accumulator.leads,
+                'contacts': accumulator.contacts,
+                'response_rate': accumulator.responses / accumulator.contacts if accumulator.contacts else np.nan,
+                **{f'stage_{stage.lower().replace(" ", "_")}': count for stage, count in accumulator.stages.items()},
+                'conversions': accumulator.conversions,
+                'conversion_rate': accumulator.moments('conversion_rate')[1],
+                'revenue_per_lead': accumulator.moments('revenue_per_lead')[1],
+                'revenue_per_deal': accumulator.deal_revenue.mean if accumulator.deal_revenue.n else np.nan,
+                'days_to_close_mean': accumulator.days_to_close.mean if accumulator.days_to_close.n else np.nan,
+                'days_to_close_std': math.sqrt(accumulator.days_to_close.variance) if accumulator.days_to_close.n > 1 else np.nan,
+                'days_to_close_median': accumulator.days_histogram.quantile(0.5),
+                'days_to_close_p90': accumulator.days_histogram.quantile(0.9)
+            })
+        return pd.DataFrame(rows)
+
+    def _segments(self, values):
+        """The overall segment plus one single-dimension segment per dimension."""
+        overall = (ALL_SEGMENTS,) * len(self.dimensions)
+        return [overall] + [overall[:i] + (value,) + overall[i + 1:] for i, value in enumerate(values)]
+
+
+if __name__ == "__main__":
+    print("📡 Online A/B metrics with always-valid sequential tests")
+    print("=" * 60)
+
+    conn = sqlite3.connect('./db/abxplore.db')
+    start = time.perf_counter()
+    experiment = OnlineExperiment().consume(iter_events(conn))
+    seconds = time.perf_counter() - start
+    conn.close()
+    print(f"📦 {experiment.events:,} events through {experiment.current_date} in {seconds:.1f}s "
+          f"({experiment.events / seconds:,.0f} events/sec), {len(experiment.accumulators):,} accumulators")
+
+    results = experiment.results()
+    overall = results[(results[SEGMENT_DIMENSIONS] == ALL_SEGMENTS).all(axis=1)]
+    print(overall[['metric', 'n_control', 'n_test', 'control_value', 'test_value', 'lift',
+                   'lift_lower', 'lift_upper', 'p_value', 'first_significant']].to_string(index=False))
+    for metric, metric_results in results.groupby('metric', sort=False):
+        print(f"   {metric}: {int(metric_results['significant'].sum()):,} of {len(metric_results):,} segments significant")
+    if results['interval_empty'].any():
+        print(f"⚠️ {int(results['interval_empty'].sum()):,} tests have disjoint intervals over time (no valid interval)")
@@ -0,0 +1,232 @@
+"""
+Monte Carlo A/A and power simulation on the generator's probability model.
+Each replicate experiment draws only what the significance tests need: per group, the sufficient
+statistics of STATISTIC_COLUMNS (counts, sums, sums of squares), with no Faker text, no tables
+and no I/O. Replicates run in blocks across a process pool, each block seeded by its index, so
+results do not depend on the worker count.
+Run from the data/ folder: python -m analysis.power [--replicates 10000] [--leads-per-group 2000]
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from analysis.significance import metric_tests
+
+
+# Constants of the batched engines that are not generator attributes
+FIRST_TOUCH_PROBABILITIES = [0.7, 0.3]  # First contact is the first contact type (Email) or the second (Phone Call)
+BASE_DEAL_REVENUE = 25000.0
+MIN_DEAL_REVENUE = 5000.0
+REVENUE_MULTIPLIER_SD = 0.2
+
+
+@dataclass(frozen=True)
+class GroupModel:
+    """Per-lead probability model of one group, as the batched engines draw it.
+
+    Leads are followed to the end of the funnel (no as_of cutoff), and the stage chain collapses to
+    one win probability: funnel entry x every stage probability x outcome rate.
+    """
+    contact_probability: float
+    avg_contacts: float
+    first_response_probability: float
+    later_response_probability: float
+    win_probability: float
+    close_mean_days: float
+    size_probabilities: tuple
+    size_revenue: tuple
+    revenue_multiplier_mean: float
+
+    @classmethod
+    def from_generator(cls, generator, group='control', **overrides):
+        """The model of a generator's group; overrides replace group_params entries (e.g. outcome_rate=0.6)."""
+        params = dict(generator.group_params[group])
+        unknown = set(overrides) - set(params)
+        if unknown:
+            raise ValueError(f"Unknown group parameters: {sorted(unknown)}")
+        params.update(overrides)
+
+        response_probabilities = np.array([generator.contact_response_probabilities[t] for t in generator.contact_types])
+        first_response = np.dot(FIRST_TOUCH_PROBABILITIES, response_probabilities[:len(FIRST_TOUCH_PROBABILITIES)])
+        later_response = response_probabilities.mean()
+        stage_probability = np.prod(generator.funnel_stage_probabilities[:-1])
+
+        return cls(
+            contact_probability=params['contact_probability'],
+            avg_contacts=params['avg_contacts'],
+            first_response_probability=min(1.0, first_response * params['response_boost']),
+            later_response_probability=min(1.0, later_response * params['response_boost']),
+            win_probability=params['funnel_entry_rate'] * stage_probability * params['outcome_rate'],
+            close_mean_days=generator.funnel_stage_mean_days[-1],
+            size_probabilities=tuple(generator.company_size_probabilities),
+            size_revenue=tuple(BASE_DEAL_REVENUE * generator.outcome_size_multipliers[size]
+                               for size in generator.company_sizes),
+            revenue_multiplier_mean=params['revenue_multiplier_mean']
+        )
+
+
+def simulate_group(model, n_leads, replicates, rng):
+    """STATISTIC_COLUMNS arrays (one value per replicate) of n_leads leads of one group.
+
+    Only contacted and won leads are drawn one by one; the rest contribute through their counts.
+    """
+    contacted = rng.binomial(n_leads, model.contact_probability, size=replicates)
+    replicate = np.repeat(np.arange(replicates), contacted)
+
+    # Contacts and positive responses per contacted lead (the first touch has its own response rate)
+    contacts = np.maximum(1, rng.poisson(model.avg_contacts, size=len(replicate)))
+    responses = ((rng.random(len(replicate)) < model.first_response_probability)
+                 + rng.binomial(contacts - 1, model.later_response_probability))
+
+    # Wins are independent of contacts: a count per replicate, then deal size and close time per win
+    won = rng.binomial(contacted, model.win_probability)
+    won_replicate = np.repeat(np.arange(replicates), won)
+    size = rng.choice(len(model.size_probabilities), size=len(won_replicate), p=model.size_probabilities)
+    revenue = np.maximum(MIN_DEAL_REVENUE, np.array(model.size_revenue)[size] * rng.normal(
+        model.revenue_multiplier_mean, REVENUE_MULTIPLIER_SD, size=len(won_replicate)))
+    # Close dates are whole days, counted from a creation time uniform within its day
+    days = np.maximum(1, np.floor(rng.exponential(model.close_mean_days, size=len(won_replicate))
+                                  - rng.random(len(won_replicate))))
+
+    def per_replicate(rows, values):
+        return np.bincount(rows, weights=values, minlength=replicates)
+
+    return {
+        'leads': np.full(replicates, float(n_leads)),
+        'conversions': won.astype(float),
+        'revenue_sum': per_replicate(won_replicate, revenue),
+        'revenue_sum_sq': per_replicate(won_replicate, revenue ** 2),
+        'closed': won.astype(float),
+        'days_sum': per_replicate(won_replicate, days),
+        'days_sum_sq': per_replicate(won_replicate, days ** 2),
+        'contacts_sum': per_replicate(replicate, contacts),
+        'contacts_sum_sq': per_replicate(replicate, contacts ** 2),
+        'responses_sum': per_replicate(replicate, responses),
+        'responses_sum_sq': per_replicate(replicate, responses ** 2),
+        'contacts_responses_sum': per_replicate(replicate, contacts * responses)
+    }
+
+
+def _simulate_block(control, test, n_control, n_test, replicates, seed_sequence):
+    """Test results of one block of replicate experiments: one row per (replicate, metric)."""
+    rng = np.random.default_rng(seed_sequence)
+    control_statistics = simulate_group(control, n_control, replicates, rng)
+    test_statistics = simulate_group(test, n_test, replicates, rng)
+
+    results = []
+    for metric, (method, _, numerator, denominator, (statistic, p_value)) in metric_tests(
+            control_statistics, test_statistics).items():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            control_value = control_statistics[numerator] / control_statistics[denominator]
+            test_value = test_statistics[numerator] / test_statistics[denominator]
+        results.append(pd.DataFrame({
+            'replicate': np.arange(replicates),
+            'metric': metric,
+            'method': method,
+            'control_value': control_value,
+            'test_value': test_value,
+            'statistic': statistic,
+            'p_value': np.where(np.isfinite(statistic), p_value, np.nan)
+        }))
+    return pd.concat(results, ignore_index=True)
+
+
+def run_replicates(control, test, n_control, n_test, replicates=10_000, seed=42, workers=None, block_size=250):
+    """Simulate replicate experiments of control vs test GroupModels; one row per (replicate, metric).
+
+    Blocks of block_size replicates get independent seeds spawned from seed by block index.
+    """
+    n_blocks = -(-replicates // block_size)
+    block_seeds = np.random.SeedSequence(seed).spawn(n_blocks)
+    sizes = [min(block_size, replicates - index * block_size) for index in range(n_blocks)]
+
+    if workers == 1:
+        blocks = [_simulate_block(control, test, n_control, n_test, size, block_seed)
+                  for size, block_seed in zip(sizes, block_seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            blocks = list(pool.map(_simulate_block, [control] * n_blocks, [test] * n_blocks, [n_control] * n_blocks,
+                                   [n_test] * n_blocks, sizes, block_seeds))
+
+    # Replicate numbers run over all blocks, in block order
+    for index, block in enumerate(blocks):
+        block['replicate'] += index * block_size
+    return pd.concat(blocks, ignore_index=True)
+
+
+def rejection_rates(results, alpha=0.05):
+    """Per metric: share of replicates with p < alpha (false-positive rate in A/A, power otherwise)."""
+    tested = results.dropna(subset=['p_value'])
+    rates = tested.groupby('metric', sort=False).agg(
+        replicates=('p_value', 'size'),
+        rejections=('p_value', lambda p_values: int((p_values < alpha).sum())),
+        control_value=('control_value', 'mean'),
+        test_value=('test_value', 'mean')
+    ).reset_index()
+    rates['rejection_rate'] = rates['rejections'] / rates['replicates']
+    rates['standard_error'] = np.sqrt(rates['rejection_rate'] * (1 - rates['rejection_rate']) / rates['replicates'])
+    return rates
+
+
+def simulate_aa(generator, n_per_group, replicates=10_000, group='control', alpha=0.05, seed=42, workers=None):
+    """False-positive rate per metric from A/A experiments (both arms drawn from one group's model)."""
+    model = GroupModel.from_generator(generator, group)
+    return rejection_rates(run_replicates(model, model, n_per_group, n_per_group, replicates, seed, workers), alpha)
+
+
+def power_curve(generator, parameter, values, n_per_group, replicates=2_000, alpha=0.05, seed=42, workers=None):
+    """Power per metric as one parameter (a group_params entry) of the test arm varies over values.
+
+    Both arms start from the generator's control group; the test arm differs only in parameter, so
+    the curve is power against that one effect (a value equal to control's gives the false-positive
+    rate). Every value reuses seed, so the curve is drawn with common random numbers.
+    """
+    control = GroupModel.from_generator(generator, 'control')
+    curves = []
+    for value in values:
+        test = GroupModel.from_generator(generator, 'control', **{parameter: value})
+        rates = rejection_rates(run_replicates(control, test, n_per_group, n_per_group, replicates, seed, workers),
+                                alpha)
+        rates.insert(0, parameter, value)
+        curves.append(rates)
+    return pd.concat(curves, ignore_index=True)
+
+
+if __name__ == "__main__":
+    from data_generate.data_generator import HybridCRMGenerator
+
+    parser = argparse.ArgumentParser(description="A/A false-positive rates and power curves by simulation")
+    parser.add_argument('--replicates', type=int, default=10_000)
+    parser.add_argument('--leads-per-group', type=int, default=2_000)
+    parser.add_argument('--parameter', default='outcome_rate',
+                        help="Group parameter that the test arm varies from control's for the power curve")
+    parser.add_argument('--values', type=float, nargs='+', default=[0.54, 0.57, 0.60, 0.63, 0.66])
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    print("🎲 Monte Carlo A/A and power simulation")
+    print("=" * 60)
+    generator = HybridCRMGenerator(seed=args.seed, batched=True)
+
+    start = time.perf_counter()
+    aa = simulate_aa(generator, args.leads_per_group, args.replicates, alpha=args.alpha, seed=args.seed,
+                     workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"⚡ {args.replicates:,} A/A experiments of {args.leads_per_group:,} leads per group in {elapsed:.1f}s "
+          f"({args.replicates / elapsed:,.0f} experiments/sec)")
+    print(f"\nFalse-positive rates at alpha={args.alpha}:")
+    print(aa[['metric', 'replicates', 'rejections', 'rejection_rate', 'standard_error']].round(4).to_string(index=False))
+
+    start = time.perf_counter()
+    curve = power_curve(generator, args.parameter, args.values, args.leads_per_group, args.replicates,
+                        args.alpha, args.seed, args.workers)
+    print(f"\n📈 Power by test {args.parameter} ({len(args.values)} x {args.replicates:,} experiments "
+          f"in {time.perf_counter() - start:.1f}s):")
+    print(curve.pivot(index=args.parameter, columns='metric', values='rejection_rate').round(3).to_string())
@@ -0,0 +1,259 @@
+"""
+Vectorized A/B significance tests for control vs test across every segment combination.
+One grouped query returns sufficient statistics (counts, sums, sums of squares) per group and
+finest segment cell; the cells are rolled up to every combination of the segment dimensions and
+all tests are evaluated at once on the resulting arrays, with multiple-comparison correction.
+Run from the data/ folder after dbt run: python -m analysis.significance
+"""
+
+import itertools
+import sqlite3
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+SEGMENT_DIMENSIONS = ['region', 'industry', 'source_channel', 'company_size']
+ALL_SEGMENTS = '(all)'  # Dimension value of rows rolled up over that dimension
+
+POSITIVE_RESPONSES = ('Responded', 'Interested', 'Callback Requested')
+# SQL list literal of POSITIVE_RESPONSES (quotes escaped, valid for any number of values)
+POSITIVE_RESPONSES_SQL = ', '.join("'" + response.replace("'", "''") + "'" for response in POSITIVE_RESPONSES)
+
+# One lead_metrics row per lead, from the cleaned stg_* models (runs on SQLite and DuckDB)
+LEAD_METRICS_SQL = f"""
+WITH lead_outcomes AS (
+    SELECT lead_id,
+           MAX(converted) AS converted,
+           SUM(revenue) AS revenue,
+           MIN(CASE WHEN converted = 1 THEN days_to_close END) AS days_to_close
+    FROM stg_outcomes
+    GROUP BY lead_id
+),
+lead_responses AS (
+    SELECT lead_id,
+           COUNT(*) AS contacts,
+           SUM(CASE WHEN response_type IN ({POSITIVE_RESPONSES_SQL}) THEN 1 ELSE 0 END) AS responses
+    FROM stg_contact_events
+    GROUP BY lead_id
+),
+lead_metrics AS (
+    SELECT l.lead_group,
+           l.region_clean AS region,
+           l.industry,
+           l.source_channel,
+           l.company_size_clean AS company_size,
+           SUBSTR(CAST(l.created_at_clean AS VARCHAR), 1, 10) AS created_date,
+           COALESCE(o.converted, 0) AS converted,
+           COALESCE(o.revenue, 0.0) AS revenue,
+           o.days_to_close,
+           COALESCE(r.contacts, 0) AS contacts,
+           COALESCE(r.responses, 0) AS responses
+    FROM stg_leads l
+    LEFT JOIN lead_outcomes o ON l.lead_id = o.lead_id
+    LEFT JOIN lead_responses r ON l.lead_id = r.lead_id
+)
+"""
+
+# STATISTIC_COLUMNS summed over lead_metrics rows
+STATISTIC_SUMS_SQL = """
+       COUNT(*) AS leads,
+       SUM(converted) AS conversions,
+       SUM(revenue) AS revenue_sum,
+       SUM(revenue * revenue) AS revenue_sum_sq,
+       COUNT(days_to_close) AS closed,
+       SUM(days_to_close) AS days_sum,
+       SUM(days_to_close * days_to_close) AS days_sum_sq,
+       SUM(contacts) AS contacts_sum,
+       SUM(contacts * contacts) AS contacts_sum_sq,
+       SUM(responses) AS responses_sum,
+       SUM(responses * responses) AS responses_sum_sq,
+       SUM(contacts * responses) AS contacts_responses_sum
+"""
+
+# Per group and finest segment cell
+CELL_STATISTICS_SQL = f"""{LEAD_METRICS_SQL}SELECT lead_group, region, industry, source_channel, company_size,{STATISTIC_SUMS_SQL}FROM lead_metrics
+GROUP BY lead_group, region, industry, source_channel, company_size
+"""
+
+STATISTIC_COLUMNS = [
+    'leads', 'conversions', 'revenue_sum', 'revenue_sum_sq', 'closed', 'days_sum', 'days_sum_sq',
+    'contacts_sum', 'contacts_sum_sq', 'responses_sum', 'responses_sum_sq', 'contacts_responses_sum'
+]
+
+
+def load_cell_statistics(conn):
+    """Run the grouped sufficient-statistics query on an open SQLite or DuckDB connection."""
+    cursor = conn.execute(CELL_STATISTICS_SQL)
+    cells = pd.DataFrame(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+    cells[SEGMENT_DIMENSIONS] = cells[SEGMENT_DIMENSIONS].fillna('Unknown')
+    cells[STATISTIC_COLUMNS] = cells[STATISTIC_COLUMNS].fillna(0).astype(float)
+    return cells
+
+
+def rollup_segments(cells, dimensions=SEGMENT_DIMENSIONS):
+    """Sum cell statistics up to every combination of the dimensions (a cube, ALL_SEGMENTS marks rolled-up ones)."""
+    rollups = []
+    for kept in itertools.product([True, False], repeat=len(dimensions)):
+        keys = [dimension for dimension, keep in zip(dimensions, kept) if keep]
+        rollup = cells.groupby(keys + ['lead_group'], as_index=False)[STATISTIC_COLUMNS].sum()
+        for dimension, keep in zip(dimensions, kept):
+            if not keep:
+                rollup[dimension] = ALL_SEGMENTS
+        rollups.append(rollup)
+    return pd.concat(rollups, ignore_index=True)[dimensions + ['lead_group'] + STATISTIC_COLUMNS]
+
+
+def chi_square_2x2(successes_a, n_a, successes_b, n_b):
+    """Pearson chi-square test of two proportions (no continuity correction), element-wise."""
+    total = n_a + n_b
+    successes = successes_a + successes_b
+    failures = total - successes
+    with np.errstate(divide='ignore', invalid='ignore'):
+        statistic = total * (successes_a * (n_b - successes_b) - successes_b * (n_a - successes_a)) ** 2 / (
+            n_a * n_b * successes * failures
+        )
+    return statistic, stats.chi2.sf(statistic, 1)
+
+
+def welch_t_test(n_a, sum_a, sum_sq_a, n_b, sum_b, sum_sq_b):
+    """Welch's unequal-variance t-test from counts, sums and sums of squares, element-wise."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_a, mean_b = sum_a / n_a, sum_b / n_b
+        var_a = np.maximum(sum_sq_a - sum_a * mean_a, 0) / (n_a - 1)
+        var_b = np.maximum(sum_sq_b - sum_b * mean_b, 0) / (n_b - 1)
+        se_a, se_b = var_a / n_a, var_b / n_b
+        statistic = (mean_b - mean_a) / np.sqrt(se_a + se_b)
+        df = (se_a + se_b) ** 2 / (se_a ** 2 / (n_a - 1) + se_b ** 2 / (n_b - 1))
+    return statistic, 2 * stats.t.sf(np.abs(statistic), df)
+
+
+def ratio_z_test(n_a, x_a, xx_a, y_a, yy_a, xy_a, n_b, x_b, xx_b, y_b, yy_b, xy_b):
+    """z-test of two ratio metrics sum(y)/sum(x) over units, with delta-method variances, element-wise."""
+    def ratio_and_variance(n, x, xx, y, yy, xy):
+        mean_x, mean_y = x / n, y / n
+        ratio = y / x
+        var_x = (xx - x * mean_x) / (n - 1)
+        var_y = (yy - y * mean_y) / (n - 1)
+        cov_xy = (xy - x * mean_y) / (n - 1)
+        return ratio, np.maximum(var_y - 2 * ratio * cov_xy + ratio ** 2 * var_x, 0) / (n * mean_x ** 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio_a, var_a = ratio_and_variance(n_a, x_a, xx_a, y_a, yy_a, xy_a)
+        ratio_b, var_b = ratio_and_variance(n_b, x_b, xx_b, y_b, yy_b, xy_b)
+        statistic = (ratio_b - ratio_a) / np.sqrt(var_a + var_b)
+    return statistic, 2 * stats.norm.sf(np.abs(statistic))
+
+
+def adjust_p_values(p_values, method='fdr_bh'):
+    """Multiple-comparison adjusted p-values ('fdr_bh', 'holm' or 'bonferroni'); NaNs are left out."""
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full(p_values.shape, np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    m = len(tested)
+    if m == 0:
+        return adjusted
+
+    order = tested[np.argsort(p_values[tested], kind='stable')]
+    ranked = p_values[order]
+    if method == 'fdr_bh':
+        # Benjamini-Hochberg: p * m / rank, made monotone from the largest p down
+        ranked = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    elif method == 'holm':
+        # Holm step-down: p * (m - rank + 1), made monotone from the smallest p up
+        ranked = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    elif method == 'bonferroni':
+        ranked = ranked * m
+    else:
+        raise ValueError(f"Unknown correction method: {method}")
+    adjusted[order] = np.minimum(ranked, 1.0)
+    return adjusted
+
+
+def metric_tests(control, test):
+    """Every metric's test of control vs test, from dicts of STATISTIC_COLUMNS arrays, element-wise.
+
+    Returns metric: (method, units, numerator, denominator, (statistic, p_value)).
+    """
+    conversion = chi_square_2x2(control['conversions'], control['leads'], test['conversions'], test['leads'])
+    revenue = welch_t_test(control['leads'], control['revenue_sum'], control['revenue_sum_sq'],
+                           test['leads'], test['revenue_sum'], test['revenue_sum_sq'])
+    days = welch_t_test(control['closed'], control['days_sum'], control['days_sum_sq'],
+                        test['closed'], test['days_sum'], test['days_sum_sq'])
+    response = ratio_z_test(
+        control['leads'], control['contacts_sum'], control['contacts_sum_sq'],
+        control['responses_sum'], control['responses_sum_sq'], control['contacts_responses_sum'],
+        test['leads'], test['contacts_sum'], test['contacts_sum_sq'],
+        test['responses_sum'], test['responses_sum_sq'], test['contacts_responses_sum']
+    )
+
+    return {
+        'conversion_rate': ('chi_square', 'leads', 'conversions', 'leads', conversion),
+        'revenue_per_lead': ('welch_t', 'leads', 'revenue_sum', 'leads', revenue),
+        'days_to_close': ('welch_t', 'closed', 'days_sum', 'closed', days),
+        'response_rate': ('delta_z', 'contacts_sum', 'responses_sum', 'contacts_sum', response)
+    }
+
+
+def run_significance_tests(segments, alpha=0.05, correction='fdr_bh', min_group_size=30):
+    """Test every metric for control vs test in every segment row of rolled-up statistics.
+
+    Returns one row per (metric, segment) with group sizes and values, lift, test statistic,
+    raw and adjusted p-values. Cells where either group has fewer than min_group_size units
+    are reported untested (NaN p-values) and left out of the correction. The correction is
+    applied per metric across segments.
+    """
+    wide = segments.set_index(SEGMENT_DIMENSIONS + ['lead_group'])[STATISTIC_COLUMNS].unstack('lead_group')
+    control = {column: wide[(column, 'control')].to_numpy() for column in STATISTIC_COLUMNS}
+    test = {column: wide[(column, 'test')].to_numpy() for column in STATISTIC_COLUMNS}
+
+    metrics = metric_tests(control, test)
+
+    results = []
+    for metric, (method, units, numerator, denominator, (statistic, p_value)) in metrics.items():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            control_value = control[numerator] / control[denominator]
+            test_value = test[numerator] / test[denominator]
+        testable = (np.nan_to_num(control[units]) >= min_group_size) & (np.nan_to_num(test[units]) >= min_group_size)
+        p_value = np.where(testable & np.isfinite(statistic), p_value, np.nan)
+
+        result = wide.index.to_frame(index=False)
+        result.insert(0, 'metric', metric)
+        result['method'] = method
+        result['n_control'] = control[units]
+        result['n_test'] = test[units]
+        result['control_value'] = control_value
+        result['test_value'] = test_value
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['lift'] = test_value / control_value - 1
+        result['statistic'] = np.where(np.isnan(p_value), np.nan, statistic)
+        result['p_value'] = p_value
+        result['p_adjusted'] = adjust_p_values(p_value, correction)
+        result['significant'] = result['p_adjusted'] < alpha
+        results.append(result)
+
+    return pd.concat(results, ignore_index=True)
+
+
+def segment_significance(conn, alpha=0.05, correction='fdr_bh', min_group_size=30):
+    """Load cell statistics from the stg_* models and test every metric in every segment combination."""
+    return run_significance_tests(rollup_segments(load_cell_statistics(conn)), alpha, correction, min_group_size)
+
+
+if __name__ == "__main__":
+    print("🧪 A/B significance across all segment combinations")
+    print("=" * 60)
+
+    conn = sqlite3.connect('./db/abxplore.db')
+    results = segment_significance(conn)
+    conn.close()
+
+    overall = results[(results[SEGMENT_DIMENSIONS] == ALL_SEGMENTS).all(axis=1)]
+    print(overall[['metric', 'method', 'n_control', 'n_test', 'control_value', 'test_value', 'lift', 'p_value']].to_string(index=False))
+
+    tested = results['p_value'].notna()
+    print(f"\n📊 {int(tested.sum()):,} tests across {len(results) // 4:,} segments "
+          f"({int((~tested).sum()):,} too small to test)")
+    for metric, metric_results in results.groupby('metric', sort=False):
+        print(f"   {metric}: {int(metric_results['significant'].sum()):,} significant after FDR correction")
@@ -0,0 +1,70 @@
+"""
+Load the raw CRM tables or the stg_* models into DataFrames for ad hoc analysis.
+With compact=True rows are read in chunks straight into the compact representation of
+data_generate.compact: int64 surrogate keys shared across tables, categoricals and datetime64 dates.
+Run from the data/ folder after generating data (and dbt run for stg_*): python -m analysis.tables
+"""
+
+import sqlite3
+import time
+
+import pandas as pd
+
+from data_generate.compact import SurrogateKeys, compact_frame, concat_frames, memory_usage_mb
+
+
+RAW_TABLES = ['leads', 'contact_events', 'funnel_stages', 'outcomes']
+STAGING_MODELS = ['stg_leads', 'stg_contact_events', 'stg_funnel_stages', 'stg_outcomes']
+
+
+def load_table(conn, name, compact=True, keys=None, chunk_size=100000):
+    """Read one table or model from an open SQLite or DuckDB connection.
+
+    In compact mode each chunk is converted as it arrives, so the text form of the whole
+    table is never held at once; keys (a SurrogateKeys) is shared to keep keys consistent across tables.
+    """
+    cursor = conn.execute(f'SELECT * FROM "{name}"')
+    columns = [column[0] for column in cursor.description]
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunk = pd.DataFrame(rows, columns=columns)
+        chunks.append(compact_frame(chunk, keys) if compact else chunk)
+
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return concat_frames(chunks) if compact else pd.concat(chunks, ignore_index=True)
+
+
+def load_tables(conn, names=RAW_TABLES, compact=True, keep_uuids=False, chunk_size=100000):
+    """Read several tables or models; with keep_uuids (compact mode) add the key -> UUID side table as 'uuid_map'.
+
+    Leads come first in RAW_TABLES/STAGING_MODELS, so lead keys follow the lead table's row order.
+    """
+    keys = SurrogateKeys() if compact else None
+    tables = {name: load_table(conn, name, compact, keys, chunk_size) for name in names}
+    if compact and keep_uuids:
+        tables['uuid_map'] = keys.side_table()
+    return tables
+
+
+if __name__ == "__main__":
+    print("📥 Loading raw tables and stg_* models")
+    print("=" * 60)
+
+    conn = sqlite3.connect('./db/abxplore.db')
+    has_staging = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'stg_leads'").fetchone()[0] > 0
+    for names in [RAW_TABLES] + ([STAGING_MODELS] if has_staging else []):
+        for compact in [False, True]:
+            start = time.perf_counter()
+            tables = load_tables(conn, names, compact=compact)
+            seconds = time.perf_counter() - start
+            sizes = memory_usage_mb(tables)
+            print(f"\n{'🗜️ compact' if compact else '📄 text'}: {sum(len(df) for df in tables.values()):,} rows "
+                  f"in {seconds:.1f}s, {sum(sizes.values()):,.1f} MB")
+            for name, size in sizes.items():
+                print(f"   {name}: {size:,.1f} MB")
+            del tables
+    conn.close()
@@ -0,0 +1 @@
+"""ABXplore CRM data generation."""
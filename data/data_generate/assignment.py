@@ -0,0 +1,100 @@
+"""
+Deterministic experiment assignment: a unit's variant is a bucket of a salted hash of its id.
+Assignment is vectorized over arrays of ids and depends only on the id and the experiment, never on
+which other units are in the batch, so streaming chunks, shards and daily deltas all agree.
+Several experiments can run at once; each has its own salt, so their splits are independent.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Experiment:
+    """One experiment: variant names, traffic weights and a salt (default: the experiment name).
+
+    Units created before start (when given) all get the first variant, as the pre-launch baseline.
+    """
+    name: str
+    variants: tuple = ('control', 'test')
+    weights: tuple = (0.5, 0.5)
+    salt: str = None
+    start: datetime = None
+
+    def __post_init__(self):
+        if len(self.variants) != len(self.weights):
+            raise ValueError(f"Experiment {self.name}: {len(self.variants)} variants but {len(self.weights)} weights")
+        if min(self.weights) < 0 or not np.isclose(sum(self.weights), 1.0):
+            raise ValueError(f"Experiment {self.name}: weights must be non-negative and sum to 1")
+        if self.salt is None:
+            object.__setattr__(self, 'salt', self.name)
+
+
+def _mix64(values):
+    """SplitMix64 finalizer: spreads every input bit over all 64 output bits."""
+    values = values.astype(np.uint64, copy=True)
+    values ^= values >> np.uint64(30)
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94D049BB133111EB)
+    values ^= values >> np.uint64(31)
+    return values
+
+
+def unit_hashes(units, salt):
+    """Salted 64-bit hashes of unit ids: integer ids are mixed directly, anything else by its string value."""
+    units = np.asarray(units)
+    digest = hashlib.blake2b(salt.encode('utf-8'), digest_size=8)
+    if units.dtype.kind in 'iu':
+        return _mix64(units.astype(np.uint64) + np.uint64(int.from_bytes(digest.digest(), 'little')))
+    # SipHash keyed by the salt; UUID ids are unique, so factorizing first would only cost time
+    if units.dtype != object:
+        units = units.astype(str).astype(object)
+    return pd.util.hash_array(units, hash_key=digest.hexdigest(), categorize=False)
+
+
+def bucket(hashes, weights):
+    """Variant index per hash: the hash's position in [0, 1) against the cumulative weights."""
+    position = (hashes >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+    return np.searchsorted(np.cumsum(weights)[:-1], position, side='right').astype(np.int8)
+
+
+class AssignmentService:
+    """Assigns units to the variants of registered experiments; experiments must have distinct salts."""
+
+    def __init__(self, experiments=()):
+        self.experiments = {}
+        for experiment in experiments:
+            self.add(experiment)
+
+    def add(self, experiment):
+        if experiment.name in self.experiments:
+            raise ValueError(f"Experiment {experiment.name} is already registered")
+        if any(other.salt == experiment.salt for other in self.experiments.values()):
+            raise ValueError(f"Experiment {experiment.name} reuses the salt {experiment.salt!r}")
+        self.experiments[experiment.name] = experiment
+
+    def assign(self, name, units, created_at=None):
+        """Variant index (int8) per unit; created_at (datetime64 values) applies the experiment's start date."""
+        experiment = self.experiments[name]
+        codes = bucket(unit_hashes(units, experiment.salt), experiment.weights)
+        if experiment.start is not None and created_at is not None:
+            codes[np.asarray(created_at, dtype='datetime64[s]') < np.datetime64(experiment.start, 's')] = 0
+        return codes
+
+    def variants(self, name, units, created_at=None):
+        """Variant name per unit, as an object array."""
+        return np.array(self.experiments[name].variants, dtype=object)[self.assign(name, units, created_at)]
+
+    def assign_frame(self, df, unit_column, created_column=None):
+        """One column of variant names per registered experiment, for the rows of df."""
+        created_at = None
+        if created_column is not None:
+            created_at = pd.to_datetime(df[created_column]).to_numpy()
+        units = df[unit_column].to_numpy()
+        return pd.DataFrame({name: self.variants(name, units, created_at) for name in self.experiments},
+                            index=df.index)
@@ -0,0 +1,276 @@
+"""
+Benchmark suite for the generator stages, the raw-data writers and the stg_* models.
+Each stage runs on its own at every scale and records wall time, rows/sec and peak memory;
+results go to a JSON file and are compared against a stored baseline to flag regressions.
+The baseline is machine-specific and not committed: store one per machine with --save-baseline.
+Every scale runs in a fresh process, so scales do not share memory or caches.
+Run from the data/ folder: python -m data_generate.benchmarks --scales 10000 100000 [--repeats 3] [--save-baseline]
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import psutil
+
+from data_generate.compact import peak_rss_mb
+from data_generate.fault_injection import inject_faults
+from data_generate.sqlite_loader import SQLiteBulkLoader
+from data_generate.staging_sql import STAGING_MODELS, render_model
+
+
+SCALES = [10_000, 100_000, 1_000_000, 10_000_000]
+BENCHMARK_DIR = Path('./benchmarks')
+
+# A stage regresses when it is slower (or uses more memory) than its baseline by more than the
+# tolerance; differences below the noise floors never count as regressions
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+MIN_SECONDS = 0.05
+MIN_MEMORY_MB = 5.0
+
+
+class _PeakRSS:
+    """Samples the process RSS on a background thread while active; peak_mb is the rise over the start.
+
+    Sampling (instead of tracemalloc) keeps timings undistorted and also sees SQLite's own memory.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak_mb = 0.0
+
+    def __enter__(self):
+        self._start = self._peak = self.process.memory_info().rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, self.process.memory_info().rss)
+        self.peak_mb = (self._peak - self._start) / 1e6
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, self.process.memory_info().rss)
+
+
+def _measure(stage, n_leads, run, count=len):
+    """Run one stage and return (its result, its benchmark record); count(result) gives the rows processed."""
+    gc.collect()
+    with _PeakRSS() as memory:
+        start = time.perf_counter()
+        result = run()
+        seconds = time.perf_counter() - start
+
+    rows = count(result)
+    return result, {
+        'stage': stage,
+        'n_leads': n_leads,
+        'rows': int(rows),
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds > 0 else None,
+        'peak_memory_mb': memory.peak_mb,
+        'process_peak_rss_mb': peak_rss_mb()  # Peak RSS of the process so far (jumps at the stage that raised it)
+    }
+
+
+def benchmark_scale(n_leads, seed=42, compact=False, work_dir=BENCHMARK_DIR / 'work'):
+    """Run every stage once at one scale and return its benchmark records.
+
+    Stages run in pipeline order on the batched engines, each taking the previous stages' output.
+    Fault injectors run one FaultSpec at a time; the writers and stg_* models use work_dir.
+    """
+    from data_generate.data_generator import HybridCRMGenerator
+
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    db_path = work_dir / 'benchmark.db'
+    db_path.unlink(missing_ok=True)
+
+    generator = HybridCRMGenerator(seed=seed, batched=True, compact=compact)
+    generator.as_of = datetime(2025, 6, 30)  # Fixed cutoff: row counts do not drift between runs
+    rng = np.random.default_rng(seed)
+    records = []
+
+    def stage(name, run, count=len):
+        result, record = _measure(name, n_leads, run, count)
+        records.append(record)
+        return result
+
+    leads_df = stage('leads', lambda: generator._generate_leads_batched(n_leads, rng))
+    leads_df = stage('group_assignment', lambda: generator._add_test_group_logic(leads_df))
+    contact_events_df, contacted_lead_ids = stage(
+        'contact_events', lambda: generator._generate_contact_events_batched(leads_df, rng),
+        count=lambda result: len(result[0])
+    )
+    funnel_stages_df = stage(
+        'funnel_stages', lambda: generator._generate_funnel_stages_batched(leads_df, contacted_lead_ids, rng)
+    )
+    outcomes_df = stage('outcomes', lambda: generator._generate_outcomes(leads_df, funnel_stages_df, rng))
+    tables = {
+        'leads': leads_df,
+        'contact_events': contact_events_df,
+        'funnel_stages': funnel_stages_df,
+        'outcomes': outcomes_df
+    }
+
+    # Rows processed by an injector: the whole table it samples from
+    manifests = [
+        stage(f'fault:{spec.name}', lambda: inject_faults(tables, [spec], rng),
+              count=lambda _: len(tables[spec.table]))
+        for spec in generator._data_quality_fault_specs()
+    ]
+    tables['fault_manifest'] = pd.concat(manifests, ignore_index=True)
+    total_rows = sum(len(df) for df in tables.values())
+
+    def write_database():
+        with SQLiteBulkLoader(db_path) as loader:
+            loader.load(tables)
+
+    def write_csv():
+        for name, df in tables.items():
+            df.to_csv(work_dir / f'{name}.csv', index=False)
+
+    stage('sqlite_write', write_database, count=lambda _: total_rows)
+    stage('csv_write', write_csv, count=lambda _: total_rows)
+
+    # Each stg_* model is materialized as a table, as dbt run does on the sqlite target
+    with SQLiteBulkLoader(db_path) as loader:
+        for model in STAGING_MODELS:
+            sql = render_model(model)
+            loader.conn.execute(f'DROP TABLE IF EXISTS "{model}"')
+            stage(model, lambda: loader.conn.execute(f'CREATE TABLE "{model}" AS\n{sql}\n'),
+                  count=lambda _: loader.conn.execute(f'SELECT COUNT(*) FROM "{model}"').fetchone()[0])
+
+    return records
+
+
+def _best_of(runs):
+    """Combine repeated runs of one scale: fastest time and rows/sec, largest peak memory per stage."""
+    best = []
+    for stage_runs in zip(*runs):
+        record = dict(min(stage_runs, key=lambda run: run['seconds']))
+        record['peak_memory_mb'] = max(run['peak_memory_mb'] for run in stage_runs)
+        record['process_peak_rss_mb'] = max(run['process_peak_rss_mb'] for run in stage_runs)
+        best.append(record)
+    return best
+
+
+def run_benchmarks(scales=SCALES, seed=42, compact=False, repeats=1):
+    """Benchmark every scale (repeats times, each in a fresh process); return the results document."""
+    spawn = multiprocessing.get_context('spawn')
+    records = []
+    for n_leads in scales:
+        print(f"⏱️ Benchmarking {n_leads:,} leads...")
+        runs = []
+        for _ in range(repeats):
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                runs.append(pool.submit(benchmark_scale, n_leads, seed, compact).result())
+        scale_records = _best_of(runs)
+        records.extend(scale_records)
+        print(f"   {sum(record['seconds'] for record in scale_records):.1f}s over {len(scale_records)} stages, "
+              f"peak RSS {scale_records[-1]['process_peak_rss_mb']:,.0f} MB")
+
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'compact': compact,
+        'repeats': repeats,
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor()
+        },
+        'records': records
+    }
+
+
+def save_results(results, path):
+    """Write a results document as JSON."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+
+
+def load_results(path):
+    """Read a results document written by save_results."""
+    return json.loads(Path(path).read_text())
+
+
+def compare_to_baseline(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE,
+                        min_seconds=MIN_SECONDS, min_memory_mb=MIN_MEMORY_MB):
+    """One row per (stage, scale) in both documents, with ratios to the baseline and a regression flag."""
+    current = pd.DataFrame(results['records'])
+    previous = pd.DataFrame(baseline['records'])
+    merged = current.merge(previous, on=['stage', 'n_leads'], suffixes=('', '_baseline'))
+
+    merged['time_ratio'] = merged['seconds'] / merged['seconds_baseline']
+    merged['memory_ratio'] = merged['peak_memory_mb'] / merged['peak_memory_mb_baseline']
+    slower = (merged['time_ratio'] > 1 + time_tolerance) & (merged['seconds'] - merged['seconds_baseline'] > min_seconds)
+    larger = ((merged['memory_ratio'] > 1 + memory_tolerance)
+              & (merged['peak_memory_mb'] - merged['peak_memory_mb_baseline'] > min_memory_mb))
+    merged['regression'] = slower | larger
+    return merged[['stage', 'n_leads', 'rows', 'seconds', 'seconds_baseline', 'time_ratio',
+                   'peak_memory_mb', 'peak_memory_mb_baseline', 'memory_ratio', 'regression']]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark generator stages, writers and stg_* models")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES, help="Lead counts to benchmark")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--compact', action='store_true', help="Benchmark the compact representation")
+    parser.add_argument('--repeats', type=int, default=1, help="Runs per scale; the fastest time per stage is kept")
+    parser.add_argument('--output', type=Path, default=BENCHMARK_DIR / 'results.json')
+    parser.add_argument('--baseline', type=Path, default=BENCHMARK_DIR / 'baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    print("🏁 ABXplore benchmark suite")
+    print("=" * 60)
+
+    results = run_benchmarks(args.scales, args.seed, args.compact, args.repeats)
+    save_results(results, args.output)
+    print(f"\n📄 Results saved to: {args.output}")
+
+    table = pd.DataFrame(results['records'])
+    print(table[['stage', 'n_leads', 'rows', 'seconds', 'rows_per_sec', 'peak_memory_mb']].round(3).to_string(index=False))
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"📌 Baseline saved to: {args.baseline}")
+    elif args.baseline.exists():
+        baseline = load_results(args.baseline)
+        if baseline['compact'] != results['compact']:
+            print("⚠️ The baseline was recorded with a different representation (--compact)")
+        comparison = compare_to_baseline(results, baseline)
+        regressions = comparison[comparison['regression']]
+        print(f"\n📊 Compared {len(comparison)} stages with the baseline ({args.baseline})")
+        if len(regressions):
+            print(f"⚠️ {len(regressions)} regressions:")
+            print(regressions.round(3).to_string(index=False))
+            sys.exit(1)
+        if comparison.empty:
+            print("⚠️ No stage and scale in common with the baseline: NO regression check was done")
+        else:
+            print("✅ No regressions")
+    else:
+        # Baselines are machine-specific and not committed, so say loudly that nothing was checked
+        print(f"⚠️ No baseline at {args.baseline}: NO regression check was done. "
+              "Run with --save-baseline on this machine to store one")
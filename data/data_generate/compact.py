@@ -0,0 +1,220 @@
+"""
+Compact in-memory representation of the generated CRM tables.
+Dense int64 surrogate keys stand in for the 36-character UUID keys (a side table maps them back),
+low-cardinality text columns are pandas categoricals and dates are datetime64 columns.
+Run from the data/ folder to compare peak memory of both representations: python -m data_generate.compact
+"""
+
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+# Key columns and the table whose keys they hold (raw tables and stg_* models share the names;
+# fault_manifest.row_id holds the key of the table named in its "table" column)
+KEY_COLUMNS = {
+    'lead_id': 'leads',
+    'event_id': 'contact_events',
+    'stage_id': 'funnel_stages',
+    'outcome_id': 'outcomes'
+}
+
+# Low-cardinality text columns held as categoricals (raw and stg_* names)
+CATEGORICAL_COLUMNS = {
+    'industry', 'region', 'region_clean', 'source_channel', 'company_size', 'company_size_clean',
+    'group', 'lead_group', 'contact_type', 'response_type', 'stage_name', 'stage_category',
+    'table', 'fault', 'column'
+}
+
+# Date columns held as datetime64, and whether their ISO text form carries the time of day
+DATETIME_COLUMNS = {
+    'created_at': True, 'created_at_clean': True, 'assigned_at': False, 'event_date': False,
+    'stage_date': False, 'outcome_date': False, 'arrival_date': False
+}
+
+MISSING_KEY = -1
+
+# Precomputed ' HH:MM:SS' suffixes for every second of the day (batched formatting)
+_SECONDS_OF_DAY = np.arange(86400)
+_TIME_OF_DAY_LABELS = np.array(
+    [f' {h:02d}:{m:02d}:{s:02d}' for h, m, s in
+     zip(_SECONDS_OF_DAY // 3600, _SECONDS_OF_DAY // 60 % 60, _SECONDS_OF_DAY % 60)],
+    dtype=object
+)
+
+
+def format_datetimes(values, with_time=True):
+    """Format datetime64 values as 'YYYY-MM-DD[ HH:MM:SS]' strings without per-row strftime (NaT -> None)."""
+    values = np.asarray(values)
+    missing = np.isnat(values)
+    labels = np.full(len(values), None, dtype=object)
+    seconds = values[~missing].astype('datetime64[s]')
+    days = seconds.astype('datetime64[D]')
+    day_numbers = days.astype(np.int64)
+    if len(day_numbers) == 0:
+        return labels
+
+    # Label each distinct calendar day once, then index into the labels
+    first_day = day_numbers.min()
+    day_range = np.arange(first_day, day_numbers.max() + 1).astype('datetime64[D]')
+    day_labels = np.datetime_as_string(day_range).astype(object)
+    present = day_labels[day_numbers - first_day]
+
+    if with_time:
+        present = present + _TIME_OF_DAY_LABELS[(seconds - days).astype(np.int64)]
+    labels[~missing] = present
+    return labels
+
+
+def as_text(df):
+    """Copy of a table with its datetime64 columns as ISO text, for writers that store dates as strings."""
+    datetime_columns = [column for column in df.columns if df[column].dtype.kind == 'M']
+    if not datetime_columns:
+        return df
+    df = df.copy()
+    for column in datetime_columns:
+        df[column] = format_datetimes(df[column].to_numpy(), with_time=DATETIME_COLUMNS.get(column, True))
+    return df
+
+
+class SurrogateKeys:
+    """Dense int64 surrogate keys per key table, remembering the UUID each key stands for."""
+
+    def __init__(self):
+        self._uuids = {}  # table -> list of UUID arrays, concatenated in key order
+        self._index = {}  # table -> pd.Index over all UUIDs (rebuilt after new keys)
+
+    def size(self, table):
+        return sum(len(uuids) for uuids in self._uuids.get(table, []))
+
+    def encode(self, table, uuids):
+        """Keys for UUID values, assigning the next free keys to unseen values (missing -> MISSING_KEY)."""
+        uuids = np.asarray(uuids, dtype=object)
+        keys = self._lookup(table).get_indexer(uuids).astype(np.int64)
+        unseen = (keys == -1) & pd.notna(uuids)
+        if unseen.any():
+            new_uuids = pd.unique(uuids[unseen])
+            start = self.size(table)
+            self._uuids.setdefault(table, []).append(new_uuids)
+            self._index.pop(table, None)
+            keys[unseen] = start + pd.Index(new_uuids).get_indexer(uuids[unseen])
+        keys[pd.isna(uuids)] = MISSING_KEY
+        return keys
+
+    def decode(self, table, keys):
+        """UUID strings for keys (MISSING_KEY -> None)."""
+        keys = np.asarray(keys, dtype=np.int64)
+        uuids = np.full(len(keys), None, dtype=object)
+        present = keys != MISSING_KEY
+        uuids[present] = self._lookup(table).to_numpy()[keys[present]]
+        return uuids
+
+    def side_table(self):
+        """The key -> UUID side table: one row per (table, key)."""
+        frames = [
+            pd.DataFrame({'table': table, 'key': np.arange(self.size(table), dtype=np.int64),
+                          'uuid': self._lookup(table).to_numpy()})
+            for table in self._uuids
+        ]
+        if not frames:
+            return pd.DataFrame({'table': pd.Categorical([]), 'key': np.array([], dtype=np.int64), 'uuid': []})
+        side_table = pd.concat(frames, ignore_index=True)
+        side_table['table'] = side_table['table'].astype('category')
+        return side_table
+
+    def _lookup(self, table):
+        if table not in self._index:
+            chunks = self._uuids.get(table, [])
+            self._index[table] = pd.Index(np.concatenate(chunks) if chunks else np.array([], dtype=object))
+        return self._index[table]
+
+
+def compact_frame(df, keys=None):
+    """Convert a text-form table (CSV or database rows) to the compact representation.
+
+    Key columns are encoded through keys (a SurrogateKeys, shared across tables so child rows
+    get their lead's key); without keys they are left as they are.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in KEY_COLUMNS and keys is not None:
+            df[column] = keys.encode(KEY_COLUMNS[column], df[column].to_numpy())
+        elif column == 'row_id' and keys is not None and 'table' in df.columns:
+            row_ids = df[column].to_numpy(dtype=object)
+            encoded = np.full(len(df), MISSING_KEY, dtype=np.int64)
+            for table in pd.unique(df['table'].astype(object)):
+                rows = (df['table'] == table).to_numpy()
+                encoded[rows] = keys.encode(table, row_ids[rows])
+            df[column] = encoded
+        elif column in CATEGORICAL_COLUMNS and df[column].dtype == object:
+            df[column] = df[column].astype('category')
+        elif column in DATETIME_COLUMNS and df[column].dtype == object:
+            # Dates are ISO text ('YYYY-MM-DD[ HH:MM:SS]'); unparseable values become NaT
+            df[column] = pd.to_datetime(df[column], format='ISO8601', errors='coerce').astype('datetime64[s]')
+    return df
+
+
+def concat_frames(frames):
+    """Concatenate compact chunks, unioning categories (a plain concat turns mismatched categoricals into object)."""
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals(parts, ignore_order=True)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def memory_usage_mb(tables):
+    """Deep in-memory size of each table in MB (object columns include their Python strings)."""
+    return {name: df.memory_usage(deep=True).sum() / 1e6 for name, df in tables.items()}
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB (Unix)."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3  # Bytes on macOS, KB on Linux
+
+
+def measure_generation(n_leads, compact, keep_uuids=False, seed=42):
+    """Generate n_leads (with child tables and faults) in memory and report sizes and peak RSS.
+
+    Run it in a fresh process per representation: peak RSS only ever grows within a process.
+    """
+    from data_generate.data_generator import HybridCRMGenerator
+
+    generator = HybridCRMGenerator(seed=seed, batched=True, compact=compact, keep_uuids=keep_uuids)
+    start = time.perf_counter()
+    tables = generator._generate_chunk(n_leads, np.random.SeedSequence(seed))
+    return {
+        'seconds': time.perf_counter() - start,
+        'rows': {name: len(df) for name, df in tables.items()},
+        'memory_mb': memory_usage_mb(tables),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+if __name__ == "__main__":
+    print("🗜️ Compact vs text representation of the generated tables")
+    print("=" * 60)
+
+    n_leads = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    modes = {'text (UUID strings)': dict(compact=False), 'compact': dict(compact=True),
+             'compact + UUID side table': dict(compact=True, keep_uuids=True)}
+    spawn = multiprocessing.get_context('spawn')
+
+    for label, options in modes.items():
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            result = pool.submit(measure_generation, n_leads, **options).result()
+        print(f"\n📦 {label}: {n_leads:,} leads generated in {result['seconds']:.1f}s, "
+              f"peak RSS {result['peak_rss_mb']:,.0f} MB")
+        for name, size in result['memory_mb'].items():
+            print(f"   {name}: {result['rows'][name]:,} rows, {size:,.1f} MB")
+        print(f"   total: {sum(result['memory_mb'].values()):,.1f} MB")
@@ -0,0 +1,69 @@
+"""
+Wall time per stg_* model on SQLite versus in-process DuckDB.
+SQLite runs against the generator's database; DuckDB scans the raw CSV (and Parquet, when present)
+outputs directly, the same way the dbt duckdb target does through meta.external_location.
+
+Run from the data/ folder after generating data: python -m data_generate.compare_engines
+"""
+
+import sqlite3
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from data_generate.staging_sql import STAGING_MODELS, time_staging_models
+
+
+SOURCE_TABLES = ['leads', 'contact_events', 'funnel_stages', 'outcomes']
+
+
+def raw_relations(raw_format='csv', csv_dir='./raw_data', parquet_dir='./raw_parquet'):
+    """DuckDB relations that read each source table's generator output in place."""
+    if raw_format == 'parquet':
+        return {
+            table: f"read_parquet('{(Path(parquet_dir) / table / '**' / '*.parquet').as_posix()}', hive_partitioning = true)"
+            for table in SOURCE_TABLES
+        }
+    return {table: f"read_csv('{(Path(csv_dir) / f'{table}.csv').as_posix()}', header = true)" for table in SOURCE_TABLES}
+
+
+def compare_engines(db_path='./db/abxplore.db', csv_dir='./raw_data', parquet_dir='./raw_parquet'):
+    """Build every staging model on each engine and return rows and seconds per model and engine."""
+    runs = {}
+
+    conn = sqlite3.connect(db_path)
+    runs['sqlite'] = time_staging_models(conn, 'sqlite')
+    conn.close()
+
+    con = duckdb.connect()
+    runs['duckdb_csv'] = time_staging_models(con, 'duckdb', raw_relations('csv', csv_dir=csv_dir))
+    if Path(parquet_dir).exists():
+        runs['duckdb_parquet'] = time_staging_models(con, 'duckdb', raw_relations('parquet', parquet_dir=parquet_dir))
+    con.close()
+
+    rows = []
+    for engine, timings in runs.items():
+        for model in STAGING_MODELS:
+            model_rows, seconds = timings[model]
+            rows.append({'model': model, 'engine': engine, 'rows': model_rows, 'seconds': seconds})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print("⏱️ Comparing stg_* model wall time: SQLite vs DuckDB")
+    print("=" * 60)
+
+    results = compare_engines()
+    seconds = results.pivot(index='model', columns='engine', values='seconds').loc[STAGING_MODELS]
+    for engine in seconds.columns.drop('sqlite'):
+        seconds[f'speedup_{engine}'] = seconds['sqlite'] / seconds[engine]
+
+    # Row counts must agree across engines for the comparison to be meaningful
+    row_counts = results.pivot(index='model', columns='engine', values='rows')
+    mismatched = row_counts[row_counts.nunique(axis=1) > 1]
+
+    print(seconds.round(3).to_string())
+    print("\n📊 Total: " + " | ".join(f"{engine} {seconds[engine].sum():.2f}s" for engine in results['engine'].unique()))
+    if len(mismatched):
+        print(f"⚠️ Row counts differ between engines:\n{mismatched.to_string()}")
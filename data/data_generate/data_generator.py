@@ -2,32 +2,93 @@
 CRM Data Simulation for ABXplore A/B Testing
 B2B SaaS company testing new lead onboarding process launched June 1st, 2024.
 VERSION: Saves to both DATABASE and CSV files in raw_data folder
+Run from the data/ folder: python -m data_generate.data_generator
 """
 
 import pandas as pd
 import numpy as np
-import sqlite3
 from faker import Faker
 from datetime import datetime, timedelta
 import random
+import shutil
+import time
 import uuid
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from data_generate.assignment import AssignmentService, Experiment
+from data_generate.compact import format_datetimes
+from data_generate.fault_injection import (
+    TABLE_KEYS, FaultSpec, inject_faults, pick, append_choice, constant, vary, negate
+)
+from data_generate.identity import IdentityProvider
+from data_generate.instrumentation import Instrumentation, file_sizes
+from data_generate.parquet_io import write_parquet
+from data_generate.sqlite_loader import SQLiteBulkLoader, accumulate_stats, report_load
+from data_generate.staging_sql import time_staging_models
+
+
+def _uuid4_bytes(rng, n):
+    """Draw the 16 bytes of n random (version 4) UUIDs from a NumPy generator."""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # Version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return raw
+
+
+def _uuid4_strings(raw):
+    """Format UUID bytes (from _uuid4_bytes) as 36-character UUID strings."""
+    n = len(raw)
+    hex_digits = np.frombuffer(raw.tobytes().hex().encode('ascii'), dtype=np.uint8).reshape(n, 32)
+    chars = np.full((n, 36), ord('-'), dtype=np.uint8)
+    chars[:, :8] = hex_digits[:, :8]
+    chars[:, 9:13] = hex_digits[:, 8:12]
+    chars[:, 14:18] = hex_digits[:, 12:16]
+    chars[:, 19:23] = hex_digits[:, 16:20]
+    chars[:, 24:] = hex_digits[:, 20:]
+    return chars.astype(np.uint32).view('U36').ravel().astype(object)
+
+
 class HybridCRMGenerator:
 
     
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, batched=False, parquet=False, compact=False, keep_uuids=False, instrumentation=None):
         self.fake = Faker()
         Faker.seed(seed)
         np.random.seed(seed)
         random.seed(seed)
         
+        # Batched mode draws whole columns from a seeded NumPy generator instead of per-row loops
+        self.seed = seed
+        self.batched = batched or compact
+        self.rng = np.random.default_rng(seed)
+        
+        # Batched engines compose company names, emails and phones from token pools (Faker builds the pools once).
+        # Emails are unique except for exactly duplicate_email_rate of each batch (dropped by the stg_leads dedup).
+        self.identities = IdentityProvider(seed)
+        self.duplicate_email_rate = 0.01
+        
+        # Compact mode (batched engines only): dense int64 surrogate keys instead of UUID strings,
+        # categorical text columns and datetime64 dates; keep_uuids adds the key -> UUID side table
+        self.compact = compact
+        self.keep_uuids = keep_uuids
+        self._key_counts = {}
+        self._uuid_maps = []
+        
+        # Per-stage records (timing, rows, bytes written, RSS) go to the instrumentation's sinks
+        self.instrumentation = instrumentation or Instrumentation()
+        
         # Real business scenario parameters
         self.total_leads = 10000
         self.test_start_date = datetime(2024, 6, 1)  # When new process launched
         self.data_start_date = datetime(2024, 1, 1)  # CRM data starts here
         
+        # Groups bucket a salted hash of lead_id: a lead gets the same group in any batch, chunk or shard
+        self.experiment = Experiment('onboarding_2024', variants=('control', 'test'), weights=(0.5, 0.5),
+                                     start=self.test_start_date)
+        self.assignment = AssignmentService([self.experiment])
+        
         # Realistic CRM structure
         self.regions = ['North America', 'Europe', 'Asia Pacific', 'Latin America']
         self.channels = ['Website', 'Google Ads', 'LinkedIn', 'Referral', 'Cold Email', 'Trade Show', 'Webinar']
@@ -35,6 +96,30 @@ class HybridCRMGenerator:
         self.contact_types = ['Email', 'Phone Call', 'LinkedIn Message', 'Demo Request']
         self.response_types = ['Responded', 'No Response', 'Interested', 'Not Interested', 'Callback Requested']
         self.stages = ['New', 'Contacted', 'Qualified', 'Demo Scheduled', 'Proposal Sent', 'Closed Won', 'Closed Lost']
+        self.company_sizes = ['Small', 'Medium', 'Large', 'Enterprise']
+        self.company_size_probabilities = [0.4, 0.3, 0.2, 0.1]
+        self.company_size_revenue_multipliers = {'Small': 0.4, 'Medium': 0.7, 'Large': 1.0, 'Enterprise': 2.2}
+        
+        # Group-specific behaviour used by the batched engines and outcome generation
+        self.group_params = {
+            'control': {'contact_probability': 0.85, 'avg_contacts': 4.0, 'response_boost': 1.0,
+                        'funnel_entry_rate': 0.65, 'outcome_rate': 0.54, 'revenue_multiplier_mean': 1.0},
+            'test': {'contact_probability': 0.90, 'avg_contacts': 4.5, 'response_boost': 1.4,
+                     'funnel_entry_rate': 0.70, 'outcome_rate': 0.60, 'revenue_multiplier_mean': 1.3}
+        }
+        self.outcome_size_multipliers = {'Small': 1.0, 'Medium': 1.5, 'Large': 2.5, 'Enterprise': 4.0}
+        self.contact_response_probabilities = {
+            'Email': 0.25, 'Phone Call': 0.35, 'LinkedIn Message': 0.15, 'Demo Request': 0.65
+        }
+        
+        # Funnel progression after entry: stage, probability of reaching it, mean days to reach it.
+        # 'Closed Won' uses the group's outcome_rate.
+        self.funnel_stage_names = ['Contacted', 'Qualified', 'Demo Scheduled', 'Proposal Sent', 'Closed Won']
+        self.funnel_stage_probabilities = [1.0, 0.90, 0.80, 0.75, None]
+        self.funnel_stage_mean_days = [2, 7, 14, 21, 35]
+        
+        # Future-date cutoff, fixed once per run in batched mode (set it explicitly to compare runs across days)
+        self.as_of = datetime.now()
         
         # Database and CSV setup
         self.db_dir = Path('./db')
@@ -44,31 +129,103 @@ class HybridCRMGenerator:
         self.csv_dir = Path('./raw_data')
         self.csv_dir.mkdir(parents=True, exist_ok=True)
         
+        # Optional columnar output: Parquet partitioned by month and group (read with parquet_io.read_parquet)
+        self.parquet = parquet
+        self.parquet_dir = Path('./raw_parquet')
+        
+        # Daily delta mode: rows generated ahead of their arrival day wait in the spool database.
+        # A few child rows arrive 1-3 days after their event/stage/outcome date (late-arriving rows);
+        # keep the dbt lookback_days var at least max_arrival_delay_days.
+        self.spool_path = self.db_dir / 'delta_spool.db'
+        self.late_arrival_rate = 0.03
+        self.max_arrival_delay_days = 3
+        self.delta_horizon_days = 365  # Child rows are simulated up to a year after lead creation
+        
+    def __getstate__(self):
+        # Faker instances, the run-level generator and the instrumentation sinks are not shipped to shard workers
+        state = self.__dict__.copy()
+        del state['fake']
+        del state['rng']
+        del state['instrumentation']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.fake = Faker()
+        self.rng = np.random.default_rng(self.seed)
+        self.instrumentation = Instrumentation()
+    
     def generate_complete_dataset(self):
         print("🏢 Generating dataset...")
         print("📋 Scenario: B2B SaaS company testing new lead onboarding process")
         print(f"📅 New process launched: {self.test_start_date.strftime('%Y-%m-%d')}")
+        self._key_counts = {}
+        stage = self.instrumentation.stage
         
         # Generate realistic CRM tables only
-        leads_df = self._generate_leads()
+        with stage('leads') as record:
+            leads_df = self._generate_leads()
+            record.rows_out = len(leads_df)
         
         # Add test group logic FIRST (needed for other tables)
-        leads_df = self._add_test_group_logic(leads_df)
+        with stage('group_assignment', rows_in=len(leads_df)) as record:
+            leads_df = self._add_test_group_logic(leads_df)
+            record.rows_out = len(leads_df)
         
         # Generate in logical order with shared contacted_leads list
-        contact_events_df, contacted_lead_ids = self._generate_contact_events(leads_df)
-        funnel_stages_df = self._generate_funnel_stages(leads_df, contacted_lead_ids)
-        outcomes_df = self._generate_outcomes(leads_df, funnel_stages_df)
+        with stage('contact_events', rows_in=len(leads_df)) as record:
+            contact_events_df, contacted_lead_ids = self._generate_contact_events(leads_df)
+            record.rows_out = len(contact_events_df)
+        with stage('funnel_stages', rows_in=len(contacted_lead_ids)) as record:
+            funnel_stages_df = self._generate_funnel_stages(leads_df, contacted_lead_ids)
+            record.rows_out = len(funnel_stages_df)
+        with stage('outcomes', rows_in=len(funnel_stages_df)) as record:
+            outcomes_df = self._generate_outcomes(leads_df, funnel_stages_df)
+            record.rows_out = len(outcomes_df)
+        
+        tables = {
+            'leads': leads_df,
+            'contact_events': contact_events_df,
+            'funnel_stages': funnel_stages_df,
+            'outcomes': outcomes_df
+        }
+        total_rows = sum(len(df) for df in tables.values())
         
-        # Introduce realistic data quality issues
-        leads_df = self._introduce_data_quality_issues_leads(leads_df)
-        contact_events_df = self._introduce_data_quality_issues_contacts(contact_events_df)
-        funnel_stages_df = self._introduce_data_quality_issues_funnel(funnel_stages_df)
-        outcomes_df = self._introduce_data_quality_issues_outcomes(outcomes_df)
+        # Introduce realistic data quality issues (the manifest is the ground truth for stg_* cleaning)
+        with stage('data_quality', rows_in=total_rows) as record:
+            fault_manifest = self._introduce_data_quality_issues(tables)
+            record.rows_out = len(fault_manifest)
         
         # Save to BOTH database and CSV files
-        self._save_to_database(leads_df, contact_events_df, funnel_stages_df, outcomes_df)
-        self._save_to_csv(leads_df, contact_events_df, funnel_stages_df, outcomes_df)
+        with stage('sqlite_write', rows_in=total_rows) as record:
+            load_stats = self._save_to_database(leads_df, contact_events_df, funnel_stages_df, outcomes_df)
+            record.rows_out = total_rows
+            record.bytes_written = file_sizes([self.db_path])
+        with stage('staging_models', rows_in=total_rows) as record:
+            staging_timings = self._report_database_load(load_stats)
+            record.rows_out = sum(rows for rows, _ in staging_timings.values())
+        with stage('csv_write', rows_in=total_rows) as record:
+            self._save_to_csv(leads_df, contact_events_df, funnel_stages_df, outcomes_df)
+            record.rows_out = total_rows
+            record.bytes_written = file_sizes(self.csv_dir / f'{name}.csv' for name in tables)
+        with stage('fault_manifest_write', rows_in=len(fault_manifest)) as record:
+            self._save_fault_manifest(fault_manifest)
+            record.rows_out = len(fault_manifest)
+            record.bytes_written = file_sizes([self.csv_dir / 'fault_manifest.csv'])
+        uuid_map = None
+        if self.compact and self.keep_uuids:
+            with stage('uuid_map_write') as record:
+                uuid_map = self._save_uuid_map()
+                record.rows_out = len(uuid_map)
+                record.bytes_written = file_sizes([self.csv_dir / 'uuid_map.csv'])
+        if self.parquet:
+            parquet_tables = {**tables, 'fault_manifest': fault_manifest}
+            if uuid_map is not None:
+                parquet_tables['uuid_map'] = uuid_map
+            with stage('parquet_write', rows_in=sum(len(df) for df in parquet_tables.values())) as record:
+                write_parquet(parquet_tables, self.parquet_dir)
+                record.rows_out = record.rows_in
+                record.bytes_written = file_sizes(self.parquet_dir.rglob('*.parquet'))
         
         # Show proper A/B test context  
         control_count = len(leads_df[leads_df['group'] == 'control'])
@@ -77,21 +234,317 @@ class HybridCRMGenerator:
         print(f"   Total leads generated: {len(leads_df):,}")
         print(f"   ├── Control group: {control_count:,} leads")
         print(f"   └── Test group: {test_count:,} leads")
-        print(f"   └── Test group: {test_count:,} leads")
         print(f"📊 Total Control: {control_count:,} | Total Test: {test_count:,}")
         print(f"✅ Generated {len(leads_df):,} leads with realistic CRM data")
         print(f"💾 Data saved to database: {self.db_path}")
         print(f"📁 Raw CSV files saved to: {self.csv_dir}")
+        if self.parquet:
+            print(f"🗂️ Parquet datasets saved to: {self.parquet_dir}")
+        
+        datasets = {**tables, 'fault_manifest': fault_manifest}
+        if uuid_map is not None:
+            datasets['uuid_map'] = uuid_map
+        return datasets
+    
+    def generate_streaming(self, chunk_size=100000, report_staging=False):
+        """Generate the dataset in fixed-size lead chunks, writing each chunk before the next.
+        
+        Peak memory is bounded by chunk_size (plus its child tables), not by total_leads.
+        Uses the batched engines regardless of the batched flag. In compact mode, surrogate keys
+        continue across chunks, so they stay dense over the whole dataset. report_staging also times
+        every stg_* model against the loaded database (a full build of each, off by default).
+        """
+        print("🏢 Generating dataset (streaming)...")
+        print(f"📦 {self.total_leads:,} leads in chunks of {chunk_size:,}")
+        
+        n_chunks = -(-self.total_leads // chunk_size)
+        chunk_seeds = self._chunk_seeds(n_chunks)
+        totals = {'leads': 0, 'contact_events': 0, 'funnel_stages': 0, 'outcomes': 0, 'fault_manifest': 0}
+        load_stats = {}
+        self._key_counts = {}
+        control_count = 0
+        test_count = 0
+        start_time = time.perf_counter()
+        
+        for chunk_index in range(n_chunks):
+            n_leads = min(chunk_size, self.total_leads - chunk_index * chunk_size)
+            with self.instrumentation.stage('generate_chunk', chunk=chunk_index) as record:
+                tables = self._generate_chunk(n_leads, chunk_seeds[chunk_index], first_lead=chunk_index * chunk_size)
+                record.rows_out = sum(len(df) for df in tables.values())
+            
+            # First chunk replaces existing outputs, later chunks append
+            with self.instrumentation.stage('write_chunk', rows_in=record.rows_out, chunk=chunk_index) as record:
+                csv_paths = [self.csv_dir / f'{name}.csv' for name in tables]
+                csv_bytes = file_sizes(csv_paths) if chunk_index > 0 else 0
+                accumulate_stats(load_stats, self._append_chunk(tables, chunk_index))
+                record.rows_out = record.rows_in
+                record.bytes_written = file_sizes(csv_paths) - csv_bytes  # CSV bytes appended
+            
+            for name, df in tables.items():
+                totals[name] = totals.get(name, 0) + len(df)
+            control_count += int((tables['leads']['group'] == 'control').sum())
+            test_count += int((tables['leads']['group'] == 'test').sum())
+            
+            elapsed = time.perf_counter() - start_time
+            rows_written = sum(totals.values())
+            print(f"   chunk {chunk_index + 1}/{n_chunks}: {totals['leads']:,} leads, "
+                  f"{rows_written:,} rows ({rows_written / elapsed:,.0f} rows/sec)")
+        
+        print(f"📊 Total Control: {control_count:,} | Total Test: {test_count:,}")
+        print(f"✅ Generated {totals['leads']:,} leads in {time.perf_counter() - start_time:.1f}s")
+        print(f"💾 Data saved to database: {self.db_path}")
+        self._report_database_load(load_stats, build_indexes=True, report_staging=report_staging)
+        print(f"📁 Raw CSV files saved to: {self.csv_dir}")
+        
+        return totals
+    
+    def generate_sharded(self, workers=None, shard_size=100000, report_staging=False):
+        """Generate the dataset in shards across a process pool, then merge the shard outputs.
+        
+        Each shard owns a generator spawned from the root seed by shard index, and shards are
+        merged in index order, so a given seed/shard_size gives the same data for any worker count
+        (and the same data as generate_streaming with chunk_size=shard_size). report_staging as in
+        generate_streaming.
+        """
+        if self.compact:
+            raise ValueError("Compact mode is not supported for sharded generation (shards cannot share dense key "
+                             "sequences); use generate_streaming instead")
+        n_shards = -(-self.total_leads // shard_size)
+        shard_seeds = self._chunk_seeds(n_shards)
+        shard_dir = (self.csv_dir / 'shards').resolve()
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        if self.parquet:
+            # Shards write their Parquet files straight into the final partitioned datasets
+            for name in ['leads', 'contact_events', 'funnel_stages', 'outcomes', 'fault_manifest']:
+                shutil.rmtree(self.parquet_dir / name, ignore_errors=True)
+        
+        print("🏢 Generating dataset (sharded)...")
+        print(f"🧩 {self.total_leads:,} leads in {n_shards:,} shards of {shard_size:,} on {workers or os.cpu_count()} workers")
+        start_time = time.perf_counter()
+        
+        shard_args = [
+            (self, shard_index, min(shard_size, self.total_leads - shard_index * shard_size),
+             shard_seeds[shard_index], shard_dir, shard_index * shard_size)
+            for shard_index in range(n_shards)
+        ]
+        if workers == 1:
+            for args in shard_args:
+                _generate_shard(*args)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_generate_shard, *zip(*shard_args)))
+        print(f"   {n_shards:,} shards generated in {time.perf_counter() - start_time:.1f}s, merging...")
+        
+        load_stats = self._merge_shards(shard_dir, n_shards)
+        totals = {name: table_stats['rows'] for name, table_stats in load_stats.items()}
+        shutil.rmtree(shard_dir)
+        
+        print(f"✅ Generated {totals['leads']:,} leads ({sum(totals.values()):,} rows) "
+              f"in {time.perf_counter() - start_time:.1f}s")
+        print(f"💾 Data saved to database: {self.db_path}")
+        self._report_database_load(load_stats, build_indexes=True, report_staging=report_staging)
+        print(f"📁 Raw CSV files saved to: {self.csv_dir}")
         
-        return {
+        return totals
+    
+    def generate_daily_delta(self, day):
+        """Emit the append-only delta for one day and append it to the database, CSV and Parquet outputs.
+        
+        The delta holds the day's new leads plus every spooled contact event, stage transition and
+        outcome of earlier leads that arrives that day, including late rows dated before the day.
+        Days must be delivered in increasing order; the first delivered day replaces existing
+        outputs (delete the spool database to start over).
+        """
+        if self.compact:
+            raise ValueError("Compact mode is not supported for daily deltas (keys must stay unique across runs)")
+        day = datetime.combine(pd.Timestamp(day).date(), datetime.min.time())
+        day_label = day.strftime('%Y-%m-%d')
+        
+        with SQLiteBulkLoader(self.spool_path) as spool:
+            spool.conn.execute('CREATE TABLE IF NOT EXISTS delivered_days (day TEXT PRIMARY KEY)')
+            last_day = spool.conn.execute('SELECT MAX(day) FROM delivered_days').fetchone()[0]
+            if last_day is not None and day_label <= last_day:
+                raise ValueError(f"Deltas must be delivered in day order: {day_label} is not after {last_day}")
+            
+            # The day's cohort (with all its future child rows) goes into the spool, then everything due comes out
+            spool.load(self._generate_day_cohort(day), if_exists='append', build_indexes=False)
+            delta = self._pop_due_rows(spool, day_label)
+        first_day = last_day is None
+        
+        # Spool-only columns: arrival_date everywhere, and the lead's group on child rows (Parquet partitioning)
+        parquet_tables = {name: df.drop(columns='arrival_date') for name, df in delta.items()}
+        tables = {
+            name: df.drop(columns='group') if name in ('contact_events', 'funnel_stages', 'outcomes') else df
+            for name, df in parquet_tables.items()
+        }
+        
+        for name, df in tables.items():
+            df.to_csv(self.csv_dir / f'{name}.csv', index=False, mode='w' if first_day else 'a', header=first_day)
+        with SQLiteBulkLoader(self.db_path) as loader:
+            # Existing indexes are maintained by the inserts; only a fresh database needs them built
+            loader.load(tables, if_exists='replace' if first_day else 'append', build_indexes=False)
+            for name in tables:
+                loader.build_indexes(name, analyze=False)
+        if self.parquet:
+            write_parquet(parquet_tables, self.parquet_dir, part=int(day.strftime('%Y%m%d')), replace=first_day)
+        
+        late_rows = sum(
+            int((tables[name][date_column].str[:10] < day_label).sum())
+            for name, date_column in [('contact_events', 'event_date'), ('funnel_stages', 'stage_date'),
+                                      ('outcomes', 'outcome_date')]
+        )
+        print(f"   {day_label}: " + ", ".join(f"+{len(df):,} {name}" for name, df in tables.items())
+              + f" ({late_rows:,} late-arriving)")
+        return tables
+    
+    def generate_daily_deltas(self, start_day, end_day):
+        """Deliver one daily delta per day from start_day through end_day (inclusive)."""
+        print("🏢 Generating daily deltas...")
+        for day in pd.date_range(start_day, end_day, freq='D'):
+            self.generate_daily_delta(day)
+        
+        print(f"💾 Deltas appended to database: {self.db_path}")
+        print(f"📁 Deltas appended to raw CSV files: {self.csv_dir}")
+        print(f"🔧 Refresh staging incrementally: dbt run --vars '{{run_date: {pd.Timestamp(end_day):%Y-%m-%d}}}'")
+    
+    def _merge_shards(self, shard_dir, n_shards):
+        """Concatenate shard CSV parts and shard databases into the final outputs, in shard order.
+        
+        Returns the database load stats per table (indexes are built afterwards).
+        """
+        names = ['leads', 'contact_events', 'funnel_stages', 'outcomes', 'fault_manifest']
+        for name in names:
+            with open(self.csv_dir / f'{name}.csv', 'wb') as merged:
+                for shard_index in range(n_shards):
+                    with open(shard_dir / f'{name}-{shard_index:05d}.csv', 'rb') as part:
+                        header = part.readline()
+                        if shard_index == 0:
+                            merged.write(header)
+                        shutil.copyfileobj(part, merged)
+        
+        load_stats = {}
+        with SQLiteBulkLoader(self.db_path) as loader:
+            for name in names:
+                loader.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            for shard_index in range(n_shards):
+                shard_stats = loader.append_database(shard_dir / f'shard-{shard_index:05d}.db', names)
+                accumulate_stats(load_stats, shard_stats)
+        return load_stats
+    
+    def _chunk_seeds(self, n_chunks):
+        """Independent seed sequences for chunks/shards, spawned from the root seed by index."""
+        return np.random.SeedSequence(self.seed).spawn(n_chunks)
+    
+    def _generate_chunk(self, n_leads, seed_sequence, first_lead=0):
+        """Generate one self-contained chunk of leads and their child tables, with quality faults.
+        
+        first_lead is the chunk's position in the whole dataset (keeps emails unique across chunks).
+        """
+        rng = np.random.default_rng(seed_sequence)
+        
+        leads_df = self._add_test_group_logic(self._generate_leads_batched(n_leads, rng, first_lead=first_lead))
+        contact_events_df, contacted_lead_ids = self._generate_contact_events_batched(leads_df, rng)
+        funnel_stages_df = self._generate_funnel_stages_batched(leads_df, contacted_lead_ids, rng)
+        outcomes_df = self._generate_outcomes(leads_df, funnel_stages_df, rng)
+        
+        tables = {
             'leads': leads_df,
             'contact_events': contact_events_df,
             'funnel_stages': funnel_stages_df,
             'outcomes': outcomes_df
         }
+        tables['fault_manifest'] = self._introduce_data_quality_issues(tables, rng)
+        if self.compact and self.keep_uuids:
+            tables['uuid_map'] = self._pop_uuid_map()
+        return tables
+    
+    def _generate_day_cohort(self, day):
+        """Generate one day's leads with all their future child rows, tagged with arrival dates."""
+        # Two-element spawn key: never collides with the chunk/shard seeds
+        seed_sequence = np.random.SeedSequence(self.seed, spawn_key=(day.toordinal(), 0))
+        rng = np.random.default_rng(seed_sequence)
+        
+        # Same volume profile as the full-year generator: weekdays absorb 85% of weekend leads
+        daily_leads = self.total_leads / 366
+        n_leads = rng.poisson(daily_leads * (0.15 if day.weekday() >= 5 else 1 + 2 * 0.85 / 5))
+        horizon = day + timedelta(days=self.delta_horizon_days)
+        
+        # Email serials: a block per day, far larger than any day's cohort
+        first_lead = day.toordinal() * 1_000_000
+        leads_df = self._add_test_group_logic(
+            self._generate_leads_batched(n_leads, rng, day=day, first_lead=first_lead)
+        )
+        contact_events_df, contacted_lead_ids = self._generate_contact_events_batched(leads_df, rng, horizon)
+        funnel_stages_df = self._generate_funnel_stages_batched(leads_df, contacted_lead_ids, rng, horizon)
+        outcomes_df = self._generate_outcomes(leads_df, funnel_stages_df, rng, horizon)
+        
+        tables = {
+            'leads': leads_df,
+            'contact_events': contact_events_df,
+            'funnel_stages': funnel_stages_df,
+            'outcomes': outcomes_df
+        }
+        
+        # Arrival dates follow the true dates (before faults move them), a few child rows arrive late
+        leads_df['arrival_date'] = day.strftime('%Y-%m-%d')
+        lead_groups = pd.Series(leads_df['group'].to_numpy(), index=leads_df['lead_id'])
+        for name, date_column in [('contact_events', 'event_date'), ('funnel_stages', 'stage_date'),
+                                  ('outcomes', 'outcome_date')]:
+            df = tables[name]
+            late = rng.random(len(df)) < self.late_arrival_rate
+            delay_days = np.where(late, rng.integers(1, self.max_arrival_delay_days, size=len(df), endpoint=True), 0)
+            record_day = pd.to_datetime(df[date_column], format='%Y-%m-%d').to_numpy().astype('datetime64[D]')
+            df['arrival_date'] = format_datetimes(record_day + delay_days.astype('timedelta64[D]'), with_time=False)
+            df['group'] = lead_groups.reindex(df['lead_id']).to_numpy()
+        
+        # Manifest rows arrive together with the row they describe
+        fault_manifest = self._introduce_data_quality_issues(tables, rng)
+        arrival_by_row_id = pd.concat([
+            pd.Series(tables[name]['arrival_date'].to_numpy(), index=tables[name][key])
+            for name, key in TABLE_KEYS.items()
+        ])
+        fault_manifest['arrival_date'] = arrival_by_row_id.reindex(fault_manifest['row_id']).to_numpy()
+        tables['fault_manifest'] = fault_manifest
+        return tables
+    
+    def _pop_due_rows(self, spool, day_label):
+        """Remove and return the spooled rows arriving on or before a day, marking the day delivered."""
+        delta = {}
+        spool.conn.execute('BEGIN')
+        try:
+            for name in ['leads', 'contact_events', 'funnel_stages', 'outcomes', 'fault_manifest']:
+                spool.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{name}_arrival_date" ON "{name}" (arrival_date)')
+                delta[name] = pd.read_sql_query(
+                    f'SELECT * FROM "{name}" WHERE arrival_date <= ? ORDER BY rowid', spool.conn, params=(day_label,)
+                )
+                spool.conn.execute(f'DELETE FROM "{name}" WHERE arrival_date <= ?', (day_label,))
+            spool.conn.execute('INSERT INTO delivered_days (day) VALUES (?)', (day_label,))
+            spool.conn.execute('COMMIT')
+        except Exception:
+            spool.conn.execute('ROLLBACK')
+            raise
+        return delta
+    
+    def _append_chunk(self, tables, chunk_index):
+        """Append one chunk's tables to the CSV files, database tables and Parquet datasets.
+        
+        Returns the chunk's database load stats (indexes are built once after the last chunk).
+        """
+        first_chunk = chunk_index == 0
+        for name, df in tables.items():
+            df.to_csv(self.csv_dir / f'{name}.csv', index=False, mode='w' if first_chunk else 'a', header=first_chunk)
+        with SQLiteBulkLoader(self.db_path) as loader:
+            load_stats = loader.load(tables, if_exists='replace' if first_chunk else 'append', build_indexes=False)
+        
+        if self.parquet:
+            write_parquet(tables, self.parquet_dir, part=chunk_index, replace=first_chunk)
+        return load_stats
     
     def _generate_leads(self):
         """Generate realistic lead data as found in CRM systems."""
+        if self.batched:
+            return self._generate_leads_batched(self.total_leads, self.rng)
+        
         leads = []
         
         for i in range(self.total_leads):
@@ -130,38 +583,120 @@ class HybridCRMGenerator:
         
         return pd.DataFrame(leads)
     
-    def _add_test_group_logic(self, leads_df):
-        """Add test group assignment - PROPER A/B TEST: Concurrent control and test groups."""
-        # FIXED: Real A/B testing with concurrent groups (not sequential time periods)
-        # Both groups run simultaneously from June 1st onwards
-        
-        # Filter to only leads from June 1st onwards (when A/B test started)
-        test_period_leads = leads_df[pd.to_datetime(leads_df['created_at']) >= self.test_start_date].copy()
-        pre_test_leads = leads_df[pd.to_datetime(leads_df['created_at']) < self.test_start_date].copy()
-        
-        # Pre-test period: all control (historical baseline)
-        pre_test_leads['group'] = 'control'
-        pre_test_leads['assigned_at'] = pre_test_leads['created_at'].apply(
-            lambda x: pd.to_datetime(x).strftime('%Y-%m-%d')
-        )
+    def _generate_leads_batched(self, n_leads, rng, text_fields=True, day=None, first_lead=0):
+        """Generate lead data column-wise, drawing every column as one NumPy array.
         
-        # A/B test period: Random 50/50 split (proper concurrent testing)
-        np.random.seed(42)  # Reproducible results
-        random_assignment = np.random.choice(['control', 'test'], 
-                                           size=len(test_period_leads), 
-                                           p=[0.5, 0.5])
-        test_period_leads['group'] = random_assignment
-        test_period_leads['assigned_at'] = test_period_leads['created_at'].apply(
-            lambda x: pd.to_datetime(x).strftime('%Y-%m-%d')
-        )
+        With day set, every lead is created on that day (daily delta cohorts). first_lead offsets the
+        email serials, so batches generated separately never share emails by accident.
+        """
+        if day is not None:
+            created_at = np.datetime64(day, 's') + rng.integers(0, 86400, size=n_leads).astype('timedelta64[s]')
+        else:
+            # Random lead creation timestamps across the year (second resolution)
+            start = np.datetime64(self.data_start_date, 's')
+            end = np.datetime64(datetime(2024, 12, 31), 's')
+            span_seconds = (end - start).astype(np.int64)
+            created_at = start + rng.integers(0, span_seconds, size=n_leads, endpoint=True).astype('timedelta64[s]')
+            
+            # Business day bias (85% of weekend leads move back 1-2 days)
+            weekday = (created_at.astype('datetime64[D]').astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+            weekend_shift = (weekday >= 5) & (rng.random(n_leads) < 0.85)
+            shift_days = np.where(weekend_shift, rng.integers(1, 3, size=n_leads), 0)
+            created_at = created_at - shift_days.astype('timedelta64[D]')
+        
+        # Company size distribution, revenue correlates with company size
+        size_codes = rng.choice(len(self.company_sizes), size=n_leads, p=self.company_size_probabilities)
+        size_multipliers = np.array([self.company_size_revenue_multipliers[size] for size in self.company_sizes])
+        annual_revenue = rng.lognormal(15, 1.2, size=n_leads) * size_multipliers[size_codes]
+        
+        # Uniform categoricals
+        industry = self._labels(self.industries, rng.integers(0, len(self.industries), size=n_leads))
+        region = self._labels(self.regions, rng.integers(0, len(self.regions), size=n_leads))
+        channel = self._labels(self.channels, rng.integers(0, len(self.channels), size=n_leads))
+        
+        # 15% of leads have no phone number
+        has_phone = rng.random(n_leads) > 0.15
+        
+        company_name = None
+        contact_email = None
+        contact_phone = None
+        if text_fields:
+            company_name = self.identities.company_names(n_leads, rng)
+            contact_email = self.identities.emails(n_leads, rng, first_lead, self.duplicate_email_rate)
+            contact_phone = np.full(n_leads, None, dtype=object)
+            contact_phone[has_phone] = self.identities.phone_numbers(int(has_phone.sum()), rng)
         
-        # Combine periods
-        leads_df = pd.concat([pre_test_leads, test_period_leads], ignore_index=True)
+        return pd.DataFrame({
+            'lead_id': self._new_keys('leads', rng, n_leads),
+            'company_name': company_name,
+            'contact_email': contact_email,
+            'contact_phone': contact_phone,
+            'industry': industry,
+            'region': region,
+            'source_channel': channel,
+            'company_size': self._labels(self.company_sizes, size_codes),
+            'created_at': self._datetimes(created_at),
+            'annual_revenue': annual_revenue
+        })
+    
+    def _add_test_group_logic(self, leads_df):
+        """Add test group assignment - PROPER A/B TEST: Concurrent control and test groups.
+        
+        Leads created before the launch date are all control (historical baseline); from then on the
+        experiment's 50/50 split of the hashed lead_id. Assigns in place, keeping lead order.
+        """
+        created_at = pd.to_datetime(leads_df['created_at'], format='%Y-%m-%d %H:%M:%S').to_numpy()
+        codes = self.assignment.assign(self.experiment.name, leads_df['lead_id'].to_numpy(), created_at)
+        leads_df['group'] = self._labels(list(self.experiment.variants), codes)
+        leads_df['assigned_at'] = self._datetimes(created_at, with_time=False)
         
         return leads_df
     
+    def _group_param(self, is_test, name):
+        """Per-row array of a group parameter, given a boolean test-group mask."""
+        return np.where(is_test, self.group_params['test'][name], self.group_params['control'][name])
+    
+    def _new_keys(self, table, rng, n):
+        """Keys for n new rows: UUID strings, or the table's next dense int64 surrogate keys in compact mode."""
+        # The UUID bytes are drawn in both modes, so a seed gives the same leads either way
+        # (groups hash the stored lead_id, so compact and text mode split them differently)
+        raw = _uuid4_bytes(rng, n)
+        if not self.compact:
+            return _uuid4_strings(raw)
+        
+        start = self._key_counts.get(table, 0)
+        self._key_counts[table] = start + n
+        keys = np.arange(start, start + n, dtype=np.int64)
+        if self.keep_uuids:
+            self._uuid_maps.append(pd.DataFrame({'table': table, 'key': keys, 'uuid': _uuid4_strings(raw)}))
+        return keys
+    
+    def _labels(self, categories, codes):
+        """Labels for integer codes: a categorical in compact mode, else an object array of strings."""
+        if self.compact:
+            return pd.Categorical.from_codes(codes, categories)
+        return np.array(categories, dtype=object)[codes]
+    
+    def _datetimes(self, values, with_time=True):
+        """datetime64 values as stored: datetime64[s] columns in compact mode, else ISO strings."""
+        if self.compact:
+            return values.astype('datetime64[s]' if with_time else 'datetime64[D]').astype('datetime64[s]')
+        return format_datetimes(values, with_time)
+    
+    def _pop_uuid_map(self):
+        """The key -> UUID side table of the keys drawn since the last call (compact mode with keep_uuids)."""
+        if not self._uuid_maps:
+            return pd.DataFrame({'table': pd.Categorical([]), 'key': np.array([], dtype=np.int64), 'uuid': []})
+        uuid_map = pd.concat(self._uuid_maps, ignore_index=True)
+        uuid_map['table'] = uuid_map['table'].astype('category')
+        self._uuid_maps = []
+        return uuid_map
+    
     def _generate_contact_events(self, leads_df):
         """Generate realistic contact events with business patterns."""
+        if self.batched:
+            return self._generate_contact_events_batched(leads_df, self.rng)
+        
         events = []
         contacted_lead_ids = set()  # Track which leads were contacted
         
@@ -232,8 +767,61 @@ class HybridCRMGenerator:
         
         return pd.DataFrame(events), contacted_lead_ids
     
+    def _generate_contact_events_batched(self, leads_df, rng, as_of=None):
+        """Generate contact events for all leads at once from flat event arrays."""
+        lead_ids = leads_df['lead_id'].to_numpy()
+        lead_start = pd.to_datetime(leads_df['created_at'], format='%Y-%m-%d %H:%M:%S').to_numpy()
+        is_test = (leads_df['group'] == 'test').to_numpy()
+        
+        # Per-lead contact flags and contact counts, drawn for the whole group at once
+        contacted = rng.random(len(leads_df)) < self._group_param(is_test, 'contact_probability')
+        contacted_idx = np.flatnonzero(contacted)
+        num_contacts = np.maximum(1, rng.poisson(self._group_param(is_test[contacted_idx], 'avg_contacts')))
+        
+        # Expand leads into one slot per contact: lead position and contact sequence number
+        event_lead = np.repeat(contacted_idx, num_contacts)
+        first_slot = np.cumsum(num_contacts) - num_contacts
+        contact_num = np.arange(len(event_lead)) - np.repeat(first_slot, num_contacts)
+        
+        # Contact timing: more frequent early, spread out later
+        low = np.select([contact_num == 0, contact_num == 1], [0, 1], 7)
+        high = np.select([contact_num == 0, contact_num == 1], [2, 7], 30)
+        days_offset = rng.integers(low, high, endpoint=True)
+        contact_date = lead_start[event_lead] + days_offset.astype('timedelta64[D]')
+        
+        # Skip contacts in the future
+        in_past = contact_date <= np.datetime64(as_of or self.as_of)
+        event_lead = event_lead[in_past]
+        contact_num = contact_num[in_past]
+        contact_date = contact_date[in_past]
+        n_events = len(event_lead)
+        
+        # Contact method varies by sequence: first touch is Email/Phone Call, then any channel
+        first_touch_type = rng.choice(2, size=n_events, p=[0.7, 0.3])
+        later_type = rng.integers(0, len(self.contact_types), size=n_events)
+        type_codes = np.where(contact_num == 0, first_touch_type, later_type)
+        
+        # Response probability (higher for test group)
+        base_response_prob = np.array([self.contact_response_probabilities[t] for t in self.contact_types])
+        response_prob = base_response_prob[type_codes] * self._group_param(is_test[event_lead], 'response_boost')
+        responded = rng.random(n_events) < response_prob
+        response_codes = np.where(responded, rng.choice(3, size=n_events, p=[0.5, 0.3, 0.2]), 3)
+        
+        events_df = pd.DataFrame({
+            'event_id': self._new_keys('contact_events', rng, n_events),
+            'lead_id': lead_ids[event_lead],
+            'event_date': self._datetimes(contact_date, with_time=False),
+            'contact_type': self._labels(self.contact_types, type_codes),
+            'response_type': self._labels(['Responded', 'Interested', 'Callback Requested', 'No Response'], response_codes)
+        })
+        
+        return events_df, set(lead_ids[contacted_idx])
+    
     def _generate_funnel_stages(self, leads_df, contacted_lead_ids):
         """Generate funnel stages ONLY for leads who were contacted (logical progression)."""
+        if self.batched:
+            return self._generate_funnel_stages_batched(leads_df, contacted_lead_ids, self.rng)
+        
         stages = []
         
         # Generate funnel stages ONLY for leads that were actually contacted
@@ -305,252 +893,213 @@ class HybridCRMGenerator:
         
         return pd.DataFrame(stages)
     
-    def _generate_outcomes(self, leads_df, funnel_stages_df):
+    def _generate_funnel_stages_batched(self, leads_df, contacted_lead_ids, rng, as_of=None):
+        """Move all contacted leads through the funnel together using per-stage survival masks."""
+        # Only contacted leads, and of those only the ones entering the funnel
+        funnel_idx = np.flatnonzero(leads_df['lead_id'].isin(contacted_lead_ids).to_numpy())
+        is_test = (leads_df['group'].to_numpy() == 'test')[funnel_idx]
+        enters_funnel = rng.random(len(funnel_idx)) < self._group_param(is_test, 'funnel_entry_rate')
+        funnel_idx = funnel_idx[enters_funnel]
+        is_test = is_test[enters_funnel]
+        n_funnel = len(funnel_idx)
+        
+        # Stage reach probabilities per lead (columns follow funnel_stage_names)
+        stage_probabilities = np.array([
+            self.funnel_stage_probabilities[:-1] + [self.group_params['control']['outcome_rate']],
+            self.funnel_stage_probabilities[:-1] + [self.group_params['test']['outcome_rate']]
+        ])[is_test.astype(int)]
+        
+        # A lead reaches a stage only if it passed every stage before it
+        reached = np.logical_and.accumulate(rng.random((n_funnel, len(self.funnel_stage_names))) < stage_probabilities, axis=1)
+        
+        # Each stage is reached an exponential delay after lead creation
+        lead_start = pd.to_datetime(leads_df['created_at'].to_numpy()[funnel_idx], format='%Y-%m-%d %H:%M:%S').to_numpy()
+        delay_seconds = rng.exponential(self.funnel_stage_mean_days, size=(n_funnel, len(self.funnel_stage_names))) * 86400
+        stage_date = lead_start[:, None] + delay_seconds.astype('timedelta64[s]')
+        
+        # Emit rows for reached stages that are not in the future (row-major: grouped per lead in stage order)
+        lead_pos, stage_pos = np.nonzero(reached & (stage_date <= np.datetime64(as_of or self.as_of)))
+        
+        return pd.DataFrame({
+            'stage_id': self._new_keys('funnel_stages', rng, len(lead_pos)),
+            'lead_id': leads_df['lead_id'].to_numpy()[funnel_idx[lead_pos]],
+            'stage_name': self._labels(self.funnel_stage_names, stage_pos),
+            'stage_date': self._datetimes(stage_date[lead_pos, stage_pos], with_time=False),
+            'stage_order': stage_pos + 2  # 'New' is order 1, 'Contacted' is order 2
+        })
+    
+    def _generate_outcomes(self, leads_df, funnel_stages_df, rng=None, as_of=None):
         """Generate outcomes focused on Closed Won leads from funnel."""
-        outcomes = []
+        rng = rng if rng is not None else self.rng
         
-        # Find leads that reached 'Closed Won' stage
-        closed_won_leads = funnel_stages_df[funnel_stages_df['stage_name'] == 'Closed Won']['lead_id'].unique()
+        # lead_id-keyed index: every per-lead attribute below is fetched by position
+        lead_index = pd.Index(leads_df['lead_id'])
+        lead_ids = leads_df['lead_id'].to_numpy()
+        lead_start = pd.to_datetime(leads_df['created_at'], format='%Y-%m-%d %H:%M:%S').to_numpy()
+        is_test = (leads_df['group'] == 'test').to_numpy()
+        stage_lead_pos = lead_index.get_indexer(funnel_stages_df['lead_id'])
         
-        for lead_id in closed_won_leads:
-            lead_info = leads_df[leads_df['lead_id'] == lead_id].iloc[0]
-            lead_start = pd.to_datetime(lead_info['created_at'])
-            
-            # Get the Closed Won stage date
-            closed_won_stage = funnel_stages_df[
-                (funnel_stages_df['lead_id'] == lead_id) & 
-                (funnel_stages_df['stage_name'] == 'Closed Won')
-            ].iloc[0]
-            
-            outcome_date = pd.to_datetime(closed_won_stage['stage_date'])
-            days_to_close = (outcome_date - lead_start).days
-            
-            # Revenue based on company size and test group
-            is_test_group = lead_info['group'] == 'test'
-            
-            size_multipliers = {'Small': 1.0, 'Medium': 1.5, 'Large': 2.5, 'Enterprise': 4.0}
-            base_revenue = 25000 * size_multipliers.get(lead_info['company_size'], 1.0)
-            
-            # Test group gets revenue boost
-            if is_test_group:
-                revenue_multiplier = np.random.normal(1.3, 0.2)  # 30% boost on average
-            else:
-                revenue_multiplier = np.random.normal(1.0, 0.2)
-            
-            final_revenue = max(5000, base_revenue * revenue_multiplier)  # Min $5K deal
-            
-            outcome = {
-                'outcome_id': str(uuid.uuid4()),
-                'lead_id': lead_id,
-                'converted': 1,  # All these are conversions
-                'revenue': final_revenue,
-                'outcome_date': outcome_date.date() if hasattr(outcome_date, 'date') else outcome_date,
-                'days_to_close': max(1, days_to_close)  # Minimum 1 day
-            }
-            
-            outcomes.append(outcome)
+        # Leads that reached 'Closed Won' (first Closed Won row per lead)
+        won_rows = np.flatnonzero((funnel_stages_df['stage_name'] == 'Closed Won').to_numpy())
+        _, first_won = np.unique(stage_lead_pos[won_rows], return_index=True)
+        won_rows = won_rows[np.sort(first_won)]
+        won_pos = stage_lead_pos[won_rows]
+        
+        stage_date = funnel_stages_df['stage_date'].to_numpy()[won_rows]
+        outcome_date = pd.to_datetime(stage_date).to_numpy()
+        days_to_close = (outcome_date - lead_start[won_pos]) // np.timedelta64(1, 'D')
+        
+        # Revenue based on company size and test group (test group gets ~30% boost)
+        size_multiplier = leads_df['company_size'].map(self.outcome_size_multipliers).fillna(1.0).to_numpy()
+        base_revenue = 25000 * size_multiplier[won_pos]
+        revenue_multiplier = rng.normal(self._group_param(is_test[won_pos], 'revenue_multiplier_mean'), 0.2)
+        
+        won_outcomes = pd.DataFrame({
+            'outcome_id': self._new_keys('outcomes', rng, len(won_pos)),
+            'lead_id': lead_ids[won_pos],
+            'converted': 1,  # All these are conversions
+            'revenue': np.maximum(5000, base_revenue * revenue_multiplier),  # Min $5K deal
+            'outcome_date': stage_date,
+            'days_to_close': np.maximum(1, days_to_close)  # Minimum 1 day
+        })
         
         # Add realistic non-converted outcomes (leads that reached funnel but didn't close)
-        # Get all leads that entered funnel but didn't reach Closed Won
-        funnel_lead_ids = set(funnel_stages_df['lead_id'].unique())
-        converted_lead_ids_set = set(closed_won_leads)
-        funnel_but_not_converted = funnel_lead_ids - converted_lead_ids_set
+        in_funnel = np.zeros(len(leads_df), dtype=bool)
+        in_funnel[stage_lead_pos[stage_lead_pos >= 0]] = True
+        in_funnel[won_pos] = False
+        funnel_but_not_converted = np.flatnonzero(in_funnel)
         
         # 40% of funnel leads that didn't convert get formal "lost" outcomes  
         # This creates realistic ~75% outcome-to-conversion rate instead of 99%
-        for lead_id in funnel_but_not_converted:
-            if random.random() < 0.40:  # 40% get formal lost outcomes
-                lead_info = leads_df[leads_df['lead_id'] == lead_id].iloc[0]
-                lead_start = pd.to_datetime(lead_info['created_at'])
-                
-                # Random outcome date after lead creation
-                days_worked = random.randint(30, 120)  # Worked for 1-4 months
-                outcome_date = lead_start + timedelta(days=days_worked)
-                
-                if outcome_date <= datetime.now():
-                    outcome = {
-                        'outcome_id': str(uuid.uuid4()),
-                        'lead_id': lead_id,
-                        'converted': 0,  # Not converted
-                        'revenue': 0,
-                        'outcome_date': outcome_date.date() if hasattr(outcome_date, 'date') else outcome_date,
-                        'days_to_close': days_worked
-                    }
-                    outcomes.append(outcome)
-        
-        return pd.DataFrame(outcomes)
-    
-    def _introduce_data_quality_issues_leads(self, df):
-        """Introduce realistic data quality issues that staging models will clean."""
-        df = df.copy()
-        
-        # 1. Test company names (2% of records) - staging will filter these out
-        test_indices = df.sample(frac=0.02).index
-        test_names = ['Test Company Inc', 'Delete This Company', 'Sample Corp LLC', 'Test Data Corp']
-        for idx in test_indices:
-            df.loc[idx, 'company_name'] = np.random.choice(test_names)
-        
-        # 2. Phone numbers with extensions and formatting issues (15% of records with phones)
-        phone_mask = df['contact_phone'].notna()
-        if phone_mask.sum() > 0:
-            phone_indices = df[phone_mask].sample(frac=0.15).index
-            extension_formats = [' x123', ' ext 456', ' extension 789', ' x1001']
-            for idx in phone_indices:
-                df.loc[idx, 'contact_phone'] = df.loc[idx, 'contact_phone'] + np.random.choice(extension_formats)
-        
-        # 3. Missing regions (5% of records) - staging will set to 'Unknown'
-        missing_region_indices = df.sample(frac=0.05).index
-        df.loc[missing_region_indices, 'region'] = None
-        
-        # 4. Company size case variations (8% of records) - staging will standardize
-        case_indices = df.sample(frac=0.08).index
-        size_variations = {'Small': 'small', 'Medium': 'medium', 'Large': 'large', 'Enterprise': 'enterprise'}
-        for idx in case_indices:
-            original_size = df.loc[idx, 'company_size']
-            if original_size in size_variations:
-                df.loc[idx, 'company_size'] = size_variations[original_size]
-        
-        # 5. Future dates (0.6% of records) - staging will cap to today
-        future_indices = df.sample(frac=0.006).index
-        future_dates = ['2025-01-15 10:00:00', '2025-02-20 14:30:00', '2025-03-10 09:15:00']
-        for idx in future_indices:
-            df.loc[idx, 'created_at'] = np.random.choice(future_dates)
-        
-        # 6. Extreme revenue outliers (1.2% of records) - staging will cap/fix
-        outlier_indices = df.sample(frac=0.012).index
-        extreme_values = [-500000, 999999999, 50000000, -100000]  # Mix of negative and extreme positive
-        for idx in outlier_indices:
-            df.loc[idx, 'annual_revenue'] = np.random.choice(extreme_values)
-        
-        return df
-    
-    def _introduce_data_quality_issues_contacts(self, df):
-        """Introduce realistic data quality issues that staging models will clean."""
-        df = df.copy()
-        
-        # 1. Missing response types (6% of records) - staging will set to 'No Response'
-        missing_indices = df.sample(frac=0.06).index
-        df.loc[missing_indices, 'response_type'] = None
-        
-        # 2. Contact type casing and naming variations (12% of records) - staging will standardize
-        case_indices = df.sample(frac=0.12).index
-        type_variations = {
-            'Email': ['email', 'Email'],
-            'Phone Call': ['call', 'phone call', 'Phone Call'],
-            'LinkedIn Message': ['linkedin', 'LinkedIn', 'LinkedIn Message'],
-            'Demo Request': ['demo request']
-        }
-        
-        for idx in case_indices:
-            original_type = df.loc[idx, 'contact_type']
-            variations = type_variations.get(original_type, [original_type.lower()])
-            df.loc[idx, 'contact_type'] = np.random.choice(variations)
-        
-        # 3. Future event dates (1.2% of records) - staging will cap to today
-        future_indices = df.sample(frac=0.012).index
-        future_dates = ['2025-02-01', '2025-01-25', '2025-03-15']
-        for idx in future_indices:
-            df.loc[idx, 'event_date'] = np.random.choice(future_dates)
-        
-        # 4. Empty string response types (3% of records) - staging will handle
-        empty_indices = df.sample(frac=0.03).index
-        df.loc[empty_indices, 'response_type'] = ''
-        
-        return df
-    
-    def _introduce_data_quality_issues_funnel(self, df):
-        """Introduce realistic data quality issues that staging models will clean."""
-        df = df.copy()
-        
-        # 1. Invalid stage orders (2.5% of records) - staging will fix to 1-7 range
-        invalid_indices = df.sample(frac=0.025).index
-        invalid_orders = [-1, 0, 8, 99, -5]
-        for idx in invalid_indices:
-            df.loc[idx, 'stage_order'] = np.random.choice(invalid_orders)
-        
-        # 2. Stage name variations and casing issues (8% of records) - staging will standardize
-        inconsistent_indices = df.sample(frac=0.08).index
-        name_variations = {
-            'New': ['new lead', 'initial', 'new'],
-            'Contacted': ['contacted'],
-            'Qualified': ['qualified', 'mql', 'marketing qualified'],
-            'Demo Scheduled': ['demo', 'demo scheduled'],
-            'Proposal Sent': ['proposal', 'quote', 'quote sent'],
-            'Closed Won': ['closed won', 'won', 'closed-won'],
-            'Closed Lost': ['closed lost', 'lost', 'closed-lost']
-        }
-        
-        for idx in inconsistent_indices:
-            if idx < len(df):
-                original_name = df.loc[idx, 'stage_name']
-                variations = name_variations.get(original_name, [original_name.lower()])
-                df.loc[idx, 'stage_name'] = np.random.choice(variations)
-        
-        # 3. Future stage dates (1% of records) - staging will cap to today
-        future_indices = df.sample(frac=0.01).index
-        future_dates = ['2025-01-30', '2025-02-15']
-        for idx in future_indices:
-            df.loc[idx, 'stage_date'] = np.random.choice(future_dates)
-        
-        # 4. Missing stage orders (1.5% of records) - staging will handle
-        missing_order_indices = df.sample(frac=0.015).index
-        df.loc[missing_order_indices, 'stage_order'] = None
-        
-        return df
-    
-    def _introduce_data_quality_issues_outcomes(self, df):
-        """Introduce realistic data quality issues that staging models will clean."""
-        df = df.copy()
-        
-        # 1. Negative revenue values (1.5% of records) - staging will set to 0
-        negative_indices = df.sample(frac=0.015).index
-        for idx in negative_indices:
-            df.loc[idx, 'revenue'] = -abs(df.loc[idx, 'revenue'])
-        
-        # 2. Extreme revenue outliers (1% of records) - staging will cap to realistic amounts
-        extreme_indices = df.sample(frac=0.01).index
-        extreme_values = [999999999, 50000000, 2500000]  # Extreme values that staging will cap
-        for idx in extreme_indices:
-            df.loc[idx, 'revenue'] = np.random.choice(extreme_values)
-        
-        # 3. Negative days to close (2% of records) - staging will fix to positive
-        negative_days_indices = df.sample(frac=0.02).index
-        for idx in negative_days_indices:
-            df.loc[idx, 'days_to_close'] = -abs(df.loc[idx, 'days_to_close'])
-        
-        # 4. Inconsistent conversion/revenue logic (1.5% of records) - staging will fix
-        inconsistent_indices = df.sample(frac=0.015).index
-        for idx in inconsistent_indices:
-            # Create logical inconsistencies that staging will fix
-            if df.loc[idx, 'converted'] == 1:
-                df.loc[idx, 'revenue'] = 0  # Converted but no revenue
-            else:
-                df.loc[idx, 'revenue'] = 50000  # Not converted but has revenue
+        lost_pos = funnel_but_not_converted[rng.random(len(funnel_but_not_converted)) < 0.40]
         
-        # 5. Extreme days to close (1% of records) - staging will cap to 730 days
-        extreme_days_indices = df.sample(frac=0.01).index
-        extreme_days = [800, 1000, 1500, 999]
-        for idx in extreme_days_indices:
-            df.loc[idx, 'days_to_close'] = np.random.choice(extreme_days)
+        # Random outcome date after lead creation, worked for 1-4 months
+        days_worked = rng.integers(30, 120, size=len(lost_pos), endpoint=True)
+        lost_date = lead_start[lost_pos] + days_worked.astype('timedelta64[D]')
+        in_past = lost_date <= np.datetime64(as_of or self.as_of)
         
-        # 6. Missing outcome dates for converted leads (0.8% of records) - staging will handle
-        missing_date_indices = df.sample(frac=0.008).index
-        converted_missing = missing_date_indices[df.loc[missing_date_indices, 'converted'] == 1]
-        df.loc[converted_missing, 'outcome_date'] = None
+        lost_outcomes = pd.DataFrame({
+            'outcome_id': self._new_keys('outcomes', rng, int(in_past.sum())),
+            'lead_id': lead_ids[lost_pos[in_past]],
+            'converted': 0,  # Not converted
+            'revenue': 0.0,
+            'outcome_date': self._datetimes(lost_date[in_past], with_time=False),
+            'days_to_close': days_worked[in_past]
+        })
         
-        return df
+        return pd.concat([won_outcomes, lost_outcomes], ignore_index=True)
+    
+    def _data_quality_fault_specs(self):
+        """Realistic data quality issues that staging models will clean, one FaultSpec per issue."""
+        return [
+            # Leads
+            # 1. Test company names (2% of records) - staging will filter these out
+            FaultSpec('test_company_name', 'leads', 'company_name', 0.02,
+                      pick(['Test Company Inc', 'Delete This Company', 'Sample Corp LLC', 'Test Data Corp'])),
+            # 2. Phone numbers with extensions and formatting issues (15% of records with phones)
+            FaultSpec('phone_extension', 'leads', 'contact_phone', 0.15,
+                      append_choice([' x123', ' ext 456', ' extension 789', ' x1001']),
+                      predicate=lambda df: df['contact_phone'].notna().to_numpy()),
+            # 3. Missing regions (5% of records) - staging will set to 'Unknown'
+            FaultSpec('missing_region', 'leads', 'region', 0.05, constant(None)),
+            # 4. Company size case variations (8% of records) - staging will standardize
+            FaultSpec('company_size_case', 'leads', 'company_size', 0.08,
+                      vary({}, default=str.lower),
+                      predicate=lambda df: df['company_size'].isin(self.company_sizes).to_numpy()),
+            # 5. Future dates (0.6% of records) - staging will cap to today
+            FaultSpec('future_created_at', 'leads', 'created_at', 0.006,
+                      pick(['2025-01-15 10:00:00', '2025-02-20 14:30:00', '2025-03-10 09:15:00'])),
+            # 6. Extreme revenue outliers (1.2% of records) - staging will cap/fix
+            FaultSpec('annual_revenue_outlier', 'leads', 'annual_revenue', 0.012,
+                      pick([-500000, 999999999, 50000000, -100000])),
+            
+            # Contact events
+            # 1. Missing response types (6% of records) - staging will set to 'No Response'
+            FaultSpec('missing_response_type', 'contact_events', 'response_type', 0.06, constant(None)),
+            # 2. Contact type casing and naming variations (12% of records) - staging will standardize
+            FaultSpec('contact_type_variation', 'contact_events', 'contact_type', 0.12, vary({
+                'Email': ['email', 'Email'],
+                'Phone Call': ['call', 'phone call', 'Phone Call'],
+                'LinkedIn Message': ['linkedin', 'LinkedIn', 'LinkedIn Message'],
+                'Demo Request': ['demo request']
+            })),
+            # 3. Future event dates (1.2% of records) - staging will cap to today
+            FaultSpec('future_event_date', 'contact_events', 'event_date', 0.012,
+                      pick(['2025-02-01', '2025-01-25', '2025-03-15'])),
+            # 4. Empty string response types (3% of records) - staging will handle
+            FaultSpec('empty_response_type', 'contact_events', 'response_type', 0.03, constant('')),
+            
+            # Funnel stages
+            # 1. Invalid stage orders (2.5% of records) - staging will fix to 1-7 range
+            FaultSpec('invalid_stage_order', 'funnel_stages', 'stage_order', 0.025, pick([-1, 0, 8, 99, -5])),
+            # 2. Stage name variations and casing issues (8% of records) - staging will standardize
+            FaultSpec('stage_name_variation', 'funnel_stages', 'stage_name', 0.08, vary({
+                'New': ['new lead', 'initial', 'new'],
+                'Contacted': ['contacted'],
+                'Qualified': ['qualified', 'mql', 'marketing qualified'],
+                'Demo Scheduled': ['demo', 'demo scheduled'],
+                'Proposal Sent': ['proposal', 'quote', 'quote sent'],
+                'Closed Won': ['closed won', 'won', 'closed-won'],
+                'Closed Lost': ['closed lost', 'lost', 'closed-lost']
+            })),
+            # 3. Future stage dates (1% of records) - staging will cap to today
+            FaultSpec('future_stage_date', 'funnel_stages', 'stage_date', 0.01, pick(['2025-01-30', '2025-02-15'])),
+            # 4. Missing stage orders (1.5% of records) - staging will handle
+            FaultSpec('missing_stage_order', 'funnel_stages', 'stage_order', 0.015, constant(None)),
+            
+            # Outcomes
+            # 1. Negative revenue values (1.5% of records) - staging will set to 0
+            FaultSpec('negative_revenue', 'outcomes', 'revenue', 0.015, negate),
+            # 2. Extreme revenue outliers (1% of records) - staging will cap to realistic amounts
+            FaultSpec('extreme_revenue', 'outcomes', 'revenue', 0.01, pick([999999999, 50000000, 2500000])),
+            # 3. Negative days to close (2% of records) - staging will fix to positive
+            FaultSpec('negative_days_to_close', 'outcomes', 'days_to_close', 0.02, negate),
+            # 4. Inconsistent conversion/revenue logic (1.5% of records) - staging will fix
+            FaultSpec('converted_without_revenue', 'outcomes', 'revenue', 0.015, constant(0),
+                      predicate=lambda df: (df['converted'] == 1).to_numpy()),
+            FaultSpec('revenue_without_conversion', 'outcomes', 'revenue', 0.015, constant(50000),
+                      predicate=lambda df: (df['converted'] == 0).to_numpy()),
+            # 5. Extreme days to close (1% of records) - staging will cap to 730 days
+            FaultSpec('extreme_days_to_close', 'outcomes', 'days_to_close', 0.01, pick([800, 1000, 1500, 999])),
+            # 6. Missing outcome dates for converted leads (0.8% of converted records) - staging will handle
+            FaultSpec('missing_outcome_date', 'outcomes', 'outcome_date', 0.008, constant(None),
+                      predicate=lambda df: (df['converted'] == 1).to_numpy())
+        ]
+    
+    def _introduce_data_quality_issues(self, tables, rng=None):
+        """Inject data quality issues into the tables in place and return the fault manifest."""
+        manifest = inject_faults(tables, self._data_quality_fault_specs(), rng if rng is not None else self.rng)
+        if self.compact:
+            manifest[['table', 'fault', 'column']] = manifest[['table', 'fault', 'column']].astype('category')
+        return manifest
     
-    def _save_to_database(self, leads_df, contact_events_df, funnel_stages_df, outcomes_df):
-        """Save all dataframes to SQLite database."""
-        conn = sqlite3.connect(self.db_path)
+    def _save_to_database(self, leads_df, contact_events_df, funnel_stages_df, outcomes_df, if_exists='replace'):
+        """Save all dataframes to SQLite database (if_exists='append' adds to existing tables); returns load stats."""
+        with SQLiteBulkLoader(self.db_path) as loader:
+            load_stats = loader.load({
+                'leads': leads_df,
+                'contact_events': contact_events_df,
+                'funnel_stages': funnel_stages_df,
+                'outcomes': outcomes_df
+            }, if_exists=if_exists)
+        return load_stats
+    
+    def _report_database_load(self, load_stats, build_indexes=False, report_staging=True):
+        """Print load throughput and, with report_staging, stg_* model build times against the loaded database.
         
-        # Save to database
-        leads_df.to_sql('leads', conn, if_exists='replace', index=False)
-        contact_events_df.to_sql('contact_events', conn, if_exists='replace', index=False)
-        funnel_stages_df.to_sql('funnel_stages', conn, if_exists='replace', index=False)
-        outcomes_df.to_sql('outcomes', conn, if_exists='replace', index=False)
+        build_indexes builds the indexes deferred by chunked/sharded loads first. Returns the staging timings.
+        """
+        staging_timings = None
+        with SQLiteBulkLoader(self.db_path) as loader:
+            if build_indexes:
+                for name in load_stats:
+                    load_stats[name]['index_seconds'] = loader.build_indexes(name)
+            if report_staging:
+                staging_timings = time_staging_models(loader.conn)
         
-        conn.close()
+        print("🗄️ Database load and staging model timings:" if report_staging else "🗄️ Database load timings:")
+        report_load(load_stats, staging_timings)
+        return staging_timings
     
     def _save_to_csv(self, leads_df, contact_events_df, funnel_stages_df, outcomes_df):
         """Save all dataframes to CSV files."""
@@ -558,6 +1107,36 @@ class HybridCRMGenerator:
         contact_events_df.to_csv(self.csv_dir / 'contact_events.csv', index=False)
         funnel_stages_df.to_csv(self.csv_dir / 'funnel_stages.csv', index=False)
         outcomes_df.to_csv(self.csv_dir / 'outcomes.csv', index=False)
+    
+    def _save_fault_manifest(self, fault_manifest):
+        """Save the injected-fault manifest next to the raw data (CSV and database table)."""
+        fault_manifest.to_csv(self.csv_dir / 'fault_manifest.csv', index=False)
+        
+        with SQLiteBulkLoader(self.db_path) as loader:
+            loader.load({'fault_manifest': fault_manifest})
+    
+    def _save_uuid_map(self):
+        """Save the surrogate key -> UUID side table (compact mode) next to the raw data and return it."""
+        uuid_map = self._pop_uuid_map()
+        uuid_map.to_csv(self.csv_dir / 'uuid_map.csv', index=False)
+        
+        with SQLiteBulkLoader(self.db_path) as loader:
+            loader.load({'uuid_map': uuid_map})
+        return uuid_map
+
+
+def _generate_shard(generator, shard_index, n_leads, seed_sequence, shard_dir, first_lead):
+    """Process-pool worker: generate one shard and write it as partitioned CSV and SQLite outputs."""
+    tables = generator._generate_chunk(n_leads, seed_sequence, first_lead)
+    
+    for name, df in tables.items():
+        df.to_csv(shard_dir / f'{name}-{shard_index:05d}.csv', index=False)
+    # Shard databases are only merged, so they skip indexes
+    with SQLiteBulkLoader(shard_dir / f'shard-{shard_index:05d}.db') as loader:
+        loader.load(tables, build_indexes=False)
+    
+    if generator.parquet:
+        write_parquet(tables, generator.parquet_dir.resolve(), part=shard_index, replace=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+"""
+Declarative data quality fault injection for the generated CRM tables.
+Each issue is a FaultSpec (table, column, fraction, predicate, transform) applied with
+boolean masks and array assignment; the returned manifest records which row got which fault.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Row identifier recorded in the manifest for each table
+TABLE_KEYS = {
+    'leads': 'lead_id',
+    'contact_events': 'event_id',
+    'funnel_stages': 'stage_id',
+    'outcomes': 'outcome_id'
+}
+
+
+@dataclass(frozen=True)
+class FaultSpec:
+    """One data quality issue: which rows of a table get which transformed values."""
+    name: str
+    table: str
+    column: str
+    fraction: float
+    transform: Callable[[np.ndarray, np.random.Generator], np.ndarray]
+    predicate: Optional[Callable[[pd.DataFrame], np.ndarray]] = None  # Eligible rows (default: all)
+
+
+# Transform builders: each returns f(values, rng) -> new values for the selected rows
+
+def constant(value):
+    """Replace every selected value with the same constant."""
+    def transform(values, rng):
+        return np.full(len(values), value, dtype=object if value is None or isinstance(value, str) else None)
+    return transform
+
+
+def pick(choices):
+    """Replace each selected value with a random choice from a list."""
+    options = np.array(choices, dtype=object)
+    def transform(values, rng):
+        return options[rng.integers(0, len(options), size=len(values))]
+    return transform
+
+
+def append_choice(suffixes):
+    """Append a randomly chosen suffix to each selected string."""
+    choose = pick(suffixes)
+    def transform(values, rng):
+        return values.astype(object) + choose(values, rng)
+    return transform
+
+
+def vary(variations, default=str.lower):
+    """Replace each value with a random variation of it (values without variations get default(value))."""
+    def transform(values, rng):
+        codes, uniques = pd.factorize(values)
+        result = values.astype(object).copy()
+        for code, original in enumerate(uniques):
+            options = np.array(variations.get(original, [default(original)]), dtype=object)
+            rows = codes == code
+            result[rows] = options[rng.integers(0, len(options), size=int(rows.sum()))]
+        return result
+    return transform
+
+
+def negate(values, rng):
+    """Flip selected numeric values to negative."""
+    return -np.abs(values)
+
+
+def _assign(frame, column, positions, new_values):
+    """Write new values into one column by position, upcasting the column only when needed."""
+    new_values = np.asarray(new_values)
+    if isinstance(frame[column].dtype, pd.CategoricalDtype):
+        # Compact tables: new labels (e.g. casing variants) become extra categories
+        categorical = frame[column].array
+        added = [label for label in pd.unique(new_values[pd.notna(new_values)]) if label not in categorical.categories]
+        categorical = categorical.add_categories(added) if added else categorical.copy()
+        categorical[positions] = new_values
+        frame[column] = categorical
+        return
+
+    # A copy on every path: to_numpy() can be a view of the frame's buffer (read-only under copy-on-write)
+    column_values = frame[column].to_numpy(copy=True)
+    if column_values.dtype.kind == 'M' and new_values.dtype == object:
+        # Compact tables: date strings (or None) into a datetime64 column
+        new_values = pd.to_datetime(new_values).to_numpy().astype(column_values.dtype)
+
+    if column_values.dtype.kind in 'iu' and new_values.dtype == object:
+        try:
+            new_values = new_values.astype(column_values.dtype)
+        except (TypeError, ValueError):
+            pass  # Contains missing values, handled below
+
+    if column_values.dtype.kind in 'iu' and new_values.dtype.kind not in 'iu':
+        # Missing or fractional values in an integer column (e.g. stage_order) -> float column
+        column_values = column_values.astype(float)
+        new_values = new_values.astype(float)
+    elif column_values.dtype.kind == 'f' and new_values.dtype == object:
+        new_values = new_values.astype(float)
+    elif column_values.dtype != object and new_values.dtype == object:
+        column_values = column_values.astype(object)
+
+    column_values[positions] = new_values
+    frame[column] = column_values
+
+
+def inject_faults(tables, specs, rng):
+    """Apply fault specs in order, mutating the tables' columns in place.
+
+    Specs on the same (table, column) are exclusive: a row faulted by an earlier spec is not
+    eligible for later ones, so no fault overwrites another. Returns a manifest DataFrame with
+    one row per (table, fault, column, row_id) injected.
+    """
+    manifest = []
+    faulted = {}  # (table, column) -> rows already faulted in that column
+
+    for spec in specs:
+        frame = tables[spec.table]
+        if len(frame) == 0:
+            continue
+
+        # Sample the requested fraction of eligible rows without replacement
+        already_faulted = faulted.setdefault((spec.table, spec.column), np.zeros(len(frame), dtype=bool))
+        eligible_mask = spec.predicate(frame) if spec.predicate is not None else np.ones(len(frame), dtype=bool)
+        eligible = np.flatnonzero(eligible_mask & ~already_faulted)
+        n_faults = int(round(spec.fraction * len(eligible)))
+        if n_faults == 0:
+            continue
+        positions = np.sort(rng.choice(eligible, size=n_faults, replace=False))
+        already_faulted[positions] = True
+
+        current = frame[spec.column].to_numpy()[positions]
+        _assign(frame, spec.column, positions, spec.transform(current, rng))
+
+        manifest.append(pd.DataFrame({
+            'table': spec.table,
+            'fault': spec.name,
+            'column': spec.column,
+            'row_id': frame[TABLE_KEYS[spec.table]].to_numpy()[positions]
+        }))
+
+    if not manifest:
+        return pd.DataFrame(columns=['table', 'fault', 'column', 'row_id'])
+    return pd.concat(manifest, ignore_index=True)
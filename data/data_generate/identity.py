@@ -0,0 +1,115 @@
+"""
+Synthetic company names, contact emails and phone numbers composed from pre-built token pools.
+Faker is called only to build the pools (once per provider); every column is then assembled with
+vectorized indexing and string concatenation, in the same formats Faker's en_US providers produce.
+Emails are unique by construction, except for an exact, configurable share of duplicate rows
+(load-testing the stg_leads email dedup).
+"""
+
+import re
+
+import numpy as np
+from faker import Faker
+
+
+COMPANY_SUFFIXES = ['Inc', 'and Sons', 'LLC', 'Group', 'PLC', 'Ltd']
+EMAIL_DOMAINS = ['example.com', 'example.org', 'example.net']
+
+# Faker en_US phone formats: '#' is any digit, '$' a digit 2-9 (area and exchange codes)
+PHONE_FORMATS = [
+    '$##$######', '$##-$##-####', '($##)$##-####', '$##.$##.####', '+1-$##-$##-####', '001-$##-$##-####',
+    '$##-$##-####x###', '($##)$##-####x####', '$##.$##.####x#####', '001-$##-$##-####x###'
+]
+PHONE_FORMAT_PROBABILITIES = [0.15, 0.15, 0.1, 0.1, 0.1, 0.1, 0.075, 0.075, 0.075, 0.075]
+
+
+def _fill_template(template, n, rng):
+    """n strings of one fixed-width template with '#' and '$' replaced by random digits."""
+    chars = np.tile(np.frombuffer(template.encode('ascii'), dtype=np.uint8), (n, 1))
+    for placeholder, low in [('#', 0), ('$', 2)]:
+        positions = [i for i, char in enumerate(template) if char == placeholder]
+        if positions:
+            chars[:, positions] = ord('0') + rng.integers(low, 10, size=(n, len(positions)), dtype=np.uint8)
+    return chars.astype(np.uint32).view(f'U{len(template)}').ravel().astype(object)
+
+
+class IdentityProvider:
+    """Vectorized company names, emails and phone numbers from token pools built once with Faker.
+
+    The pools depend only on seed and pool_size; the values drawn depend on the rng passed to each call.
+    """
+
+    def __init__(self, seed=42, pool_size=1000):
+        fake = Faker('en_US')
+        fake.seed_instance(seed)
+
+        # Unique tokens, sorted so the pools do not depend on draw order
+        self.last_names = np.array(sorted({fake.last_name() for _ in range(pool_size)}), dtype=object)
+        self.first_names = np.array(sorted({fake.first_name() for _ in range(pool_size)}), dtype=object)
+        self.user_last_names = np.array([self._user_token(name) for name in self.last_names], dtype=object)
+        self.user_first_names = np.array([self._user_token(name) for name in self.first_names], dtype=object)
+        self.company_suffixes = np.array(COMPANY_SUFFIXES, dtype=object)
+        self.email_domains = np.array(EMAIL_DOMAINS, dtype=object)
+
+    @staticmethod
+    def _user_token(name):
+        # Email user names are lowercase letters only, so a numeric serial can follow them unambiguously
+        return re.sub('[^a-z]', '', name.lower())
+
+    def company_names(self, n, rng):
+        """'Last Suffix', 'Last-Last' or 'Last, Last and Last', one format per row with equal probability."""
+        last = [self.last_names[rng.integers(0, len(self.last_names), size=n)] for _ in range(3)]
+        suffix = self.company_suffixes[rng.integers(0, len(self.company_suffixes), size=n)]
+        formats = rng.integers(0, 3, size=n)
+
+        # Each format is composed only for its own rows
+        names = np.empty(n, dtype=object)
+        rows = formats == 0
+        names[rows] = last[0][rows] + ' ' + suffix[rows]
+        rows = formats == 1
+        names[rows] = last[0][rows] + '-' + last[1][rows]
+        rows = formats == 2
+        names[rows] = last[0][rows] + ', ' + last[1][rows] + ' and ' + last[2][rows]
+        return names
+
+    def emails(self, n, rng, first_serial=0, duplicate_rate=0.0):
+        """Emails unique by construction, then exactly round(duplicate_rate * n) rows copy another row's email.
+
+        Each user name ends in its row's serial (first_serial + row), so callers generating in chunks
+        pass disjoint serial ranges to keep emails unique across chunks.
+        """
+        first = self.user_first_names[rng.integers(0, len(self.user_first_names), size=n)]
+        last = self.user_last_names[rng.integers(0, len(self.user_last_names), size=n)]
+        initial = np.array(list('abcdefghijklmnopqrstuvwxyz'), dtype=object)[rng.integers(0, 26, size=n)]
+        formats = rng.integers(0, 4, size=n)
+
+        # Faker's user name formats: last.first, first.last, first (its ## digits become the serial), initial+last
+        user = np.empty(n, dtype=object)
+        rows = formats == 0
+        user[rows] = last[rows] + '.' + first[rows]
+        rows = formats == 1
+        user[rows] = first[rows] + '.' + last[rows]
+        rows = formats == 2
+        user[rows] = first[rows]
+        rows = formats == 3
+        user[rows] = initial[rows] + last[rows]
+        serial = np.arange(first_serial, first_serial + n).astype(str).astype(object)
+        domain = self.email_domains[rng.integers(0, len(self.email_domains), size=n)]
+        emails = user + serial + '@' + domain
+
+        # Duplicates copy an original (never another duplicate), so the dedup drops exactly n_duplicates rows
+        n_duplicates = int(round(duplicate_rate * n))
+        if n_duplicates:
+            duplicate_rows = rng.choice(n, size=n_duplicates, replace=False)
+            originals = np.setdiff1d(np.arange(n), duplicate_rows)
+            emails[duplicate_rows] = emails[rng.choice(originals, size=n_duplicates)]
+        return emails
+
+    def phone_numbers(self, n, rng):
+        """US phone numbers in Faker's en_US formats (some with extensions)."""
+        phones = np.empty(n, dtype=object)
+        format_codes = rng.choice(len(PHONE_FORMATS), size=n, p=PHONE_FORMAT_PROBABILITIES)
+        for code, template in enumerate(PHONE_FORMATS):
+            rows = np.flatnonzero(format_codes == code)
+            phones[rows] = _fill_template(template, len(rows), rng)
+        return phones
@@ -0,0 +1,212 @@
+"""
+Per-stage instrumentation for the generator pipeline.
+Each stage emits a StageRecord (name, start/end time, rows in/out, bytes written, RSS delta) to
+pluggable sinks: a JSON lines file, the logging module, or any callable. A profiler hook (cProfile
+or a low-overhead stack sampler) can be attached to a single stage by name.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import psutil
+
+
+@dataclass
+class StageRecord:
+    """Measurements of one pipeline stage; rows_out and bytes_written are filled in by the stage."""
+    stage: str
+    run_id: str
+    started_at: str = None
+    ended_at: str = None
+    seconds: float = None
+    rows_in: int = 0
+    rows_out: int = 0
+    bytes_written: int = 0
+    rss_start_mb: float = None
+    rss_end_mb: float = None
+    rss_delta_mb: float = None
+    metadata: dict = field(default_factory=dict)
+    profile: list = None
+    error: str = None  # 'ExceptionType: message' when the stage raised
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class JsonLinesSink:
+    """Append each record as one JSON line to a file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record.to_dict(), default=str) + '\n')
+
+
+class LoggingSink:
+    """Log each record as one line, with the record's fields attached as extra={'stage_record': {...}}."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('data_generate.stages')
+        self.level = level
+
+    def __call__(self, record):
+        self.logger.log(
+            logging.ERROR if record.error else self.level,
+            "%s: %.3fs, rows %d -> %d, %d bytes written, RSS %+.1f MB%s",
+            record.stage, record.seconds, record.rows_in, record.rows_out, record.bytes_written, record.rss_delta_mb,
+            f", failed: {record.error}" if record.error else '',
+            extra={'stage_record': record.to_dict()}
+        )
+
+
+class CProfileHook:
+    """Deterministic profile of a stage with cProfile; keeps the top functions by cumulative time.
+
+    With path set, the full stats are also dumped there (open with pstats or snakeviz).
+    """
+
+    def __init__(self, path=None, top=20):
+        self.path = path
+        self.top = top
+
+    @contextmanager
+    def profile(self, record):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if self.path is not None:
+                profiler.dump_stats(self.path)
+            stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats('cumulative')
+            record.profile = [
+                {'function': pstats.func_std_string(function), 'calls': calls, 'total_seconds': total,
+                 'cumulative_seconds': cumulative}
+                for function, (_, calls, total, cumulative, _) in
+                sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+            ]
+
+
+class SamplingProfilerHook:
+    """Low-overhead profile of a stage: samples the stage thread's stack every interval seconds.
+
+    Keeps the top functions by the share of samples they were on top of the stack in (self), with the
+    share they appear anywhere in the stack (inclusive).
+    """
+
+    def __init__(self, interval=0.005, top=20):
+        self.interval = interval
+        self.top = top
+
+    @contextmanager
+    def profile(self, record):
+        thread_id = threading.get_ident()
+        inclusive, exclusive = Counter(), Counter()
+        samples = 0
+        stop = threading.Event()
+
+        def sample():
+            nonlocal samples
+            while not stop.wait(self.interval):
+                frame = sys._current_frames().get(thread_id)
+                if frame is None:
+                    continue
+                samples += 1
+                exclusive[_frame_label(frame)] += 1
+                seen = set()
+                while frame is not None:
+                    label = _frame_label(frame)
+                    if label not in seen:
+                        inclusive[label] += 1
+                        seen.add(label)
+                    frame = frame.f_back
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            sampler.join()
+            record.profile = [
+                {'function': label, 'samples': count, 'self_share': count / samples,
+                 'inclusive_share': inclusive[label] / samples}
+                for label, count in exclusive.most_common(self.top)
+            ] if samples else []
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_filename}:{code.co_firstlineno}({code.co_name})'
+
+
+class Instrumentation:
+    """Emits a StageRecord per pipeline stage to every sink.
+
+    sinks are callables taking a StageRecord (JsonLinesSink, LoggingSink or any function);
+    profilers maps a stage name to a hook (CProfileHook or SamplingProfilerHook) run around that stage.
+    """
+
+    def __init__(self, sinks=(), profilers=None):
+        self.sinks = list(sinks)
+        self.profilers = dict(profilers or {})
+        self.run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+        self.records = []
+        self._process = psutil.Process()
+
+    @contextmanager
+    def stage(self, name, rows_in=0, **metadata):
+        """Measure the enclosed block as one stage; set rows_out and bytes_written on the yielded record.
+
+        A stage that raises is still recorded and emitted, with its error set, before the exception propagates.
+        """
+        record = StageRecord(stage=name, run_id=self.run_id, rows_in=int(rows_in), metadata=metadata)
+        record.started_at = datetime.now().isoformat()
+        rss_start = self._process.memory_info().rss
+        start = time.perf_counter()
+
+        profiler = self.profilers.get(name)
+        try:
+            with profiler.profile(record) if profiler is not None else _no_profile():
+                yield record
+        except BaseException as exc:
+            record.error = f'{type(exc).__name__}: {exc}'
+            raise
+        finally:
+            record.seconds = time.perf_counter() - start
+            record.ended_at = datetime.now().isoformat()
+            rss_end = self._process.memory_info().rss
+            record.rss_start_mb = rss_start / 1e6
+            record.rss_end_mb = rss_end / 1e6
+            record.rss_delta_mb = (rss_end - rss_start) / 1e6
+            record.rows_out = int(record.rows_out)
+            record.bytes_written = int(record.bytes_written)
+
+            self.records.append(record)
+            for sink in self.sinks:
+                sink(record)
+
+
+@contextmanager
+def _no_profile():
+    yield
+
+
+def file_sizes(paths):
+    """Total size in bytes of the given files (missing files count as 0)."""
+    return sum(Path(path).stat().st_size for path in paths if Path(path).exists())
@@ -0,0 +1,114 @@
+"""
+Partitioned Parquet output for the generated CRM tables, written and read through DuckDB.
+Tables are partitioned by month of their main date column and by test group (hive layout),
+with typed date/timestamp columns; Parquet dictionary-encodes the low-cardinality strings.
+"""
+
+import shutil
+from pathlib import Path
+
+import duckdb
+
+
+# Main date column (partition month) and typed casts per table
+TABLE_LAYOUTS = {
+    'leads': {
+        'date_column': 'created_at',
+        'casts': {'created_at': 'TIMESTAMP', 'assigned_at': 'DATE', 'annual_revenue': 'DOUBLE'}
+    },
+    'contact_events': {
+        'date_column': 'event_date',
+        'casts': {'event_date': 'DATE'}
+    },
+    'funnel_stages': {
+        'date_column': 'stage_date',
+        'casts': {'stage_date': 'DATE', 'stage_order': 'INTEGER'}
+    },
+    'outcomes': {
+        'date_column': 'outcome_date',
+        'casts': {'outcome_date': 'DATE', 'converted': 'INTEGER', 'revenue': 'DOUBLE', 'days_to_close': 'INTEGER'}
+    }
+}
+
+FILTER_OPERATORS = {'=', '!=', '<', '<=', '>', '>=', 'in', 'not in'}
+
+
+def write_parquet(tables, base_dir, part=0, replace=True):
+    """Write tables as partitioned Parquet datasets under base_dir/<table>/.
+
+    part numbers the files so chunks and shards can add files to the same dataset;
+    replace=True clears existing datasets first.
+    """
+    base_dir = Path(base_dir)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect()
+
+    for name, df in tables.items():
+        table_dir = base_dir / name
+        if replace and table_dir.exists():
+            shutil.rmtree(table_dir)
+        table_dir.mkdir(exist_ok=True)
+        con.register(name, df)
+
+    # Child tables take the test group from their lead (tables of one chunk always include their leads),
+    # unless they carry their own "group" column (daily deltas, whose leads arrived on earlier days)
+    for name, df in tables.items():
+        table_dir = base_dir / name
+        if name not in TABLE_LAYOUTS:
+            # Unpartitioned table (e.g. fault_manifest)
+            con.execute(f"COPY {name} TO '{table_dir / f'part-{part:05d}.parquet'}' (FORMAT PARQUET, COMPRESSION zstd)")
+            continue
+
+        layout = TABLE_LAYOUTS[name]
+        columns = [
+            f'TRY_CAST(t."{column}" AS {layout["casts"][column]}) AS "{column}"' if column in layout['casts']
+            else f't."{column}"'
+            for column in df.columns if column != 'group'
+        ]
+        group_source = 't' if 'group' in df.columns else 'l'
+        join = '' if 'group' in df.columns else 'LEFT JOIN (SELECT lead_id, "group" FROM leads) l ON t.lead_id = l.lead_id'
+        date_column = f'TRY_CAST(t."{layout["date_column"]}" AS DATE)'
+
+        con.execute(f"""
+            COPY (
+                SELECT {', '.join(columns)},
+                       strftime({date_column}, '%Y-%m') AS month,
+                       {group_source}."group" AS "group"
+                FROM {name} t {join}
+            ) TO '{table_dir}' (
+                FORMAT PARQUET, COMPRESSION zstd, PARTITION_BY (month, "group"),
+                OVERWRITE_OR_IGNORE true, FILENAME_PATTERN 'part-{part:05d}-{{i}}'
+            )
+        """)
+
+    con.close()
+
+
+def read_parquet(table, columns=None, filters=None, base_dir='./raw_parquet'):
+    """Read a Parquet dataset into a DataFrame, pushing projection and filters down to the scan.
+
+    filters is a list of (column, op, value) tuples, e.g.
+    [('month', '>=', '2024-06'), ('group', '=', 'test'), ('region', 'in', ['Europe'])].
+    Filters on the month/group partition columns skip whole directories; other filters
+    use Parquet row-group statistics.
+    """
+    select = ', '.join(f'"{column}"' for column in columns) if columns else '*'
+    conditions = []
+    params = []
+    for column, op, value in filters or []:
+        op = op.lower()
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if op in ('in', 'not in'):
+            conditions.append(f'"{column}" {op.upper()} ({", ".join("?" for _ in value)})')
+            params.extend(value)
+        else:
+            conditions.append(f'"{column}" {op} ?')
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    path = (Path(base_dir) / table / '**' / '*.parquet').as_posix()
+    con = duckdb.connect()
+    df = con.execute(f"SELECT {select} FROM read_parquet('{path}', hive_partitioning = true) {where}", params).df()
+    con.close()
+    return df
@@ -0,0 +1,221 @@
+"""
+High-throughput SQLite loader for the generated CRM tables.
+Batch-inserts inside one transaction per table with bulk-load PRAGMAs, declares column types,
+and builds the indexes the stg_* models join and partition on after the data is in.
+"""
+
+import sqlite3
+import time
+
+import pandas as pd
+
+from data_generate.compact import as_text
+
+
+# Declared column types (dates stay ISO text, as the stg_* models compare them as strings)
+TABLE_SCHEMAS = {
+    'leads': {
+        'lead_id': 'TEXT', 'company_name': 'TEXT', 'contact_email': 'TEXT', 'contact_phone': 'TEXT',
+        'industry': 'TEXT', 'region': 'TEXT', 'source_channel': 'TEXT', 'company_size': 'TEXT',
+        'created_at': 'TEXT', 'annual_revenue': 'REAL', 'group': 'TEXT', 'assigned_at': 'TEXT'
+    },
+    'contact_events': {
+        'event_id': 'TEXT', 'lead_id': 'TEXT', 'event_date': 'TEXT', 'contact_type': 'TEXT', 'response_type': 'TEXT'
+    },
+    'funnel_stages': {
+        'stage_id': 'TEXT', 'lead_id': 'TEXT', 'stage_name': 'TEXT', 'stage_date': 'TEXT', 'stage_order': 'INTEGER'
+    },
+    'outcomes': {
+        'outcome_id': 'TEXT', 'lead_id': 'TEXT', 'converted': 'INTEGER', 'revenue': 'REAL',
+        'outcome_date': 'TEXT', 'days_to_close': 'INTEGER'
+    },
+    'fault_manifest': {
+        'table': 'TEXT', 'fault': 'TEXT', 'column': 'TEXT', 'row_id': 'TEXT'
+    },
+    'uuid_map': {
+        'table': 'TEXT', 'key': 'INTEGER', 'uuid': 'TEXT'
+    }
+}
+
+# Join, partition and window keys used by the stg_* models
+TABLE_INDEXES = {
+    'leads': [('lead_id',), ('contact_email', 'created_at'), ('created_at',)],
+    'contact_events': [('lead_id',), ('event_date',)],
+    'funnel_stages': [('lead_id', 'stage_date', 'stage_order'), ('stage_date',)],
+    'outcomes': [('lead_id',), ('outcome_date',)],
+    'fault_manifest': [('table', 'fault')],
+    'uuid_map': [('table', 'key')]
+}
+
+BULK_LOAD_PRAGMAS = [
+    'PRAGMA journal_mode = MEMORY',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -262144'  # 256 MB page cache
+]
+
+
+def _sqlite_type(dtype, declared=None):
+    """Declared type for a column: its schema entry, else derived from the dtype.
+
+    Integer columns declared TEXT (surrogate keys of compact tables, in place of UUIDs) are INTEGER.
+    """
+    if declared is not None:
+        integer_keys = declared == 'TEXT' and dtype is not None and pd.api.types.is_integer_dtype(dtype)
+        return 'INTEGER' if integer_keys else declared
+    if dtype is None:
+        return 'TEXT'
+    if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+
+class SQLiteBulkLoader:
+    """Bulk loads DataFrames into a SQLite database, replacing or appending to its tables."""
+
+    def __init__(self, db_path, batch_size=50000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        for pragma in BULK_LOAD_PRAGMAS:
+            self.conn.execute(pragma)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.close()
+        self.conn = None
+
+    def load(self, tables, if_exists='replace', build_indexes=True):
+        """Load {name: DataFrame} and return per-table load stats.
+
+        if_exists='replace' recreates each table; 'append' adds rows (creating missing tables).
+        Indexes are dropped before and rebuilt after the load when build_indexes is set.
+        """
+        stats = {}
+        for name, df in tables.items():
+            start = time.perf_counter()
+            if if_exists == 'replace':
+                self.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            elif if_exists != 'append':
+                raise ValueError(f"if_exists must be 'replace' or 'append', got {if_exists!r}")
+            self.create_table(name, df.columns, df.dtypes)
+            if build_indexes:
+                self.drop_indexes(name)
+
+            self.insert(name, df)
+            load_seconds = time.perf_counter() - start
+
+            index_seconds = self.build_indexes(name) if build_indexes else 0.0
+            stats[name] = {
+                'rows': len(df),
+                'load_seconds': load_seconds,
+                'rows_per_sec': len(df) / load_seconds if load_seconds > 0 else float('inf'),
+                'index_seconds': index_seconds
+            }
+        return stats
+
+    def create_table(self, name, columns, dtypes=None):
+        """Create a table with declared column types if it does not exist yet."""
+        schema = TABLE_SCHEMAS.get(name, {})
+        column_defs = ', '.join(
+            f'"{column}" {_sqlite_type(dtypes[column] if dtypes is not None else None, schema.get(column))}'
+            for column in columns
+        )
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" ({column_defs})')
+
+    def insert(self, name, df):
+        """Batch-insert a DataFrame's rows inside a single transaction."""
+        columns = ', '.join(f'"{column}"' for column in df.columns)
+        placeholders = ', '.join('?' for _ in df.columns)
+        sql = f'INSERT INTO "{name}" ({columns}) VALUES ({placeholders})'
+
+        self.conn.execute('BEGIN')
+        try:
+            for batch_start in range(0, len(df), self.batch_size):
+                # datetime64 columns (compact tables) are stored as ISO text like the string tables
+                batch = as_text(df.iloc[batch_start:batch_start + self.batch_size])
+                # Python scalars with None for missing values (sqlite3 cannot bind NaN/NumPy types as NULL)
+                values = batch.astype(object).where(batch.notna(), None)
+                self.conn.executemany(sql, values.itertuples(index=False, name=None))
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def append_database(self, other_db_path, names):
+        """Append the given tables of another database file (e.g. a generation shard) in one transaction.
+
+        Returns per-table load stats like load(), without index times.
+        """
+        stats = {}
+        self.conn.execute('ATTACH DATABASE ? AS other', (str(other_db_path),))
+        try:
+            self.conn.execute('BEGIN')
+            for name in names:
+                start = time.perf_counter()
+                columns = [row[1] for row in self.conn.execute(f'PRAGMA other.table_info("{name}")')]
+                self.create_table(name, columns)
+                column_list = ', '.join(f'"{column}"' for column in columns)
+                cursor = self.conn.execute(
+                    f'INSERT INTO main."{name}" ({column_list}) SELECT {column_list} FROM other."{name}"'
+                )
+                load_seconds = time.perf_counter() - start
+                stats[name] = {
+                    'rows': cursor.rowcount,
+                    'load_seconds': load_seconds,
+                    'rows_per_sec': cursor.rowcount / load_seconds if load_seconds > 0 else float('inf'),
+                    'index_seconds': 0.0
+                }
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        finally:
+            self.conn.execute('DETACH DATABASE other')
+        return stats
+
+    def drop_indexes(self, name):
+        for columns in TABLE_INDEXES.get(name, []):
+            self.conn.execute(f'DROP INDEX IF EXISTS "{self._index_name(name, columns)}"')
+
+    def build_indexes(self, name, analyze=True):
+        """(Re)build a table's indexes after loading; returns the seconds taken.
+
+        analyze=False skips refreshing planner statistics (a full scan) for small incremental appends.
+        """
+        start = time.perf_counter()
+        for columns in TABLE_INDEXES.get(name, []):
+            column_list = ', '.join(f'"{column}"' for column in columns)
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{self._index_name(name, columns)}" ON "{name}" ({column_list})')
+        if analyze:
+            self.conn.execute(f'ANALYZE "{name}"')
+        return time.perf_counter() - start
+
+    @staticmethod
+    def _index_name(name, columns):
+        return f'idx_{name}_' + '_'.join(columns)
+
+
+def accumulate_stats(totals, stats):
+    """Add one load's per-table stats into running totals (e.g. across streamed chunks or merged shards)."""
+    for name, table_stats in stats.items():
+        total = totals.setdefault(name, {'rows': 0, 'load_seconds': 0.0, 'index_seconds': 0.0})
+        total['rows'] += table_stats['rows']
+        total['load_seconds'] += table_stats['load_seconds']
+        total['index_seconds'] += table_stats['index_seconds']
+        total['rows_per_sec'] = total['rows'] / total['load_seconds'] if total['load_seconds'] > 0 else float('inf')
+    return totals
+
+
+def report_load(stats, staging_timings=None):
+    """Print load throughput per table and, optionally, stg_* model build times."""
+    for name, table_stats in stats.items():
+        print(f"   {name}: {table_stats['rows']:,} rows in {table_stats['load_seconds']:.2f}s "
+              f"({table_stats['rows_per_sec']:,.0f} rows/sec), indexes {table_stats['index_seconds']:.2f}s")
+    for model, (rows, seconds) in (staging_timings or {}).items():
+        print(f"   {model}: {rows:,} rows in {seconds:.3f}s")
@@ -0,0 +1,61 @@
+"""
+Render the dbt staging models (dbt/models/staging/stg_*.sql) to plain SQL outside dbt,
+so loaders and benchmarks can time them directly against SQLite or DuckDB.
+"""
+
+import time
+from pathlib import Path
+
+from jinja2 import Environment
+
+
+DBT_DIR = Path(__file__).resolve().parents[2] / 'dbt'
+STAGING_MODELS = ['stg_leads', 'stg_contact_events', 'stg_funnel_stages', 'stg_outcomes']
+
+
+def render_model(name, dialect='sqlite', relations=None):
+    """Render one model to SQL for a dialect ('sqlite' or 'duckdb'), as a full (non-incremental) build.
+
+    relations optionally maps source table names to SQL relations (e.g. read_parquet(...)).
+    """
+    relations = relations or {}
+    macros = ''.join(path.read_text() for path in sorted((DBT_DIR / 'macros').glob('*.sql')))
+    model = (DBT_DIR / 'models' / 'staging' / f'{name}.sql').read_text()
+
+    template = Environment().from_string(macros + model)
+    return template.render(
+        config=lambda **kwargs: '',
+        source=lambda source_name, table: relations.get(table, f'"{table}"'),
+        is_incremental=lambda: False,
+        var=lambda var_name, default=None: default,
+        target={'type': dialect}
+    ).strip()
+
+
+def time_staging_models(conn, dialect='sqlite', relations=None):
+    """Build every staging model as a temp table on an open connection; return {model: (rows, seconds)}.
+
+    On SQLite the temp tables go to a temp file (temp_store = FILE for the duration), so a bulk-load
+    connection's in-memory temp store does not hold whole models in RAM.
+    """
+    if dialect == 'sqlite':
+        temp_store = conn.execute('PRAGMA temp_store').fetchone()[0]
+        conn.execute('PRAGMA temp_store = FILE')
+    try:
+        return _time_models(conn, dialect, relations)
+    finally:
+        if dialect == 'sqlite':
+            conn.execute(f'PRAGMA temp_store = {temp_store}')
+
+
+def _time_models(conn, dialect, relations):
+    timings = {}
+    for name in STAGING_MODELS:
+        sql = render_model(name, dialect, relations)
+        start = time.perf_counter()
+        conn.execute(f'CREATE TEMP TABLE timing_{name} AS\n{sql}\n')
+        seconds = time.perf_counter() - start
+        rows = conn.execute(f'SELECT COUNT(*) FROM timing_{name}').fetchone()[0]
+        conn.execute(f'DROP TABLE timing_{name}')
+        timings[name] = (rows, seconds)
+    return timings
@@ -0,0 +1,55 @@
+"""
+Checks of analysis.power's simulated power curves.
+Run from the data/ folder: python -m unittest discover -s tests (or python -m pytest tests)
+"""
+
+import math
+import os
+import tempfile
+import unittest
+
+from analysis.power import power_curve
+from data_generate.data_generator import HybridCRMGenerator
+
+
+ALPHA = 0.05
+REPLICATES = 2_000
+LEADS_PER_GROUP = 2_000
+
+
+class PowerCurveTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # The generator creates its db/ folder in the working directory
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                cls.generator = HybridCRMGenerator(seed=42, batched=True)
+            finally:
+                os.chdir(cwd)
+        cls.control_rate = cls.generator.group_params['control']['outcome_rate']
+        cls.curve = power_curve(cls.generator, 'outcome_rate', [cls.control_rate, 0.60], LEADS_PER_GROUP,
+                                REPLICATES, ALPHA, seed=42, workers=1)
+
+    def rates(self, value):
+        at_value = self.curve[self.curve['outcome_rate'] == value]
+        return dict(zip(at_value['metric'], at_value['rejection_rate']))
+
+    def test_control_value_rejects_at_alpha(self):
+        # With the parameter at control's value the arms are identical: every metric is an A/A test
+        tolerance = 4 * math.sqrt(ALPHA * (1 - ALPHA) / REPLICATES)
+        for metric, rate in self.rates(self.control_rate).items():
+            with self.subTest(metric=metric):
+                self.assertAlmostEqual(rate, ALPHA, delta=tolerance)
+
+    def test_only_the_swept_parameter_differs(self):
+        # Outcome rate moves conversions but not responses; the test group's response_boost must not leak in
+        at_control, at_value = self.rates(self.control_rate), self.rates(0.60)
+        self.assertGreater(at_value['conversion_rate'], at_control['conversion_rate'] + 0.1)
+        self.assertEqual(at_value['response_rate'], at_control['response_rate'])
+
+
+if __name__ == "__main__":
+    unittest.main()
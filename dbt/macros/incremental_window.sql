@@ -0,0 +1,22 @@
+-- Incremental refresh helpers for the staging models
+
+-- Rows dated on or after the model's high-water mark minus lookback_days, so rows arriving up to
+-- lookback_days late are still picked up. The mark ignores dates after today (future-dated bad rows),
+-- which therefore get re-processed on every run. Both sides of each comparison are cast to dates:
+-- on SQLite the columns are timestamp text, and comparing that to a date string is lexical.
+{% macro incremental_window(source_column, target_column=none) -%}
+    {{ to_date(source_column) }} >= COALESCE((
+        SELECT {{ add_days('MAX(' ~ (target_column or source_column) ~ ')', -var('lookback_days', 3)) }}
+        FROM {{ this }}
+        WHERE {{ to_date(target_column or source_column) }} <= {{ to_date(today_date()) }}
+    ), {{ to_date("'1900-01-01'") }})
+{%- endmacro %}
+
+-- Post-hook: index the unique key (delete+insert) and the window column (high-water mark) of a model
+{% macro key_index(column) -%}
+    {%- if target.type == 'sqlite' -%}
+        CREATE INDEX IF NOT EXISTS "{{ this.schema }}"."{{ this.identifier }}__{{ column }}" ON "{{ this.identifier }}" ("{{ column }}")
+    {%- else -%}
+        CREATE INDEX IF NOT EXISTS "{{ this.identifier }}__{{ column }}" ON {{ this }} ("{{ column }}")
+    {%- endif -%}
+{%- endmacro %}
@@ -0,0 +1,49 @@
+-- Date helpers that render for both targets (SQLite keeps dates as ISO text, DuckDB has DATE types)
+
+-- Today, or the run_date var when replaying simulated days (dbt run --vars '{run_date: 2024-03-05}')
+{% macro today_date() -%}
+    {%- set run_date = var('run_date', none) -%}
+    {%- if run_date is not none and target.type == 'duckdb' -%}
+        DATE '{{ run_date }}'
+    {%- elif run_date is not none -%}
+        '{{ run_date }}'
+    {%- elif target.type == 'duckdb' -%}
+        CURRENT_DATE
+    {%- else -%}
+        DATE('now')
+    {%- endif -%}
+{%- endmacro %}
+
+{% macro days_between(start_date, end_date) -%}
+    {%- if target.type == 'duckdb' -%}
+        DATE_DIFF('day', CAST({{ start_date }} AS DATE), CAST({{ end_date }} AS DATE))
+    {%- else -%}
+        CAST((JULIANDAY({{ end_date }}) - JULIANDAY({{ start_date }})) AS INTEGER)
+    {%- endif -%}
+{%- endmacro %}
+
+{% macro add_days(date_expression, days) -%}
+    {%- if target.type == 'duckdb' -%}
+        (CAST({{ date_expression }} AS DATE) + {{ days }})
+    {%- else -%}
+        DATE({{ date_expression }}, '{{ days }} day')
+    {%- endif -%}
+{%- endmacro %}
+
+-- Calendar day of a date or timestamp (ISO text on SQLite)
+{% macro to_date(expression) -%}
+    {%- if target.type == 'duckdb' -%}
+        CAST({{ expression }} AS DATE)
+    {%- else -%}
+        DATE({{ expression }})
+    {%- endif -%}
+{%- endmacro %}
+
+-- Latest of several dates, ignoring NULLs; the first must not be NULL (SQLite's scalar MAX() is NULL if any argument is)
+{% macro greatest_date(expressions) -%}
+    {%- if target.type == 'duckdb' -%}
+        GREATEST({{ expressions | join(', ') }})
+    {%- else -%}
+        MAX({% for expression in expressions %}COALESCE({{ expression }}, {{ expressions[0] }}){{ ', ' if not loop.last }}{% endfor %})
+    {%- endif -%}
+{%- endmacro %}
@@ -0,0 +1,60 @@
+{{ config(
+    materialized='incremental',
+    unique_key='cohort_date',
+    incremental_strategy='delete+insert',
+    post_hook=["{{ key_index('cohort_date') }}"]
+) }}
+
+-- Experiment cube: additive lead measures by group, lead cohort day and segment cell,
+-- so any dashboard slice is a GROUP BY over the cube instead of a join of the stg_* models
+WITH lead_metrics AS (
+    SELECT * FROM {{ ref('mart_lead_metrics') }}
+    {% if is_incremental() %}
+    -- INCREMENTAL: rebuild the cohort days of leads with activity inside the refresh window,
+    -- plus days whose lead count changed (leads replaced by a newer lead with the same email)
+    WHERE cohort_date IN (
+        SELECT cohort_date FROM {{ ref('mart_lead_metrics') }}
+        WHERE {{ incremental_window('last_activity_date') }}
+        UNION
+        SELECT m.cohort_date
+        FROM (
+            SELECT cohort_date, COUNT(*) AS leads FROM {{ ref('mart_lead_metrics') }} GROUP BY cohort_date
+        ) m
+        LEFT JOIN (
+            SELECT cohort_date, SUM(leads) AS leads FROM {{ this }} GROUP BY cohort_date
+        ) c ON m.cohort_date = c.cohort_date
+        WHERE c.leads IS NULL OR c.leads <> m.leads
+    )
+    {% endif %}
+)
+
+-- ADDITIVE MEASURES ONLY: counts, sums and sums of squares roll up by summation to any slice
+-- (rates, means and variances are derived after the roll-up, see data/analysis/cube.py)
+SELECT
+    lead_group,
+    cohort_date,
+    region,
+    industry,
+    source_channel,
+    company_size,
+    COUNT(*) AS leads,
+    SUM(CASE WHEN contacts > 0 THEN 1 ELSE 0 END) AS contacted,
+    SUM(reached_contacted) AS reached_contacted,
+    SUM(reached_qualified) AS reached_qualified,
+    SUM(reached_demo_scheduled) AS reached_demo_scheduled,
+    SUM(reached_proposal_sent) AS reached_proposal_sent,
+    SUM(reached_closed_won) AS reached_closed_won,
+    SUM(converted) AS conversions,
+    SUM(revenue) AS revenue_sum,
+    SUM(revenue * revenue) AS revenue_sum_sq,
+    COUNT(days_to_close) AS closed,
+    SUM(days_to_close) AS days_sum,
+    SUM(days_to_close * days_to_close) AS days_sum_sq,
+    SUM(contacts) AS contacts_sum,
+    SUM(contacts * contacts) AS contacts_sum_sq,
+    SUM(responses) AS responses_sum,
+    SUM(responses * responses) AS responses_sum_sq,
+    SUM(contacts * responses) AS contacts_responses_sum,
+    MAX(last_activity_date) AS last_activity_date
+FROM lead_metrics
+GROUP BY lead_group, cohort_date, region, industry, source_channel, company_size
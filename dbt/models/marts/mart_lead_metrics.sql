@@ -0,0 +1,102 @@
+{{ config(
+    materialized='incremental',
+    unique_key='contact_email',
+    incremental_strategy='delete+insert',
+    post_hook=["{{ key_index('contact_email') }}", "{{ key_index('cohort_date') }}", "{{ key_index('last_activity_date') }}"]
+) }}
+
+-- One row per lead with its contact, funnel and outcome measures, the input of mart_experiment_cube
+WITH
+{% if is_incremental() %}
+-- INCREMENTAL: leads created or with contacts, stages or outcomes inside the refresh window
+-- (keyed on contact_email like stg_leads, so a lead replaced by the email dedup is replaced here too)
+active_leads AS (
+    SELECT lead_id FROM {{ ref('stg_contact_events') }}
+    WHERE {{ incremental_window('event_date', 'last_activity_date') }}
+    UNION
+    SELECT lead_id FROM {{ ref('stg_funnel_stages') }}
+    WHERE {{ incremental_window('stage_date', 'last_activity_date') }}
+    UNION
+    SELECT lead_id FROM {{ ref('stg_outcomes') }}
+    WHERE {{ incremental_window('outcome_date', 'last_activity_date') }}
+),
+{% endif %}
+
+leads AS (
+    SELECT
+        lead_id,
+        contact_email,
+        lead_group,
+        {{ to_date('created_at_clean') }} AS cohort_date,
+        region_clean AS region,
+        industry,
+        source_channel,
+        company_size_clean AS company_size
+    FROM {{ ref('stg_leads') }}
+    {% if is_incremental() %}
+    WHERE lead_id IN (SELECT lead_id FROM active_leads)
+       OR {{ incremental_window('created_at_clean', 'last_activity_date') }}
+    {% endif %}
+),
+
+lead_contacts AS (
+    SELECT
+        lead_id,
+        COUNT(*) AS contacts,
+        SUM(CASE WHEN response_type IN ('Responded', 'Interested', 'Callback Requested') THEN 1 ELSE 0 END) AS responses,
+        MAX(event_date) AS last_contact_date
+    FROM {{ ref('stg_contact_events') }}
+    {% if is_incremental() %}
+    WHERE lead_id IN (SELECT lead_id FROM leads)
+    {% endif %}
+    GROUP BY lead_id
+),
+
+-- FUNNEL REACH: whether the lead ever reached a stage (stages can repeat or arrive out of order)
+lead_stages AS (
+    SELECT
+        lead_id,
+        MAX(CASE WHEN stage_name = 'Contacted' THEN 1 ELSE 0 END) AS reached_contacted,
+        MAX(CASE WHEN stage_name = 'Qualified' THEN 1 ELSE 0 END) AS reached_qualified,
+        MAX(CASE WHEN stage_name = 'Demo Scheduled' THEN 1 ELSE 0 END) AS reached_demo_scheduled,
+        MAX(CASE WHEN stage_name = 'Proposal Sent' THEN 1 ELSE 0 END) AS reached_proposal_sent,
+        MAX(CASE WHEN stage_name = 'Closed Won' THEN 1 ELSE 0 END) AS reached_closed_won,
+        MAX(stage_date) AS last_stage_date
+    FROM {{ ref('stg_funnel_stages') }}
+    {% if is_incremental() %}
+    WHERE lead_id IN (SELECT lead_id FROM leads)
+    {% endif %}
+    GROUP BY lead_id
+),
+
+lead_outcomes AS (
+    SELECT
+        lead_id,
+        MAX(converted) AS converted,
+        SUM(revenue) AS revenue,
+        MIN(CASE WHEN converted = 1 THEN days_to_close END) AS days_to_close,
+        MAX(outcome_date) AS last_outcome_date
+    FROM {{ ref('stg_outcomes') }}
+    {% if is_incremental() %}
+    WHERE lead_id IN (SELECT lead_id FROM leads)
+    {% endif %}
+    GROUP BY lead_id
+)
+
+SELECT
+    l.*,
+    COALESCE(c.contacts, 0) AS contacts,
+    COALESCE(c.responses, 0) AS responses,
+    COALESCE(s.reached_contacted, 0) AS reached_contacted,
+    COALESCE(s.reached_qualified, 0) AS reached_qualified,
+    COALESCE(s.reached_demo_scheduled, 0) AS reached_demo_scheduled,
+    COALESCE(s.reached_proposal_sent, 0) AS reached_proposal_sent,
+    COALESCE(s.reached_closed_won, 0) AS reached_closed_won,
+    COALESCE(o.converted, 0) AS converted,
+    COALESCE(o.revenue, 0.0) AS revenue,
+    o.days_to_close,
+    {{ greatest_date(['l.cohort_date', 'c.last_contact_date', 's.last_stage_date', 'o.last_outcome_date']) }} AS last_activity_date
+FROM leads l
+LEFT JOIN lead_contacts c ON l.lead_id = c.lead_id
+LEFT JOIN lead_stages s ON l.lead_id = s.lead_id
+LEFT JOIN lead_outcomes o ON l.lead_id = o.lead_id
@@ -1,8 +1,17 @@
-{{ config(materialized='view') }}
+{{ config(
+    materialized='incremental',
+    unique_key='event_id',
+    incremental_strategy='delete+insert',
+    post_hook=["{{ key_index('event_id') }}", "{{ key_index('event_date') }}"]
+) }}
 
 -- Stage contact events with DATA CLEANING and VALIDATION
 WITH raw_data AS (
     SELECT * FROM {{ source('main', 'contact_events') }}
+    {% if is_incremental() %}
+    -- INCREMENTAL: only events dated inside the refresh window
+    WHERE {{ incremental_window('event_date') }}
+    {% endif %}
 ),
 
 cleaned_contacts AS (
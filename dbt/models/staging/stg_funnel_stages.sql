@@ -1,8 +1,21 @@
-{{ config(materialized='view') }}
+{{ config(
+    materialized='incremental',
+    unique_key='stage_id',
+    incremental_strategy='delete+insert',
+    post_hook=["{{ key_index('stage_id') }}", "{{ key_index('stage_date') }}"]
+) }}
 
 -- Stage funnel stages with DATA VALIDATION and BUSINESS LOGIC
 WITH raw_data AS (
     SELECT * FROM {{ source('main', 'funnel_stages') }}
+    {% if is_incremental() %}
+    -- INCREMENTAL: every stage of the leads with stage rows inside the refresh window,
+    -- so stage_sequence and days_in_previous_stage are recomputed over the lead's full history
+    WHERE lead_id IN (
+        SELECT lead_id FROM {{ source('main', 'funnel_stages') }}
+        WHERE {{ incremental_window('stage_date') }}
+    )
+    {% endif %}
 ),
 
 cleaned_funnel AS (
@@ -25,7 +38,7 @@ cleaned_funnel AS (
         -- CLEAN STAGE DATES: Handle missing and future dates
         CASE 
             WHEN stage_date IS NULL THEN NULL
-            WHEN stage_date > DATE('now') THEN DATE('now')  -- Cap future dates to today
+            WHEN stage_date > {{ today_date() }} THEN {{ today_date() }}  -- Cap future dates to today
             ELSE stage_date
         END AS stage_date_clean,
         
@@ -50,7 +63,7 @@ cleaned_funnel AS (
         
         -- ADD DATA QUALITY FLAGS
         CASE WHEN stage_date IS NULL THEN 1 ELSE 0 END AS missing_date_flag,
-        CASE WHEN stage_date > DATE('now') THEN 1 ELSE 0 END AS future_date_flag,
+        CASE WHEN stage_date > {{ today_date() }} THEN 1 ELSE 0 END AS future_date_flag,
         CASE WHEN stage_order IS NULL THEN 1 ELSE 0 END AS missing_order_flag,
         CASE WHEN stage_order < 1 OR stage_order > 7 THEN 1 ELSE 0 END AS invalid_order_flag
         
@@ -69,7 +82,7 @@ SELECT
     -- CALCULATE STAGE DURATION: Days between stage transitions
     CASE 
         WHEN previous_stage_date IS NOT NULL 
-        THEN CAST((JULIANDAY(stage_date_clean) - JULIANDAY(previous_stage_date)) AS INTEGER)
+        THEN {{ days_between('previous_stage_date', 'stage_date_clean') }}
         ELSE NULL
     END AS days_in_previous_stage,
     
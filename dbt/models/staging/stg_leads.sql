@@ -1,10 +1,23 @@
-{{ config(materialized='view') }}
+{{ config(
+    materialized='incremental',
+    unique_key='contact_email',
+    incremental_strategy='delete+insert',
+    post_hook=["{{ key_index('contact_email') }}", "{{ key_index('created_at_clean') }}"]
+) }}
 
 -- Stage leads with DATA CLEANING and VALIDATION
 -- Based on data quality analysis and cleaning solutions developed
 
 WITH raw_data AS (
     SELECT * FROM {{ source('main', 'leads') }}
+    {% if is_incremental() %}
+    -- INCREMENTAL: every lead sharing an email with a lead created inside the refresh window,
+    -- so the email dedup below re-ranks the email's full history (one row per email replaces the old one)
+    WHERE contact_email IN (
+        SELECT contact_email FROM {{ source('main', 'leads') }}
+        WHERE {{ incremental_window('created_at', 'created_at_clean') }}
+    )
+    {% endif %}
 ),
 
 -- EMAIL DEDUPLICATION: Keep only the latest lead per email address
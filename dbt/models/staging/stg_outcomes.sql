@@ -1,8 +1,18 @@
-{{ config(materialized='view') }}
+{{ config(
+    materialized='incremental',
+    unique_key='outcome_id',
+    incremental_strategy='delete+insert',
+    post_hook=["{{ key_index('outcome_id') }}", "{{ key_index('outcome_date') }}"]
+) }}
 
 -- Stage outcomes with DATA VALIDATION and BUSINESS LOGIC CORRECTIONS
 WITH raw_data AS (
     SELECT * FROM {{ source('main', 'outcomes') }}
+    {% if is_incremental() %}
+    -- INCREMENTAL: outcomes dated inside the refresh window, plus undated ones (their date is filled with today)
+    WHERE {{ incremental_window('outcome_date') }}
+       OR outcome_date IS NULL
+    {% endif %}
 ),
 
 cleaned_outcomes AS (
@@ -30,7 +40,7 @@ cleaned_outcomes AS (
         
         -- CLEAN OUTCOME DATES: Handle missing dates
         CASE 
-            WHEN outcome_date IS NULL AND converted = 1 THEN DATE('now')  -- Converted leads need dates
+            WHEN outcome_date IS NULL AND converted = 1 THEN {{ today_date() }}  -- Converted leads need dates
             ELSE outcome_date
         END AS outcome_date_clean,
         